@@ -0,0 +1,148 @@
+"""
+Load benchmarks for ``manage.py benchmark <name>``.
+
+This package sits next to ``noteshub`` rather than inside it and is only
+installed as an app when DEBUG is on (see settings), so production
+deployments never import the benchmark URLs or seeding code.
+
+Every benchmark runs against a throwaway test database and MEDIA_ROOT (see
+``isolated_environment``), so it can be pointed at a developer checkout
+without touching real data. Each module in ``BENCHMARKS`` provides
+``add_arguments(parser)`` and ``run(options, out)``.
+"""
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.core.cache import caches
+from django.db import connections
+from django.core.files.base import ContentFile
+from django.test.utils import override_settings, setup_databases, teardown_databases
+
+BENCHMARKS = ('serving', 'login', 'uploads', 'database', 'endpoints', 'pages', 'rendering', 'compare')
+
+
+@contextmanager
+def isolated_environment(**settings):
+    media_root = tempfile.mkdtemp(prefix='noteshub-bench-')
+    overrides = {'MEDIA_ROOT': media_root, 'ALLOWED_HOSTS': ['testserver', 'localhost']}
+    overrides.update(settings)
+    # SQLite test databases default to a shared in-memory database, which
+    # serializes concurrent writers on table locks; use a real file instead.
+    saved_test_names = {}
+    for conn in connections.all():
+        if conn.vendor == 'sqlite':
+            saved_test_names[conn.alias] = conn.settings_dict['TEST'].get('NAME')
+            conn.settings_dict['TEST']['NAME'] = f'{media_root}/{conn.alias}.sqlite3'
+    with override_settings(**overrides):
+        old_config = setup_databases(verbosity=0, interactive=False)
+        for cache in caches.all():
+            cache.clear()
+        try:
+            yield media_root
+        finally:
+            from noteshub import analytics
+
+            # Events counted against the throwaway database must not reach
+            # the real one through the atexit flush.
+            analytics.buffer.flush()
+            analytics.buffer.discard()
+            teardown_databases(old_config, verbosity=0)
+            for alias, name in saved_test_names.items():
+                connections[alias].settings_dict['TEST']['NAME'] = name
+            shutil.rmtree(media_root, ignore_errors=True)
+
+
+def make_pdf(size, seed=0):
+    """Bytes that pass the upload checks: PDF header, padding to ``size``, %%EOF."""
+    head = b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n'
+    tail = b'\n%%EOF\n'
+    filler = f'% noteshub benchmark {seed}\n'.encode()
+    body_size = max(size - len(head) - len(tail), 0)
+    body = (filler * (body_size // len(filler) + 1))[:body_size]
+    return head + body + tail
+
+
+def create_note(uploader, size, seed=0, **fields):
+    from noteshub.models import Notes
+
+    defaults = {'year': '1', 'branch': 'CSE', 'subject': 'Benchmarks', 'chapter': f'Chapter {seed}', 'status': 'approved'}
+    defaults.update(fields)
+    note = Notes(uploader=uploader, **defaults)
+    note.pdf.save(f'bench-{seed}.pdf', ContentFile(make_pdf(size, seed)), save=False)
+    note.save()
+    return note
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    if not ordered:
+        return {'count': 0, 'mean': None, 'p50': None, 'p95': None, 'p99': None, 'max': None}
+
+    def pick(pct):
+        return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))]
+
+    return {
+        'count': len(ordered),
+        'mean': statistics.fmean(ordered),
+        'p50': pick(50),
+        'p95': pick(95),
+        'p99': pick(99),
+        'max': ordered[-1],
+    }
+
+
+def drive(request, total, threads):
+    """
+    Call ``request(state, index)`` ``total`` times from ``threads`` threads.
+
+    ``state`` is a per-thread dict (e.g. for logged-in clients). A call that
+    returns False or raises counts as an error. Returns
+    ``(latencies, errors, wall_seconds)``.
+    """
+    local = threading.local()
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def call(index):
+        if not hasattr(local, 'state'):
+            local.state = {}
+        started = time.perf_counter()
+        try:
+            ok = request(local.state, index) is not False
+        except Exception:
+            ok = False
+        elapsed = time.perf_counter() - started
+        with lock:
+            (latencies if ok else errors).append(elapsed)
+
+    def close(_):
+        connections.close_all()
+        # Holding every thread here makes each one close its own connections.
+        barrier.wait()
+
+    barrier = threading.Barrier(threads)
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        started = time.perf_counter()
+        list(pool.map(call, range(total)))
+        wall = time.perf_counter() - started
+        list(pool.map(close, range(threads)))
+    return latencies, errors, wall
+
+
+def write_table(out, rows, columns):
+    """Print ``rows`` (dicts) as an aligned table of ``columns`` [(key, title)]."""
+    widths = [max(len(title), *(len(_cell(row.get(key))) for row in rows)) for key, title in columns]
+    out.write('  '.join(title.rjust(width) for (_, title), width in zip(columns, widths)))
+    for row in rows:
+        out.write('  '.join(_cell(row.get(key)).rjust(width) for (key, _), width in zip(columns, widths)))
+
+
+def _cell(value):
+    if isinstance(value, float):
+        return f'{value:.1f}'
+    return '-' if value is None else str(value)
@@ -0,0 +1,79 @@
+"""
+Compare two saved benchmark runs and flag regressions.
+
+Takes the files written by ``benchmark --json`` for the same benchmark, pairs
+rows on their labels (text columns plus ``notes`` and ``size_mb``) and prints
+the change of ``--metric`` per row. A row regresses when the metric
+got worse by more than ``--threshold`` percent; ``--fail-on-regression``
+turns that into a non-zero exit for CI.
+"""
+import json
+
+from django.core.management.base import CommandError
+
+from . import write_table
+
+# Metrics where a larger value is better; everything else is a cost.
+HIGHER_IS_BETTER = {'req_s', 'ops_s', 'mb_s'}
+
+KEY_COLUMNS = ('notes', 'size_mb')
+
+
+def add_arguments(parser):
+    parser.add_argument('base', help='JSON results of the reference run.')
+    parser.add_argument('new', help='JSON results of the run to check.')
+    parser.add_argument('--metric', default='p95_ms', help='Result column to compare (default: p95_ms).')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='Allowed change for the worse, in percent (default: 10).')
+    parser.add_argument('--fail-on-regression', action='store_true')
+
+
+def run(options, out):
+    base, new = _load(options['base']), _load(options['new'])
+    if base['benchmark'] != new['benchmark']:
+        raise CommandError(f"Cannot compare {base['benchmark']} results with {new['benchmark']} results.")
+    metric = options['metric']
+    base_rows = {_key(row): row for row in base['results']}
+
+    results = []
+    for row in new['results']:
+        key = _key(row)
+        before, after = base_rows.get(key, {}).get(metric), row.get(metric)
+        change = None
+        if isinstance(before, (int, float)) and isinstance(after, (int, float)) and before:
+            change = (after - before) / before * 100
+        worse = change is not None and (-change if metric in HIGHER_IS_BETTER else change) > options['threshold']
+        results.append({
+            'row': ' '.join(str(value) for _, value in key),
+            'base': before,
+            'new': after,
+            'change_pct': change,
+            'regression': worse,
+        })
+
+    out.write(f"{new['benchmark']}: {metric}, threshold {options['threshold']:.1f}%")
+    write_table(out, results, [
+        ('row', 'row'), ('base', 'base'), ('new', 'new'), ('change_pct', 'change %'), ('regression', 'regression'),
+    ])
+    regressions = [result['row'] for result in results if result['regression']]
+    if regressions and options['fail_on_regression']:
+        raise CommandError(f"{metric} regressed for: {', '.join(regressions)}")
+    return results
+
+
+def _load(path):
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        raise CommandError(f'Cannot read benchmark results from {path}: {e}')
+    if not isinstance(data, dict) or 'results' not in data:
+        raise CommandError(f'{path} is not a file written by benchmark --json.')
+    return data
+
+
+def _key(row):
+    return tuple(
+        (column, value) for column, value in row.items()
+        if column in KEY_COLUMNS or not isinstance(value, (int, float)) or isinstance(value, bool)
+    )
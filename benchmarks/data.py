@@ -0,0 +1,120 @@
+"""
+Synthetic catalog for the load benchmarks.
+
+``seed_catalog`` bulk-inserts students, teachers and notes with skewed
+year/branch/subject distributions (a few popular branches and subjects, most
+notes approved, uploads spread over two years). PDFs come from a small pool
+of distinct files stored once in the content-addressed storage and shared by
+many notes, like repeated uploads of the same handout. Bulk inserts skip the
+per-save signals, so blob refcounts, facet counts and the search index are
+rebuilt afterwards in bulk.
+"""
+import random
+from collections import Counter
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+
+from noteshub import facets, search
+from noteshub.storage import digest_from_name, pdf_storage
+
+from . import make_pdf
+
+PASSWORD = 'bench-password'
+
+YEARS = {'1': 35, '2': 28, '3': 22, '4': 15}
+
+# branch -> (weight, subjects); earlier subjects are picked more often
+BRANCHES = {
+    'CSE': (40, ['Data Structures', 'Algorithms', 'Operating Systems', 'DBMS', 'Computer Networks',
+                 'Compiler Design', 'Machine Learning', 'Discrete Mathematics']),
+    'ECE': (20, ['Signals and Systems', 'Digital Electronics', 'Analog Circuits', 'Electromagnetics',
+                 'Communication Systems', 'VLSI Design']),
+    'ME': (15, ['Thermodynamics', 'Fluid Mechanics', 'Strength of Materials', 'Machine Design',
+                'Manufacturing Processes']),
+    'CE': (10, ['Surveying', 'Structural Analysis', 'Geotechnical Engineering', 'Transportation Engineering']),
+    'EE': (10, ['Electrical Machines', 'Power Systems', 'Control Systems', 'Power Electronics']),
+    'IT': (5, ['Web Technologies', 'Software Engineering', 'Cloud Computing', 'Information Security']),
+}
+
+CHAPTER_TOPICS = ['Introduction', 'Fundamentals', 'Problem Set', 'Case Study', 'Revision Notes',
+                  'Previous Year Questions', 'Lab Manual', 'Summary']
+
+STATUSES = {'approved': 80, 'pending': 15, 'rejected': 5}
+
+TEACHER_SHARE = 0.05
+BATCH_SIZE = 5000
+
+
+def _weighted(rng, table):
+    return rng.choices(list(table), weights=list(table.values()))[0]
+
+
+def _subject(rng, subjects):
+    # Zipf-like: the n-th subject of a branch is picked with weight 1/n.
+    return rng.choices(subjects, weights=[1 / (i + 1) for i in range(len(subjects))])[0]
+
+
+def random_note_fields(rng):
+    branch = rng.choices(list(BRANCHES), weights=[weight for weight, _ in BRANCHES.values()])[0]
+    return {
+        'year': _weighted(rng, YEARS),
+        'branch': branch,
+        'subject': _subject(rng, BRANCHES[branch][1]),
+        'chapter': f'Unit {rng.randint(1, 8)}: {rng.choice(CHAPTER_TOPICS)}',
+    }
+
+
+def seed_catalog(users, notes, pdf_size=16 * 1024, distinct_pdfs=20, seed=0, out=None):
+    """Create ``users`` users and ``notes`` notes; returns ``{'students', 'teachers'}`` id lists."""
+    from noteshub.models import CustomUser, Notes, PdfBlob
+
+    rng = random.Random(seed)
+    password = make_password(PASSWORD)
+    teachers = max(1, round(users * TEACHER_SHARE))
+    CustomUser.objects.bulk_create(
+        [CustomUser(username=f'teacher{i}', roll_number=f'T{i:06d}', password=password, is_teacher=True)
+         for i in range(teachers)]
+        + [CustomUser(roll_number=f'S{i:07d}', password=password, is_student=True)
+           for i in range(users - teachers)],
+        batch_size=BATCH_SIZE,
+    )
+    teacher_ids = list(CustomUser.objects.filter(is_teacher=True).values_list('id', flat=True))
+    student_ids = list(CustomUser.objects.filter(is_student=True).values_list('id', flat=True))
+
+    pdf_names = [pdf_storage.save('bench.pdf', ContentFile(make_pdf(pdf_size, i))) for i in range(distinct_pdfs)]
+    PdfBlob.objects.bulk_create(
+        [PdfBlob(digest=digest_from_name(name), size=pdf_storage.size(name)) for name in pdf_names],
+        ignore_conflicts=True,
+    )
+
+    now = timezone.now()
+    refcounts = Counter()
+    for start in range(0, notes, BATCH_SIZE):
+        batch = []
+        for _ in range(min(BATCH_SIZE, notes - start)):
+            by_teacher = rng.random() < TEACHER_SHARE
+            pdf_name = rng.choice(pdf_names)
+            refcounts[pdf_name] += 1
+            batch.append(Notes(
+                uploader_id=rng.choice(teacher_ids if by_teacher else student_ids),
+                pdf=pdf_name,
+                blob_id=digest_from_name(pdf_name),
+                uploaded_at=now - timedelta(seconds=rng.randrange(2 * 365 * 24 * 3600)),
+                status='approved' if by_teacher else _weighted(rng, STATUSES),
+                **random_note_fields(rng),
+            ))
+        with transaction.atomic():
+            Notes.objects.bulk_create(batch)
+        if out is not None and (start // BATCH_SIZE) % 20 == 19:
+            out.write(f'  {start + len(batch)} / {notes} notes')
+
+    with transaction.atomic():
+        for name, count in refcounts.items():
+            PdfBlob.objects.filter(pk=digest_from_name(name)).update(refcount=count)
+    facets.rebuild()
+    search.reindex_all()
+    return {'students': student_ids, 'teachers': teacher_ids}
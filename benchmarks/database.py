@@ -0,0 +1,145 @@
+"""
+Concurrent upload + approve throughput per database profile.
+
+``workers`` threads each alternate a student PDF upload through the real
+upload view with a teacher approving a pending note, ``operations`` times in
+total; these are the two write-heavy paths (blob, search index, facet and
+cache bookkeeping) that collided as "database is locked". On SQLite the
+``sqlite-stock`` profile runs with Django's default connection options and
+``sqlite-tuned`` with SQLITE_OPTIONS from settings; ``configured`` uses
+DATABASES as it is (e.g. NOTESHUB_DB_PROFILE=postgres).
+"""
+import itertools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError, connections
+from django.test import Client
+
+from . import isolated_environment, make_pdf, percentiles, write_table
+
+# profile -> OPTIONS for the default database (None keeps the configured ones)
+PROFILES = {
+    'sqlite-stock': {},
+    'sqlite-tuned': settings.SQLITE_OPTIONS,
+    'configured': None,
+}
+
+
+def add_arguments(parser):
+    parser.add_argument('--profiles', default=None,
+                        help=f"Comma-separated subset of {', '.join(PROFILES)} "
+                             '(default: both SQLite profiles on SQLite, else configured).')
+    parser.add_argument('--operations', type=int, default=400, help='Uploads plus approvals (default: 400).')
+    parser.add_argument('--workers', type=int, default=8, help='Concurrent client threads (default: 8).')
+    parser.add_argument('--size-kb', type=int, default=64, help='Uploaded PDF size in KiB (default: 64).')
+
+
+def run(options, out):
+    vendor = connections['default'].vendor
+    profiles = options['profiles'] or ('sqlite-stock,sqlite-tuned' if vendor == 'sqlite' else 'configured')
+    results = []
+    # Failed requests are counted in the table instead of logged with tracebacks.
+    request_logger = logging.getLogger('django.request')
+    saved_level = request_logger.level
+    request_logger.setLevel(logging.CRITICAL)
+    try:
+        for profile in profiles.split(','):
+            if profile.startswith('sqlite') and vendor != 'sqlite':
+                raise ValueError(f'{profile} needs NOTESHUB_DB_PROFILE=sqlite.')
+            with _database_options(PROFILES[profile]), isolated_environment(ROOT_URLCONF='benchmarks.urls'):
+                results.append(_run_profile(profile, options))
+    finally:
+        request_logger.setLevel(saved_level)
+
+    out.write(
+        f"{options['operations']} operations (upload + approve), {options['workers']} threads, "
+        f"{options['size_kb']} KiB PDFs, {vendor}"
+    )
+    write_table(out, results, [
+        ('profile', 'profile'), ('ops_s', 'ops/s'), ('upload_p50_ms', 'upload p50'),
+        ('upload_p95_ms', 'upload p95'), ('approve_p50_ms', 'approve p50'),
+        ('approve_p95_ms', 'approve p95'), ('errors', 'errors'),
+    ])
+    return results
+
+
+@contextmanager
+def _database_options(options):
+    conn = connections['default']
+    saved = conn.settings_dict['OPTIONS']
+    if options is not None:
+        conn.close()
+        conn.settings_dict['OPTIONS'] = dict(options)
+    try:
+        yield
+    finally:
+        conn.close()
+        conn.settings_dict['OPTIONS'] = saved
+
+
+def _run_profile(profile, options):
+    from noteshub.models import CustomUser, Notes
+
+    teacher = CustomUser.objects.create_user('BENCHT', password='bench', username='bench', is_teacher=True)
+    students = [
+        CustomUser.objects.create_user(f'BENCH{i:03d}', password='bench', is_student=True)
+        for i in range(options['workers'])
+    ]
+    pdf_size = options['size_kb'] * 1024
+    seeds = itertools.count()
+    seeds_lock = threading.Lock()
+    uploads, approvals, errors = [], [], []
+
+    def worker(index):
+        student, moderator = Client(raise_request_exception=False), Client(raise_request_exception=False)
+        student.force_login(students[index])
+        moderator.force_login(teacher)
+        try:
+            for step in range(index, options['operations'], options['workers']):
+                with seeds_lock:
+                    seed = next(seeds)
+                started = time.perf_counter()
+                if step % 2 == 0:
+                    response = student.post('/studentlogin/studentupload/', {
+                        'year': '1', 'branch': 'CSE', 'subject': 'Benchmarks', 'chapter': f'Chapter {seed}',
+                        'pdf': SimpleUploadedFile(f'bench-{seed}.pdf', make_pdf(pdf_size, seed)),
+                    })
+                    ok, samples = response.status_code == 302, uploads
+                else:
+                    try:
+                        note = Notes.objects.filter(status='pending').order_by('?').only('id').first()
+                    except DatabaseError:
+                        errors.append(time.perf_counter() - started)
+                        continue
+                    if note is None:
+                        continue
+                    response = moderator.get(f'/approve/{note.id}/', headers={'X-Requested-With': 'XMLHttpRequest'})
+                    ok, samples = response.status_code == 200, approvals
+                elapsed = time.perf_counter() - started
+                (samples if ok else errors).append(elapsed)
+        finally:
+            connections.close_all()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+        list(pool.map(worker, range(options['workers'])))
+    wall = time.perf_counter() - started
+
+    upload_stats, approve_stats = percentiles(uploads), percentiles(approvals)
+    return {
+        'profile': profile,
+        'ops_s': (len(uploads) + len(approvals)) / wall,
+        'upload_p50_ms': upload_stats['p50'] and upload_stats['p50'] * 1000,
+        'upload_p95_ms': upload_stats['p95'] and upload_stats['p95'] * 1000,
+        'approve_p50_ms': approve_stats['p50'] and approve_stats['p50'] * 1000,
+        'approve_p95_ms': approve_stats['p95'] and approve_stats['p95'] * 1000,
+        'errors': len(errors),
+        'cores': os.cpu_count(),
+    }
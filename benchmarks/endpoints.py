@@ -0,0 +1,193 @@
+"""
+Latency, query count and memory of every noteshub endpoint as the catalog grows.
+
+For each ``--notes`` scale a fresh database is seeded by ``data.seed_catalog``.
+Every scenario is then requested ``--samples`` times in one thread to count
+queries (median and worst) and trace peak memory per request, and driven by
+``--threads`` concurrent clients for ``--requests`` requests to get p50, p95
+and p99 latency. Dashboard fragments are cached as in production, so the
+numbers are for a warm cache. Save runs with ``--json`` and check them
+against each other with ``benchmark compare``.
+"""
+import json
+import random
+import statistics
+import tracemalloc
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from . import data, drive, isolated_environment, percentiles, write_table
+
+Call = namedtuple('Call', 'role method path data status xhr', defaults=(None, 200, False))
+
+DASHBOARD_TABS = ('pending', 'approved', 'rejected', 'my-uploads')
+
+
+def _filters(ctx, rng):
+    year, branch, subject = rng.choice(ctx['facets'])
+    return rng.choice([
+        {},
+        {'year': year},
+        {'branch': branch},
+        {'branch': branch, 'subject': subject},
+        {'year': year, 'branch': branch, 'subject': subject},
+    ])
+
+
+def _student_dashboard(ctx, rng):
+    return Call('student', 'get', '/studentlogin/studentdashboard/', _filters(ctx, rng))
+
+
+def _teacher_dashboard(tab):
+    def call(ctx, rng):
+        return Call('teacher', 'get', '/teacherlogin/teacherdashboard/', {'tab': tab, **_filters(ctx, rng)})
+    return call
+
+
+def _search(ctx, rng):
+    return Call('student', 'get', '/search/', {'q': rng.choice(ctx['terms'])})
+
+
+def _view_note(ctx, rng):
+    return Call('student', 'get', f"/view/{rng.choice(ctx['approved_ids'])}/")
+
+
+def _download_note(ctx, rng):
+    return Call('student', 'get', f"/download/{rng.choice(ctx['approved_ids'])}/")
+
+
+def _moderate(ctx, rng):
+    action = rng.choice(('approve', 'reject', 'pending'))
+    return Call('teacher', 'get', f"/{action}/{rng.choice(ctx['note_ids'])}/", xhr=True)
+
+
+def _bulk_moderate(ctx, rng):
+    payload = {'action': rng.choice(('approve', 'reject', 'pending')), 'ids': rng.sample(ctx['note_ids'], 50)}
+    return Call('teacher', 'post', '/moderate/', json.dumps(payload), xhr=True)
+
+
+SCENARIOS = {
+    'student_dashboard': _student_dashboard,
+    **{f"teacher_{tab.replace('-', '_')}": _teacher_dashboard(tab) for tab in DASHBOARD_TABS},
+    'search': _search,
+    'view_note': _view_note,
+    'download_note': _download_note,
+    'moderate': _moderate,
+    'bulk_moderate': _bulk_moderate,
+}
+
+
+def add_arguments(parser):
+    parser.add_argument('--notes', default='1000',
+                        help='Comma-separated catalog sizes, e.g. 1000,100000,1000000 (default: 1000).')
+    parser.add_argument('--users', type=int, default=500, help='Users per catalog (default: 500).')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f"Comma-separated subset of {', '.join(SCENARIOS)}.")
+    parser.add_argument('--requests', type=int, default=200, help='Load requests per scenario (default: 200).')
+    parser.add_argument('--threads', type=int, default=8, help='Concurrent clients (default: 8).')
+    parser.add_argument('--samples', type=int, default=20,
+                        help='Sequential requests per scenario for query counts and memory (default: 20).')
+    parser.add_argument('--seed', type=int, default=0)
+
+
+def run(options, out):
+    results = []
+    for scale in (int(value) for value in options['notes'].split(',')):
+        with isolated_environment():
+            out.write(f'Seeding {options["users"]} users and {scale} notes...')
+            ctx = _context(data.seed_catalog(options['users'], scale, seed=options['seed'], out=out), options)
+            for name in options['scenarios'].split(','):
+                results.append({'notes': scale, 'scenario': name, **_run_scenario(SCENARIOS[name], ctx, options)})
+
+    out.write(f"{options['requests']} requests per scenario, {options['threads']} threads, "
+              f"{options['samples']} profiled samples")
+    write_table(out, results, [
+        ('notes', 'notes'), ('scenario', 'scenario'), ('req_s', 'req/s'), ('p50_ms', 'p50 ms'),
+        ('p95_ms', 'p95 ms'), ('p99_ms', 'p99 ms'), ('queries', 'queries'), ('max_queries', 'max q'),
+        ('peak_kb', 'peak KiB'), ('errors', 'errors'),
+    ])
+    return results
+
+
+def _context(users, options):
+    from noteshub.models import CustomUser, FacetCount, Notes
+
+    rng = random.Random(options['seed'])
+    bounds = Notes.objects.order_by('id').values_list('id', flat=True)
+    first, last = bounds.first(), bounds.last()
+    note_ids = [rng.randint(first, last) for _ in range(2000)]
+    approved = Notes.objects.filter(status='approved').order_by('id').values_list('id', flat=True)
+    approved_ids = [approved.filter(id__gte=note_id).first() for note_id in note_ids[:200]]
+
+    cookies = {}
+    for role, user_id in (('student', users['students'][0]), ('teacher', users['teachers'][0])):
+        client = Client()
+        client.force_login(CustomUser.objects.get(pk=user_id))
+        cookies[role] = client.cookies[settings.SESSION_COOKIE_NAME].value
+
+    return {
+        'facets': list(FacetCount.objects.values_list('year', 'branch', 'subject')),
+        'terms': sorted(
+            {word for _, subjects in data.BRANCHES.values() for subject in subjects for word in subject.split()}
+            | {topic.split()[0] for topic in data.CHAPTER_TOPICS}
+        ),
+        'note_ids': note_ids,
+        'approved_ids': [note_id for note_id in approved_ids if note_id is not None],
+        'cookies': cookies,
+    }
+
+
+def _request(ctx, state, call):
+    client = state.get(call.role)
+    if client is None:
+        client = state[call.role] = Client(raise_request_exception=False)
+        client.cookies[settings.SESSION_COOKIE_NAME] = ctx['cookies'][call.role]
+    headers = {'X-Requested-With': 'XMLHttpRequest'} if call.xhr else None
+    if call.method == 'post':
+        response = client.post(call.path, call.data, content_type='application/json', headers=headers)
+    else:
+        response = client.get(call.path, call.data, headers=headers)
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    response.close()
+    return response.status_code == call.status
+
+
+def _run_scenario(scenario, ctx, options):
+    rng = random.Random(options['seed'])
+    state, queries, peaks = {}, [], []
+    tracemalloc.start()
+    try:
+        for _ in range(options['samples']):
+            call = scenario(ctx, rng)
+            baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            with CaptureQueriesContext(connection) as captured:
+                _request(ctx, state, call)
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+            queries.append(len(captured))
+    finally:
+        tracemalloc.stop()
+
+    def request(thread_state, index):
+        if 'rng' not in thread_state:
+            thread_state['rng'] = random.Random(f"{options['seed']}-{index}")
+        return _request(ctx, thread_state, scenario(ctx, thread_state['rng']))
+
+    latencies, errors, wall = drive(request, options['requests'], options['threads'])
+    stats = percentiles(latencies)
+    return {
+        'req_s': len(latencies) / wall if wall else None,
+        'p50_ms': stats['p50'] and stats['p50'] * 1000,
+        'p95_ms': stats['p95'] and stats['p95'] * 1000,
+        'p99_ms': stats['p99'] and stats['p99'] * 1000,
+        'queries': statistics.median(queries) if queries else None,
+        'max_queries': max(queries, default=None),
+        'peak_kb': max(peaks, default=0) / 1024,
+        'errors': len(errors),
+    }
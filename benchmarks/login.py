@@ -0,0 +1,99 @@
+"""
+Student login throughput per hasher.
+
+``users`` distinct students log in once each through the real login view
+from ``workers`` threads. ``migrating`` stores passwords with the stock
+hasher but prefers the fast one, so every login also pays for the rehash.
+The figure that matters for a burst is logins per CPU-second, which is
+logins per second per fully busy core.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.test import Client
+from django.utils.module_loading import import_string
+
+from . import isolated_environment, percentiles, write_table
+
+PASSWORD = 'bench-password'
+
+STOCK = 'django.contrib.auth.hashers.PBKDF2PasswordHasher'
+FAST = 'noteshub.hashers.FastPBKDF2PasswordHasher'
+
+# variant -> (hasher used to store passwords, preferred hasher)
+VARIANTS = {
+    'default': (STOCK, STOCK),
+    'fast': (FAST, FAST),
+    'migrating': (STOCK, FAST),
+}
+
+
+def add_arguments(parser):
+    parser.add_argument('--users', type=int, default=200, help='Students logging in (default: 200).')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help='Concurrent login threads (default: CPU count).')
+    parser.add_argument('--variants', default='default,fast,migrating',
+                        help=f"Comma-separated subset of {', '.join(VARIANTS)}.")
+
+
+def run(options, out):
+    results = []
+    for variant in options['variants'].split(','):
+        stored, preferred = VARIANTS[variant]
+        hashers = [preferred] + [h for h in settings.PASSWORD_HASHERS if h != preferred]
+        with isolated_environment(PASSWORD_HASHERS=hashers):
+            results.append(_run_variant(variant, stored, options))
+
+    out.write(
+        f"{options['users']} logins, {options['workers']} threads, {os.cpu_count()} cores, "
+        f"fast hasher at {settings.NOTESHUB_FAST_HASHER_ITERATIONS} iterations"
+    )
+    write_table(out, results, [
+        ('variant', 'variant'), ('logins_s', 'logins/s'), ('logins_cpu_s', 'logins/CPU-s'),
+        ('p50_ms', 'p50 ms'), ('p95_ms', 'p95 ms'), ('rehashed', 'rehashed'), ('errors', 'errors'),
+    ])
+    return results
+
+
+def _run_variant(variant, stored_hasher, options):
+    from noteshub.models import CustomUser
+
+    encoded = make_password(PASSWORD, hasher=import_string(stored_hasher)())
+    CustomUser.objects.bulk_create(
+        CustomUser(roll_number=f'BENCH{i:05d}', password=encoded, is_student=True)
+        for i in range(options['users'])
+    )
+
+    local = threading.local()
+
+    def login(index):
+        if not hasattr(local, 'client'):
+            local.client = Client()
+        started = time.perf_counter()
+        response = local.client.post('/studentlogin/', {'roll_number': f'BENCH{index:05d}', 'password': PASSWORD})
+        local.client.cookies.clear()
+        return response.status_code == 302, time.perf_counter() - started
+
+    cpu_started = time.process_time()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+        outcomes = list(pool.map(login, range(options['users'])))
+    wall = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+
+    latencies = [elapsed for ok, elapsed in outcomes if ok]
+    stats = percentiles(latencies)
+    return {
+        'variant': variant,
+        'logins_s': len(latencies) / wall,
+        'logins_cpu_s': len(latencies) / cpu if cpu else None,
+        'p50_ms': stats['p50'] and stats['p50'] * 1000,
+        'p95_ms': stats['p95'] and stats['p95'] * 1000,
+        'rehashed': CustomUser.objects.exclude(password=encoded).count(),
+        'errors': len(outcomes) - len(latencies),
+    }
+
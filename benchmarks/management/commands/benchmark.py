@@ -0,0 +1,24 @@
+import importlib
+import json
+
+from django.core.management.base import BaseCommand
+
+from benchmarks import BENCHMARKS
+
+
+class Command(BaseCommand):
+    help = 'Run a load benchmark against a throwaway database and media directory.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--json', dest='json_path', help='Also write the results to this file.')
+        subparsers = parser.add_subparsers(dest='benchmark', required=True)
+        for name in BENCHMARKS:
+            module = importlib.import_module(f'benchmarks.{name}')
+            module.add_arguments(subparsers.add_parser(name, help=module.__doc__.strip().splitlines()[0]))
+
+    def handle(self, *args, **options):
+        module = importlib.import_module(f"benchmarks.{options['benchmark']}")
+        results = module.run(options, self.stdout)
+        if options['json_path']:
+            with open(options['json_path'], 'w') as f:
+                json.dump({'benchmark': options['benchmark'], 'results': results}, f, indent=2, default=str)
@@ -0,0 +1,102 @@
+"""
+Bytes per page view, first visit and repeat visit.
+
+Static files are collected into a throwaway STATIC_ROOT with the configured
+storage and pages are rendered with DEBUG off, so they link the hashed,
+pre-compressed files a deployment serves. Every same-site stylesheet and
+script a page links is fetched like a browser would (``Accept-Encoding: br,
+gzip``). ``first view`` is the HTML plus those transfers; on a ``repeat
+view`` assets with an immutable Cache-Control come from the browser cache.
+``inlined`` is what the page would weigh with the same CSS/JS pasted into the
+HTML, i.e. re-sent uncompressed on every view.
+"""
+import os
+import re
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import Client
+from django.test.utils import override_settings
+
+from . import data, isolated_environment, write_table
+
+PAGES = {
+    'landing': (None, '/'),
+    'student_dashboard': ('student', '/studentlogin/studentdashboard/'),
+    'teacher_dashboard': ('teacher', '/teacherlogin/teacherdashboard/?tab=approved'),
+}
+
+ACCEPT_ENCODING = 'br, gzip'
+
+_ASSET_RE = re.compile(r'<(?:link[^>]*\shref|script[^>]*\ssrc)="([^"]+)"')
+_INLINE_RE = re.compile(r'<(style|script)(?:\s[^>]*)?>(.*?)</\1>', re.S)
+
+
+def add_arguments(parser):
+    parser.add_argument('--notes', type=int, default=200, help='Notes in the catalog (default: 200).')
+    parser.add_argument('--users', type=int, default=50, help='Users in the catalog (default: 50).')
+
+
+def run(options, out):
+    results = []
+    with isolated_environment(DEBUG=False) as media_root:
+        with _collected_static(os.path.join(media_root, 'static')):
+            from noteshub.models import CustomUser
+
+            users = data.seed_catalog(options['users'], options['notes'], out=out)
+            clients = {'student': Client(), 'teacher': Client(), None: Client()}
+            clients['student'].force_login(CustomUser.objects.get(pk=users['students'][0]))
+            clients['teacher'].force_login(CustomUser.objects.get(pk=users['teachers'][0]))
+            for page, (role, url) in PAGES.items():
+                results.append({'page': page, **_measure(clients[role], url)})
+
+    out.write(f"{options['notes']} notes, Accept-Encoding: {ACCEPT_ENCODING}, sizes in KiB")
+    write_table(out, results, [
+        ('page', 'page'), ('html_kb', 'HTML'), ('inline_kb', 'inline CSS/JS'), ('assets', 'assets'),
+        ('assets_raw_kb', 'assets raw'), ('assets_wire_kb', 'assets wire'), ('first_view_kb', 'first view'),
+        ('repeat_view_kb', 'repeat view'), ('inlined_kb', 'inlined'),
+    ])
+    return results
+
+
+@contextmanager
+def _collected_static(static_root):
+    with override_settings(STATIC_ROOT=static_root):
+        call_command('collectstatic', interactive=False, verbosity=0)
+        yield
+
+
+def _measure(client, url):
+    response = client.get(url)
+    html = response.content
+    text = html.decode()
+    inline = sum(len(body.encode()) for _, body in _INLINE_RE.findall(text))
+
+    raw = wire = cached = count = 0
+    for asset_url in dict.fromkeys(_ASSET_RE.findall(text)):
+        if not asset_url.startswith(settings.STATIC_URL):
+            continue
+        asset = client.get(asset_url, headers={'Accept-Encoding': ACCEPT_ENCODING})
+        body = b''.join(asset.streaming_content) if asset.streaming else asset.content
+        asset.close()
+        identity = client.get(asset_url)
+        raw += sum(len(chunk) for chunk in identity.streaming_content) if identity.streaming else len(identity.content)
+        identity.close()
+        wire += len(body)
+        count += 1
+        if 'immutable' in asset.get('Cache-Control', ''):
+            cached += len(body)
+
+    kib = 1024
+    return {
+        'status': response.status_code,
+        'html_kb': len(html) / kib,
+        'inline_kb': inline / kib,
+        'assets': count,
+        'assets_raw_kb': raw / kib,
+        'assets_wire_kb': wire / kib,
+        'first_view_kb': (len(html) + wire) / kib,
+        'repeat_view_kb': (len(html) + wire - cached) / kib,
+        'inlined_kb': (len(html) + raw) / kib,
+    }
@@ -0,0 +1,120 @@
+"""
+Dashboard render time per note for each template profile.
+
+Renders the teacher dashboard (approved tab) and the student catalog grid
+for pages of ``--notes`` notes, timing only the template render (the page is
+fetched beforehand). ``development`` re-reads and re-compiles templates on
+every render with debug bookkeeping on and no fragment cache; ``cached-loader``
+compiles once per process; ``production`` adds the warm per-note card
+fragments and ``production-cold`` renders each page right after the fragment
+cache was cleared. ``per note`` is the extra render time of a page over the
+empty page, divided by its notes.
+"""
+import statistics
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.template.backends.django import DjangoTemplates
+from django.test import RequestFactory
+from django.test.utils import override_settings
+
+from . import data, isolated_environment, write_table
+
+TEMPLATE_LOADERS = ['django.template.loaders.filesystem.Loader', 'django.template.loaders.app_directories.Loader']
+
+# profile -> (template OPTIONS overrides, fragment cache on, fragment cache cleared before each render)
+PROFILES = {
+    'development': ({'debug': True, 'loaders': TEMPLATE_LOADERS}, False, False),
+    'cached-loader': ({'debug': False, 'loaders': [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)]},
+                      False, False),
+    'production-cold': ({'debug': False, 'loaders': [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)]},
+                        True, True),
+    'production': ({'debug': False, 'loaders': [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)]},
+                   True, False),
+}
+
+PAGES = {
+    'teacher_dashboard': 'noteshub/teacherdashboard.html',
+    'student_catalog': 'noteshub/includes/catalog_grid.html',
+}
+
+
+def add_arguments(parser):
+    parser.add_argument('--notes', default='0,10,50', help='Comma-separated page sizes (default: 0,10,50).')
+    parser.add_argument('--repeat', type=int, default=50, help='Timed renders per row (default: 50).')
+    parser.add_argument('--profiles', default=','.join(PROFILES),
+                        help=f"Comma-separated subset of {', '.join(PROFILES)}.")
+
+
+def run(options, out):
+    from noteshub.models import CustomUser, Notes
+    from noteshub.pagination import KeysetPaginator
+
+    sizes = sorted({int(size) for size in options['notes'].split(',')} | {0})
+    results = []
+    with isolated_environment():
+        users = data.seed_catalog(20, 2 * max(sizes) + 100)
+        request = RequestFactory().get('/teacherlogin/teacherdashboard/', {'tab': 'approved'})
+        request.user = CustomUser.objects.get(pk=users['teachers'][0])
+        pages = {
+            size: KeysetPaginator(Notes.objects.moderation_queue('approved'), size).get_page() if size else []
+            for size in sizes
+        }
+
+        for profile in options['profiles'].split(','):
+            template_options, fragments, cold = PROFILES[profile]
+            with _fragment_cache(fragments):
+                engine = _engine(profile, template_options)
+                for page, template_name in PAGES.items():
+                    base = None
+                    for size in sizes:
+                        context = {
+                            'page_obj': pages[size], 'notes': pages[size], 'current_tab': 'approved',
+                            'year_filter': '', 'branch_filter': '', 'subject_filter': '', 'search_query': '',
+                        }
+                        p50 = _time_render(engine, template_name, context, request, options['repeat'], cold)
+                        base = p50 if size == 0 else base
+                        results.append({
+                            'profile': profile,
+                            'page': page,
+                            'notes': size,
+                            'p50_ms': p50 * 1000,
+                            'per_note_us': (p50 - base) / size * 1e6 if size else None,
+                        })
+
+    out.write(f"{options['repeat']} renders per row, render time only")
+    write_table(out, results, [
+        ('profile', 'profile'), ('page', 'page'), ('notes', 'notes'), ('p50_ms', 'p50 ms'),
+        ('per_note_us', 'per note µs'),
+    ])
+    return results
+
+
+def _engine(name, template_options):
+    configured = settings.TEMPLATES[0]
+    options = {key: value for key, value in configured['OPTIONS'].items() if key not in ('loaders', 'debug')}
+    options.update(template_options)
+    return DjangoTemplates({'NAME': name, 'DIRS': configured['DIRS'], 'APP_DIRS': False, 'OPTIONS': options})
+
+
+def _fragment_cache(enabled):
+    backend = 'django.core.cache.backends.locmem.LocMemCache' if enabled else 'django.core.cache.backends.dummy.DummyCache'
+    return override_settings(CACHES={
+        **settings.CACHES,
+        'template_fragments': {'BACKEND': backend, 'LOCATION': 'noteshub-bench-fragments'},
+    })
+
+
+def _time_render(engine, template_name, context, request, repeat, cold):
+    fragments = caches['template_fragments']
+    # One untimed render compiles the templates (cached loader) and fills the fragments.
+    engine.get_template(template_name).render(context, request)
+    timings = []
+    for _ in range(repeat):
+        if cold:
+            fragments.clear()
+        started = time.perf_counter()
+        engine.get_template(template_name).render(context, request)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
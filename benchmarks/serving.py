@@ -0,0 +1,145 @@
+"""
+Sync vs async delivery under the same load.
+
+``clients`` slow readers hit one view at once. The sync path runs on a fixed
+pool of ``threads`` worker threads, as under a threaded WSGI server, and each
+reader keeps its thread until the last chunk is consumed. The async path runs
+every reader on one event loop through the ASGI handler.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.test import AsyncClient, Client
+
+from . import create_note, isolated_environment, percentiles, write_table
+
+SCENARIOS = {
+    'download': '/bench/{mode}/view/{note_id}/',
+    'dashboard': '/bench/{mode}/studentdashboard/',
+}
+
+
+def add_arguments(parser):
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), default='download')
+    parser.add_argument('--clients', type=int, default=200, help='Concurrent readers (default: 200).')
+    parser.add_argument('--threads', type=int, default=16, help='Sync worker threads (default: 16).')
+    parser.add_argument('--size-kb', type=int, default=2048, help='PDF size in KiB (default: 2048).')
+    parser.add_argument('--chunk-delay', type=float, default=0.002,
+                        help='Seconds a slow client waits per chunk received (default: 0.002).')
+
+
+def run(options, out):
+    with isolated_environment(ROOT_URLCONF='benchmarks.urls'):
+        from noteshub.models import CustomUser
+
+        student = CustomUser.objects.create_user('BENCH1', password='bench', is_student=True)
+        note = create_note(student, options['size_kb'] * 1024)
+        path = SCENARIOS[options['scenario']]
+
+        results = [
+            _run_sync(student, path.format(mode='sync', note_id=note.id), options),
+            _run_async(student, path.format(mode='async', note_id=note.id), options),
+        ]
+
+    out.write(
+        f"{options['scenario']}: {options['clients']} clients, {options['size_kb']} KiB, "
+        f"{options['chunk_delay'] * 1000:.1f} ms per chunk, {options['threads']} sync threads"
+    )
+    write_table(out, results, [
+        ('mode', 'mode'), ('wall_s', 'wall s'), ('req_s', 'req/s'), ('mb_s', 'MB/s'),
+        ('p50_ms', 'p50 ms'), ('p95_ms', 'p95 ms'), ('p99_ms', 'p99 ms'),
+        ('peak_threads', 'threads'), ('errors', 'errors'),
+    ])
+    return results
+
+
+def _summary(mode, latencies, transferred, wall, peak_threads, errors):
+    stats = percentiles(latencies)
+    return {
+        'mode': mode,
+        'wall_s': wall,
+        'req_s': len(latencies) / wall if wall else None,
+        'mb_s': transferred / wall / 1e6 if wall else None,
+        'p50_ms': stats['p50'] and stats['p50'] * 1000,
+        'p95_ms': stats['p95'] and stats['p95'] * 1000,
+        'p99_ms': stats['p99'] and stats['p99'] * 1000,
+        'peak_threads': peak_threads,
+        'errors': errors,
+    }
+
+
+class _ThreadWatcher(threading.Thread):
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.peak = threading.active_count()
+        self.done = threading.Event()
+
+    def run(self):
+        while not self.done.wait(0.01):
+            self.peak = max(self.peak, threading.active_count())
+
+
+def _run_sync(user, path, options):
+    local = threading.local()
+    delay = options['chunk_delay']
+
+    def read(started):
+        if not hasattr(local, 'client'):
+            local.client = Client()
+            local.client.force_login(user)
+        response = local.client.get(path)
+        size = 0
+        chunks = response.streaming_content if response.streaming else [response.content]
+        for chunk in chunks:
+            size += len(chunk)
+            time.sleep(delay)
+        response.close()
+        return response.status_code, size, time.perf_counter() - started
+
+    watcher = _ThreadWatcher()
+    watcher.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+        outcomes = list(pool.map(read, [started] * options['clients']))
+    wall = time.perf_counter() - started
+    watcher.done.set()
+    return _summarize_outcomes('sync', outcomes, wall, watcher.peak)
+
+
+def _run_async(user, path, options):
+    delay = options['chunk_delay']
+
+    async def main():
+        client = AsyncClient()
+        await client.aforce_login(user)
+
+        async def read(started):
+            response = await client.get(path)
+            size = 0
+            if response.streaming:
+                async for chunk in response.streaming_content:
+                    size += len(chunk)
+                    await asyncio.sleep(delay)
+            else:
+                size = len(response.content)
+                await asyncio.sleep(delay)
+            return response.status_code, size, time.perf_counter() - started
+
+        started = time.perf_counter()
+        outcomes = await asyncio.gather(*(read(started) for _ in range(options['clients'])))
+        return outcomes, time.perf_counter() - started
+
+    watcher = _ThreadWatcher()
+    watcher.start()
+    outcomes, wall = asyncio.run(main())
+    watcher.done.set()
+    return _summarize_outcomes('async', outcomes, wall, watcher.peak)
+
+
+def _summarize_outcomes(mode, outcomes, wall, peak_threads):
+    latencies = [elapsed for status, _, elapsed in outcomes if status == 200]
+    transferred = sum(size for status, size, _ in outcomes if status == 200)
+    errors = sum(1 for status, _, _ in outcomes if status != 200)
+    return _summary(mode, latencies, transferred, wall, peak_threads, errors)
@@ -0,0 +1,155 @@
+"""
+Form upload time and peak memory per PDF size, stock handlers vs PdfUploadHandler.
+
+Uploads go through the full WSGI handler with the multipart body read from a
+file, the way a server hands it over from the socket, so the peak memory
+(tracemalloc, Python allocations) is the server side only. ``stock`` is the
+teacher upload view with Django's default handlers: files up to
+FILE_UPLOAD_MAX_MEMORY_SIZE are buffered in memory, larger ones spooled to
+FILE_UPLOAD_TEMP_DIR, then sniffed and hashed again on save. Sizes over the
+limit show how much of the body each variant reads before refusing it.
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.handlers.wsgi import WSGIHandler, WSGIRequest
+from django.test import Client
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+
+from . import isolated_environment, make_pdf, percentiles, write_table
+
+MIB = 1024 * 1024
+
+VARIANTS = {
+    'stock': '/bench/stock/teacherupload/',
+    'streaming': '/teacherlogin/teacherupload/',
+}
+
+
+class _BenchRequest(WSGIRequest):
+    # The body files carry no CSRF token; the views' own checks are what is measured.
+    _dont_enforce_csrf_checks = True
+
+
+class _BenchHandler(WSGIHandler):
+    request_class = _BenchRequest
+
+
+class _CountingReader:
+    def __init__(self, f):
+        self.f = f
+        self.read_bytes = 0
+
+    def read(self, size=-1):
+        data = self.f.read(size)
+        self.read_bytes += len(data)
+        return data
+
+    def readline(self, size=-1):
+        data = self.f.readline(size)
+        self.read_bytes += len(data)
+        return data
+
+
+def add_arguments(parser):
+    parser.add_argument('--sizes', default='1,2,5,10,11',
+                        help='Comma-separated PDF sizes in MiB (default: 1,2,5,10,11).')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed uploads per size and variant (default: 5).')
+
+
+def run(options, out):
+    results = []
+    with isolated_environment(ROOT_URLCONF='benchmarks.urls') as media_root:
+        from noteshub.models import CustomUser
+
+        teacher = CustomUser.objects.create_user('BENCH1', password='bench', username='bench', is_teacher=True)
+        client = Client()
+        client.force_login(teacher)
+        cookie = f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+        handler = _BenchHandler()
+        body_path = os.path.join(media_root, 'upload-body')
+
+        seed = 0
+        for size_mb in (float(size) for size in options['sizes'].split(',')):
+            for variant, path in VARIANTS.items():
+                timings, outcome = [], None
+                # One extra traced upload for peak memory; tracemalloc slows the timed ones.
+                for attempt in range(options['repeat'] + 1):
+                    seed += 1
+                    _write_body(body_path, int(size_mb * MIB), seed)
+                    traced = attempt == options['repeat']
+                    if traced:
+                        tracemalloc.start()
+                        baseline = tracemalloc.get_traced_memory()[0]
+                    started = time.perf_counter()
+                    status, read_bytes = _upload(handler, cookie, path, body_path)
+                    elapsed = time.perf_counter() - started
+                    if traced:
+                        peak = tracemalloc.get_traced_memory()[1] - baseline
+                        tracemalloc.stop()
+                    else:
+                        timings.append(elapsed)
+                    outcome = 'stored' if status == 302 else f'rejected ({status})'
+
+                stats = percentiles(timings)
+                results.append({
+                    'size_mb': size_mb,
+                    'variant': variant,
+                    'outcome': outcome,
+                    'p50_ms': stats['p50'] and stats['p50'] * 1000,
+                    'max_ms': stats['max'] and stats['max'] * 1000,
+                    'peak_kb': peak / 1024,
+                    'read_mb': read_bytes / MIB,
+                })
+
+    out.write(f"{options['repeat']} uploads per row, memory limit "
+              f"{settings.FILE_UPLOAD_MAX_MEMORY_SIZE / MIB:.1f} MiB for the stock handlers")
+    write_table(out, results, [
+        ('size_mb', 'MiB'), ('variant', 'variant'), ('outcome', 'outcome'), ('p50_ms', 'p50 ms'),
+        ('max_ms', 'max ms'), ('peak_kb', 'peak KiB'), ('read_mb', 'read MiB'),
+    ])
+    return results
+
+
+def _write_body(body_path, size, seed):
+    fields = {
+        'year': '1',
+        'branch': 'CSE',
+        'subject': 'Benchmarks',
+        'chapter': f'Chapter {seed}',
+        'pdf': SimpleUploadedFile(f'bench-{seed}.pdf', make_pdf(size, seed), 'application/pdf'),
+    }
+    with open(body_path, 'wb') as f:
+        f.write(encode_multipart(BOUNDARY, fields))
+
+
+def _upload(handler, cookie, path, body_path):
+    with open(body_path, 'rb') as body:
+        stream = _CountingReader(body)
+        environ = {
+            'REQUEST_METHOD': 'POST',
+            'PATH_INFO': path,
+            'SCRIPT_NAME': '',
+            'QUERY_STRING': '',
+            'SERVER_NAME': 'testserver',
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'REMOTE_ADDR': '127.0.0.1',
+            'HTTP_HOST': 'testserver',
+            'HTTP_COOKIE': cookie,
+            'CONTENT_TYPE': MULTIPART_CONTENT,
+            'CONTENT_LENGTH': str(os.path.getsize(body_path)),
+            'wsgi.input': stream,
+            'wsgi.errors': sys.stderr,
+            'wsgi.url_scheme': 'http',
+        }
+        status = []
+        response = handler(environ, lambda line, headers, exc_info=None: status.append(line))
+        for _ in response:
+            pass
+        response.close()
+    return int(status[0].split()[0]), stream.read_bytes
@@ -0,0 +1,15 @@
+from django.contrib.auth.decorators import login_required
+from django.urls import include, path
+
+from noteshub import async_views, views
+
+# Both implementations side by side, plus the normal routes for reverse().
+urlpatterns = [
+    path('bench/sync/view/<int:note_id>/', views.view_note),
+    path('bench/async/view/<int:note_id>/', async_views.view_note),
+    path('bench/sync/studentdashboard/', views.studentdashboard),
+    path('bench/async/studentdashboard/', async_views.studentdashboard),
+    # The upload view without PdfUploadHandler, i.e. Django's default handlers.
+    path('bench/stock/teacherupload/', login_required(views._teacherupload)),
+    path('', include('noteshub.urls')),
+]
@@ -40,6 +40,10 @@ INSTALLED_APPS = [
     'noteshub',
 ]
 
+# `manage.py benchmark` (the top-level benchmarks package) is for development only.
+if DEBUG:
+    INSTALLED_APPS.append('benchmarks')
+
 # Custom user model
 AUTH_USER_MODEL = 'noteshub.CustomUser'
 LOGIN_URL = 'noteshub/studentlogin'
@@ -49,6 +53,15 @@ AUTHENTICATION_BACKENDS = [
     'django.contrib.auth.backends.ModelBackend',
 ]
 
+# Seconds CustomAuthBackend.get_user keeps users in the cache (0 = off).
+# Entries are dropped whenever the user is saved or deleted, but only in the
+# cache alias below: with per-process LocMem caches another web process keeps
+# serving a deleted user or an old password hash until the TTL runs out.
+# The 'sessions' alias is shared once NOTESHUB_SESSION_CACHE_URL is set; without
+# it, keep the TTL to a few seconds.
+NOTESHUB_USER_CACHE_TTL = int(os.environ.get('NOTESHUB_USER_CACHE_TTL', 0))
+NOTESHUB_USER_CACHE_ALIAS = 'sessions'
+
 
 # Migration settings
 MIGRATION_MODULES = {
@@ -65,6 +78,8 @@ import sys
 sys.path.append(str(BASE_DIR.parent))
 
 MIDDLEWARE = [
+    # Opt-in per-view query/latency report (NOTESHUB_PROFILING below)
+    'noteshub.profiling.QueryStatsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -91,19 +106,165 @@ TEMPLATES = [
     },
 ]
 
+# NOTESHUB_RENDER_PROFILE=production compiles every template once per process
+# (cached loader, never re-checked on disk) and drops the debug bookkeeping
+# kept for error pages. 'development' keeps Django's defaults, which follow
+# DEBUG and reload edited templates.
+NOTESHUB_RENDER_PROFILE = os.environ.get('NOTESHUB_RENDER_PROFILE', 'development' if DEBUG else 'production')
+if NOTESHUB_RENDER_PROFILE == 'production':
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['debug'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+
 WSGI_APPLICATION = 'collegenotes.wsgi.application'
 
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# NOTESHUB_DB_PROFILE picks the backend: 'sqlite' (default) or 'postgres'.
+# Connections are reused for NOTESHUB_DB_CONN_MAX_AGE seconds and checked
+# before reuse instead of being opened for every request.
+NOTESHUB_DB_PROFILE = os.environ.get('NOTESHUB_DB_PROFILE', 'sqlite')
+NOTESHUB_DB_CONN_MAX_AGE = int(os.environ.get('NOTESHUB_DB_CONN_MAX_AGE', 60))
+
+# SQLite: WAL lets readers run while one writer commits, synchronous=NORMAL
+# only syncs at checkpoints (safe in WAL mode), writers wait up to `timeout`
+# seconds for the lock instead of failing with "database is locked", and
+# IMMEDIATE transactions take the write lock up front so two transactions
+# never deadlock upgrading from a read lock.
+SQLITE_OPTIONS = {
+    'init_command': (
+        'PRAGMA journal_mode=WAL;'
+        'PRAGMA synchronous=NORMAL;'
+        'PRAGMA mmap_size=268435456;'
+        'PRAGMA temp_store=MEMORY;'
+    ),
+    'timeout': 20,
+    'transaction_mode': 'IMMEDIATE',
+}
+
+if NOTESHUB_DB_PROFILE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('NOTESHUB_DB_NAME', 'noteshub'),
+            'USER': os.environ.get('NOTESHUB_DB_USER', ''),
+            'PASSWORD': os.environ.get('NOTESHUB_DB_PASSWORD', ''),
+            'HOST': os.environ.get('NOTESHUB_DB_HOST', ''),
+            'PORT': os.environ.get('NOTESHUB_DB_PORT', ''),
+            'CONN_MAX_AGE': NOTESHUB_DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
+    }
+    # NOTESHUB_DB_POOL=1 keeps a psycopg 3 pool per process instead
+    # (needs psycopg[pool]; Django requires CONN_MAX_AGE=0 with it).
+    if os.environ.get('NOTESHUB_DB_POOL') == '1':
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('NOTESHUB_DB_POOL_MIN', 2)),
+            'max_size': int(os.environ.get('NOTESHUB_DB_POOL_MAX', 10)),
+            'timeout': 10,
+        }
+    # Behind PgBouncer in transaction mode, named cursors cannot span transactions.
+    if os.environ.get('NOTESHUB_DB_PGBOUNCER') == '1':
+        DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'CONN_MAX_AGE': NOTESHUB_DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': SQLITE_OPTIONS,
+        }
     }
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# LocMemCache evicts least-recently-used entries once MAX_ENTRIES is reached.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'noteshub',
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+            'CULL_FREQUENCY': 10,
+        },
+    },
+    # Per-note card fragments ({% cache %} in the card includes); one entry
+    # per note and variant, so it gets more room than 'default'.
+    'template_fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'noteshub-fragments',
+        'OPTIONS': {
+            'MAX_ENTRIES': 20000,
+            'CULL_FREQUENCY': 10,
+        },
+    },
+    # Kept apart from 'default' so fragment churn never evicts a session.
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'noteshub-sessions',
+        'OPTIONS': {
+            'MAX_ENTRIES': 20000,
+        },
+    },
 }
 
+# With several web processes the session cache must be shared, otherwise a
+# process can serve a stale copy of a session another process changed.
+if os.environ.get('NOTESHUB_SESSION_CACHE_URL'):
+    CACHES['sessions'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['NOTESHUB_SESSION_CACHE_URL'],
+    }
+
+
+# Sessions
+# https://docs.djangoproject.com/en/5.2/topics/http/sessions/
+# 'cached_db' (default): write-through cache over the session table that
+# skips unchanged saves, see noteshub.sessions. 'signed_cookies': no server
+# state at all. 'db': Django's plain database sessions.
+# Expired rows are removed by `manage.py purge_sessions --every 3600`.
+# Chunked uploads idle for a day are aborted (and their .part files
+# deleted) by `manage.py purge_uploads --every 3600`.
+
+SESSION_ENGINE = {
+    'cached_db': 'noteshub.sessions',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+    'db': 'django.contrib.sessions.backends.db',
+}[os.environ.get('NOTESHUB_SESSION_ENGINE', 'cached_db')]
+SESSION_CACHE_ALIAS = 'sessions'
+
+
+# Password hashing
+# https://docs.djangoproject.com/en/5.2/topics/auth/passwords/
+# NOTESHUB_FAST_PASSWORD_HASHER=1 prefers PBKDF2 with fewer iterations to
+# survive exam-time login bursts; passwords are rehashed on their next login.
+
+NOTESHUB_FAST_PASSWORD_HASHER = os.environ.get('NOTESHUB_FAST_PASSWORD_HASHER') == '1'
+NOTESHUB_FAST_HASHER_ITERATIONS = int(os.environ.get('NOTESHUB_FAST_HASHER_ITERATIONS', 200_000))
+
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'noteshub.hashers.FastPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+if NOTESHUB_FAST_PASSWORD_HASHER:
+    PASSWORD_HASHERS.insert(0, PASSWORD_HASHERS.pop(1))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -131,6 +292,39 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 import os
 os.makedirs(os.path.join(MEDIA_ROOT, 'noteshub', 'Notes_pdfs'), exist_ok=True)
 
+# PDF delivery: when a proxy can read MEDIA_ROOT, set this to 'nginx'
+# (X-Accel-Redirect to an `internal` location at NOTESHUB_SENDFILE_URL) or
+# 'xsendfile' (Apache/lighttpd) so workers stop streaming files themselves.
+NOTESHUB_SENDFILE_BACKEND = os.environ.get('NOTESHUB_SENDFILE_BACKEND') or None
+NOTESHUB_SENDFILE_URL = '/protected-media/'
+
+# First-page previews, rendered by `manage.py process_notes`; the least
+# recently served are evicted once the directory grows past the limit.
+NOTESHUB_PREVIEW_DIR = os.path.join(MEDIA_ROOT, 'noteshub', 'previews')
+NOTESHUB_PREVIEW_CACHE_BYTES = int(os.environ.get('NOTESHUB_PREVIEW_CACHE_BYTES', 256 * 1024 * 1024))
+
+# View/download counters are buffered per process and written in batches
+# of this many events, or after this many seconds, whichever comes first.
+NOTESHUB_ANALYTICS = os.environ.get('NOTESHUB_ANALYTICS', '1') == '1'
+NOTESHUB_ANALYTICS_FLUSH_EVENTS = 500
+NOTESHUB_ANALYTICS_FLUSH_INTERVAL = 10
+
+# Full-text search ranks at most this many matches per query, after the
+# year/branch/subject/status filters; the dashboards page through those
+# newest first, so older matches past the cap are not listed.
+NOTESHUB_SEARCH_MAX_RESULTS = int(os.environ.get('NOTESHUB_SEARCH_MAX_RESULTS', 1000))
+
+# Route PDF delivery, dashboards and moderation to noteshub.async_views.
+# Turn on when serving through asgi.py; sync views stay faster under WSGI.
+NOTESHUB_ASYNC_VIEWS = os.environ.get('NOTESHUB_ASYNC_VIEWS') == '1'
+
+# Per-view query count, DB/template time, latency and response size report.
+# Off unless NOTESHUB_PROFILING=1; each process dumps its samples to
+# NOTESHUB_PROFILING_DIR for `manage.py profile_report`.
+NOTESHUB_PROFILING = os.environ.get('NOTESHUB_PROFILING') == '1'
+NOTESHUB_PROFILING_DIR = os.environ.get('NOTESHUB_PROFILING_DIR', os.path.join(BASE_DIR, 'profiling'))
+NOTESHUB_PROFILING_DUMP_INTERVAL = 30
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -148,6 +342,18 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
 STATIC_URL = 'static/'
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+
+# collectstatic writes content-hashed copies plus .gz/.br siblings
+# (noteshub.assets); templates link the hashed names via {% static %}.
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'noteshub.assets.CompressedManifestStaticFilesStorage'},
+}
+
+# Serve STATIC_ROOT from Django with far-future caching when no proxy does.
+# Under runserver with DEBUG on, the staticfiles app serves the source files.
+NOTESHUB_SERVE_STATIC = os.environ.get('NOTESHUB_SERVE_STATIC', '1') == '1'
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
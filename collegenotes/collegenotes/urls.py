@@ -14,10 +14,13 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+import re
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
+
+from noteshub import assets
 
 
 urlpatterns = [
@@ -25,6 +28,8 @@ urlpatterns = [
     path('', include('noteshub.urls')),
     
 ]
-# Serve media files during development
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+# MEDIA_ROOT holds the note PDFs and previews; they are only served through
+# the noteshub views, which check who may see each note, never as /media/.
+# Collected, hashed and pre-compressed static files
+if settings.NOTESHUB_SERVE_STATIC:
+    urlpatterns += [re_path(r'^%s(?P<path>.*)$' % re.escape(settings.STATIC_URL.lstrip('/')), assets.serve)]
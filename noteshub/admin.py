@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.utils.translation import gettext_lazy as _
-from .models import CustomUser, Notes
+from .models import CustomUser, Notes, ProcessingJob
 from .forms import CustomUserCreationForm, CustomUserChangeForm
 
 # Custom admin for CustomUser
@@ -54,3 +54,11 @@ class CustomUserAdmin(UserAdmin):
 
 admin.site.register(CustomUser, CustomUserAdmin)
 admin.site.register(Notes)
+
+
+class ProcessingJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'note', 'status', 'attempts', 'created_at', 'finished_at')
+    list_filter = ('status',)
+    raw_id_fields = ('note',)
+
+admin.site.register(ProcessingJob, ProcessingJobAdmin)
@@ -0,0 +1,176 @@
+"""
+View/download counters for notes.
+
+A counter UPDATE per PDF request would serialize every reader on the
+database's write lock (SQLite locks the whole file). Instead each process
+counts events in memory and writes them in one short transaction once
+``NOTESHUB_ANALYTICS_FLUSH_EVENTS`` events are buffered or
+``NOTESHUB_ANALYTICS_FLUSH_INTERVAL`` seconds have passed: missing rollup
+rows are bulk-inserted, then each rollup table gets one
+``UPDATE ... SET n = n + CASE ... END``. Events still buffered when a process
+is killed are lost, which is fine for popularity figures.
+"""
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, models, transaction
+from django.db.models import Case, F, Sum, Value, When
+from django.utils import timezone
+
+from .models import NoteDailyStats, Notes, NoteStats
+
+logger = logging.getLogger(__name__)
+
+# Event kind -> counter column
+FIELDS = {
+    'view': 'views',
+    'download': 'downloads',
+}
+
+POPULAR_DAYS = 7
+
+
+class EventBuffer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._events = Counter()
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def add(self, note_id, kind):
+        """Count one event; returns True when the buffer is due for a flush."""
+        with self._lock:
+            self._events[note_id, timezone.localdate(), kind] += 1
+            self._pending += 1
+            return (
+                self._pending >= settings.NOTESHUB_ANALYTICS_FLUSH_EVENTS
+                or time.monotonic() - self._last_flush >= settings.NOTESHUB_ANALYTICS_FLUSH_INTERVAL
+            )
+
+    def flush(self):
+        """Write the buffered events; returns how many were written."""
+        # One writer per process; events keep accumulating meanwhile.
+        if not self._flush_lock.acquire(blocking=False):
+            return 0
+        try:
+            with self._lock:
+                events, self._events = self._events, Counter()
+                self._pending = 0
+                self._last_flush = time.monotonic()
+            if not events:
+                return 0
+            try:
+                write_events(events)
+            except DatabaseError:
+                logger.exception('Could not write %d note events; keeping them for the next flush.', sum(events.values()))
+                with self._lock:
+                    self._events.update(events)
+                    self._pending += sum(events.values())
+                return 0
+            return sum(events.values())
+        finally:
+            self._flush_lock.release()
+
+    def discard(self):
+        """Drop the buffered events without writing them."""
+        with self._lock:
+            self._events = Counter()
+            self._pending = 0
+
+
+buffer = EventBuffer()
+atexit.register(buffer.flush)
+
+
+def _counts_update(totals, key_fields):
+    """``{field: F(field) + CASE WHEN <key> THEN n ... END}`` for one UPDATE."""
+    updates = {}
+    for field in FIELDS.values():
+        whens = [
+            When(**dict(zip(key_fields, key)), then=Value(counts[field]))
+            for key, counts in totals.items() if counts[field]
+        ]
+        updates[field] = F(field) + Case(*whens, default=Value(0), output_field=models.PositiveIntegerField())
+    return updates
+
+
+def write_events(events):
+    """Add ``{(note_id, day, kind): count}`` to NoteStats and NoteDailyStats."""
+    totals = defaultdict(Counter)
+    daily = defaultdict(Counter)
+    for (note_id, day, kind), count in events.items():
+        totals[note_id][FIELDS[kind]] += count
+        daily[note_id, day][FIELDS[kind]] += count
+
+    with transaction.atomic():
+        # Notes deleted since the event was counted have nothing to attach to.
+        existing = set(Notes.objects.filter(id__in=list(totals)).values_list('id', flat=True))
+        totals = {(note_id,): counts for note_id, counts in totals.items() if note_id in existing}
+        daily = {key: counts for key, counts in daily.items() if key[0] in existing}
+        if not totals:
+            return
+
+        NoteStats.objects.bulk_create([NoteStats(note_id=note_id) for note_id, in totals], ignore_conflicts=True)
+        NoteStats.objects.filter(note_id__in=existing).update(**_counts_update(totals, ('note_id',)))
+
+        NoteDailyStats.objects.bulk_create(
+            [NoteDailyStats(note_id=note_id, day=day) for note_id, day in daily],
+            ignore_conflicts=True,
+        )
+        NoteDailyStats.objects.filter(
+            note_id__in=existing,
+            day__in={day for _, day in daily},
+        ).update(**_counts_update(daily, ('note_id', 'day')))
+
+
+# ===================== RECORDING =====================
+def _counts_as_read(request, response):
+    # Revalidations (304) and unsatisfiable ranges (416) send no document.
+    handed_off = response.has_header('X-Accel-Redirect') or response.has_header('X-Sendfile')
+    if response.status_code == 200 and not handed_off:
+        return True
+    if response.status_code not in (200, 206):
+        return False
+    # PDF viewers fetch a document in many Range requests (a proxy hand-off
+    # answers them itself); only count the one that starts at the beginning.
+    header = request.headers.get('Range', '')
+    return not header or header.replace(' ', '').startswith('bytes=0-')
+
+
+def record(request, response, note, kind):
+    """Count ``response`` to ``request`` as a ``kind`` event for ``note`` if it delivers the document."""
+    if settings.NOTESHUB_ANALYTICS and _counts_as_read(request, response) and buffer.add(note.id, kind):
+        buffer.flush()
+
+
+async def arecord(request, response, note, kind):
+    if settings.NOTESHUB_ANALYTICS and _counts_as_read(request, response) and buffer.add(note.id, kind):
+        await sync_to_async(buffer.flush)()
+
+
+# ===================== ROLLUPS =====================
+def popular_this_week(limit=12, year=None, branch=None, subject=None):
+    """Approved notes with the most downloads over the last POPULAR_DAYS days, as NoteRows."""
+    since = timezone.localdate() - timedelta(days=POPULAR_DAYS - 1)
+    stats = NoteDailyStats.objects.filter(day__gte=since, downloads__gt=0, note__status='approved')
+    if year:
+        stats = stats.filter(note__year=year)
+    if branch:
+        stats = stats.filter(note__branch=branch)
+    if subject:
+        stats = stats.filter(note__subject=subject)
+    ids = list(
+        stats.values('note_id')
+        .annotate(total=Sum('downloads'))
+        .order_by('-total', '-note_id')
+        .values_list('note_id', flat=True)[:limit]
+    )
+    rows = {row.id: row for row in Notes.objects.rows().filter(id__in=ids)}
+    return [rows[note_id] for note_id in ids if note_id in rows]
@@ -0,0 +1,132 @@
+"""
+Static asset pipeline.
+
+``CompressedManifestStaticFilesStorage`` is Django's manifest storage (file
+names carry a hash of their content, so a changed file gets a new URL) that
+also writes ``.gz`` and, when the ``brotli`` package is installed, ``.br``
+siblings of every hashed text asset during ``collectstatic``. ``serve``
+answers STATIC_URL requests from STATIC_ROOT with the smallest encoding the
+client accepts; hashed names never change, so they are cached for a year
+without revalidation. A front-end proxy can serve the same files instead
+(nginx ``gzip_static``/``brotli_static`` on STATIC_ROOT).
+"""
+import gzip
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.svg', '.json', '.txt', '.map', '.html', '.xml'}
+
+# Files smaller than this fit in one packet either way.
+MIN_COMPRESS_SIZE = 256
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# 'css/site.55e7cf3a9b2c.css' -> base 'css/site', ext '.css' (ManifestStaticFilesStorage naming)
+HASHED_NAME_RE = re.compile(r'^(?P<base>.+)\.[0-9a-f]{12}(?P<ext>\.[^./]+)?$')
+
+# encoding -> file suffix, in order of preference
+ENCODINGS = {'br': '.br', 'gzip': '.gz'}
+
+
+def _gzip(data):
+    # mtime=0 keeps the output identical across collectstatic runs.
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _brotli(data):
+    return brotli.compress(data, quality=11)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        compressors = [('.gz', _gzip)] + ([('.br', _brotli)] if brotli is not None else [])
+        for name in set(self.hashed_files.values()):
+            if os.path.splitext(name)[1] not in COMPRESSIBLE_EXTENSIONS or not self.exists(name):
+                continue
+            with self.open(name) as f:
+                data = f.read()
+            if len(data) < MIN_COMPRESS_SIZE:
+                continue
+            for suffix, compress in compressors:
+                compressed = compress(data)
+                # Only keep encodings that actually save bytes.
+                if len(compressed) < len(data):
+                    with open(self.path(name + suffix), 'wb') as f:
+                        f.write(compressed)
+                    yield name + suffix, name + suffix, True
+
+
+# ===================== SERVING =====================
+def _is_hashed(name):
+    match = HASHED_NAME_RE.match(name)
+    hashed_files = getattr(staticfiles_storage, 'hashed_files', None) or {}
+    return match is not None and hashed_files.get(match['base'] + (match['ext'] or '')) == name
+
+
+def _accepted_encodings(request):
+    accepted = set()
+    for part in request.headers.get('Accept-Encoding', '').split(','):
+        coding, _, params = part.partition(';')
+        name, _, value = params.strip().partition('=')
+        try:
+            if name.strip() == 'q' and float(value) <= 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def serve(request, path):
+    """Serve a collected static file, pre-compressed when the client allows it."""
+    if not settings.STATIC_ROOT:
+        raise Http404('STATIC_ROOT is not set.')
+    try:
+        full_path = safe_join(settings.STATIC_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404('Static file not found.')
+    if not os.path.isfile(full_path):
+        raise Http404('Static file not found.')
+
+    accepted = _accepted_encodings(request)
+    encoding, body_path = None, full_path
+    for candidate, suffix in ENCODINGS.items():
+        if candidate in accepted and os.path.isfile(full_path + suffix):
+            encoding, body_path = candidate, full_path + suffix
+            break
+
+    stat = os.stat(body_path)
+    # Each encoding is a different representation, so it gets its own ETag.
+    etag = f'"{stat.st_size:x}-{int(stat.st_mtime):x}{"-" + encoding if encoding else ""}"'
+    response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if response is None:
+        content_type, _ = mimetypes.guess_type(full_path)
+        response = FileResponse(
+            open(body_path, 'rb'),
+            content_type=content_type or 'application/octet-stream',
+            filename=os.path.basename(full_path),
+        )
+        if encoding:
+            response['Content-Encoding'] = encoding
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(int(stat.st_mtime))
+    response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL if _is_hashed(path) else 'public, no-cache'
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
@@ -0,0 +1,211 @@
+"""
+ASGI versions of the hot views, used when ``NOTESHUB_ASYNC_VIEWS`` is on.
+
+They behave exactly like their counterparts in ``views`` but never block the
+event loop: the ORM is used through its async API, PDFs are streamed through
+``aserve_pdf``, and the remaining sync-only pieces (raw search SQL,
+transactions, full-page template rendering with context processors) run in
+a worker thread via ``sync_to_async``.
+"""
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.http import JsonResponse
+from django.shortcuts import redirect, render
+from django.template.loader import render_to_string
+from django.views.decorators.http import require_POST
+
+from . import analytics, caching, catalog, counters, moderation
+from .models import Notes
+from .pagination import KeysetPaginator
+from .serving import aserve_pdf
+from .views import _bulk_moderation_response, _parse_bulk_moderation
+
+arender = sync_to_async(render)
+
+
+def _is_ajax(request):
+    return request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+
+
+# ===================== PDF DELIVERY =====================
+async def _pdf_response(request, note_id, disposition, denied_message):
+    user = await request.auser()
+    note = await Notes.objects.filter(id=note_id).afirst()
+    if note is None:
+        if _is_ajax(request):
+            return JsonResponse({'status': 'error', 'message': 'Note not found'})
+        messages.error(request, 'Note not found')
+        return redirect('studentdashboard')
+
+    # Only approved notes (or their own uploads) for students, all notes for teachers
+    if not user.is_teacher and note.status != 'approved' and note.uploader_id != user.id:
+        if _is_ajax(request):
+            return JsonResponse({'status': 'error', 'message': 'Note not accessible'})
+        messages.error(request, denied_message)
+        return redirect('studentdashboard')
+
+    response = await aserve_pdf(request, note, disposition)
+    await analytics.arecord(request, response, note, 'view' if disposition == 'inline' else 'download')
+    return response
+
+
+@login_required
+async def view_note(request, note_id):
+    return await _pdf_response(request, note_id, 'inline', 'You cannot view this note as it is not approved yet.')
+
+
+@login_required
+async def download_note(request, note_id):
+    return await _pdf_response(request, note_id, 'attachment', 'You cannot download this note as it is not approved yet.')
+
+
+# ===================== DASHBOARDS =====================
+@login_required(login_url='studentlogin')
+async def studentdashboard(request):
+    user = await request.auser()
+    if not user.is_student:
+        return redirect('landingpage')
+
+    year = request.GET.get('year')
+    branch = request.GET.get('branch')
+    subject = request.GET.get('subject')
+    search_query = request.GET.get('search', '')
+    after = request.GET.get('after')
+    before = request.GET.get('before')
+    sort = request.GET.get('sort', '')
+
+    async def render_catalog():
+        # The search runs raw SQL, so the queryset is built in a worker thread.
+        notes = await sync_to_async(catalog.approved_notes)(year, branch, subject, search_query)
+        page_obj = await KeysetPaginator(notes, 12).aget_page(after=after, before=before)
+        return render_to_string('noteshub/includes/catalog_grid.html', {
+            'notes': page_obj,
+            'page_obj': page_obj,
+            'year': year,
+            'branch': branch,
+            'subject': subject,
+            'search_query': search_query,
+        })
+
+    async def render_popular():
+        # Ranked from the daily rollups only; a single page, no cursors
+        notes = await sync_to_async(analytics.popular_this_week)(12, year, branch, subject)
+        return render_to_string('noteshub/includes/catalog_grid.html', {
+            'notes': notes,
+            'year': year,
+            'branch': branch,
+            'subject': subject,
+            'sort': sort,
+        })
+
+    async def render_uploads():
+        uploads = [row async for row in Notes.objects.uploads_of(user).order_by('-uploaded_at')]
+        return render_to_string('noteshub/includes/my_uploads.html', {'uploads': uploads})
+
+    # Popularity changes with every analytics flush and search results depend
+    # on the index, so only plain filtered views are cached
+    if sort == 'popular':
+        catalog_html = await render_popular()
+    elif search_query:
+        catalog_html = await render_catalog()
+    else:
+        catalog_html = await caching.acatalog_fragment(year, branch, subject, after, before, render_catalog)
+
+    return await arender(request, 'noteshub/studentdashboard.html', {
+        'roll_number': user.roll_number,
+        'catalog_html': catalog_html,
+        'uploads_html': await caching.auploads_fragment(user.id, render_uploads),
+        'upload_counts': await sync_to_async(counters.user_status_counts)(user.id),
+        'year': year,
+        'branch': branch,
+        'subject': subject,
+        'search_query': search_query,
+        'sort': sort,
+    })
+
+
+@login_required
+async def teacherdashboard(request):
+    user = await request.auser()
+    notes = await sync_to_async(moderation.dashboard_notes)(user, request.GET)
+    page_obj = await KeysetPaginator(notes, 10).aget_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
+    return await arender(request, 'noteshub/teacherdashboard.html', {
+        'page_obj': page_obj,
+        'current_tab': request.GET.get('tab', 'pending'),
+        'status_counts': await sync_to_async(counters.status_counts)(),
+        'my_upload_counts': await sync_to_async(counters.user_status_counts)(user.id),
+        'year_filter': request.GET.get('year', ''),
+        'branch_filter': request.GET.get('branch', ''),
+        'subject_filter': request.GET.get('subject', ''),
+        'search_query': request.GET.get('search', ''),
+    })
+
+
+# ===================== MODERATION =====================
+@sync_to_async
+def _save_note(note):
+    # The status counters updated by its post_save handlers commit with it
+    with transaction.atomic():
+        note.save()
+
+
+async def _set_status(request, note_id, status, message):
+    user = await request.auser()
+    note = await Notes.objects.filter(id=note_id).afirst()
+    if note is None:
+        if _is_ajax(request):
+            return JsonResponse({'status': 'error', 'message': 'Note not found'})
+        messages.error(request, 'Note not found')
+        return redirect('teacherdashboard')
+    if not user.is_teacher:
+        return JsonResponse({'status': 'error', 'message': 'Permission denied'})
+
+    note.status = status
+    await _save_note(note)
+
+    if _is_ajax(request):
+        return JsonResponse({'status': 'success', 'message': message})
+    messages.success(request, message)
+    return redirect('teacherdashboard')
+
+
+@login_required
+async def approve_note(request, note_id):
+    return await _set_status(request, note_id, 'approved', 'Note approved successfully!')
+
+
+@login_required
+async def reject_note(request, note_id):
+    return await _set_status(request, note_id, 'rejected', 'Note rejected successfully!')
+
+
+@login_required
+async def pending_note(request, note_id):
+    return await _set_status(request, note_id, 'pending', 'Note status set to pending!')
+
+
+@login_required
+@require_POST
+async def bulk_moderate(request):
+    user = await request.auser()
+    if not user.is_teacher:
+        return JsonResponse({'status': 'error', 'message': 'Permission denied'}, status=403)
+
+    try:
+        status, ids, filters = _parse_bulk_moderation(request)
+    except ValueError as exc:
+        return JsonResponse({'status': 'error', 'message': str(exc)}, status=400)
+
+    # Transactions are sync-only, so the whole batch runs in one worker thread.
+    def run():
+        if filters:
+            return moderation.bulk_set_status(status, queryset=moderation.dashboard_notes(user, filters))
+        return moderation.bulk_set_status(status, ids=ids)
+
+    results = await sync_to_async(run)()
+    return _bulk_moderation_response(request, status, results)
@@ -1,8 +1,23 @@
+from django.conf import settings
 from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth import get_user_model
+from django.core.cache import caches
 
 User = get_user_model()
 
+
+def _user_cache_key(user_id):
+    return f'noteshub:user:{user_id}'
+
+
+def _user_cache():
+    return caches[getattr(settings, 'NOTESHUB_USER_CACHE_ALIAS', 'default')]
+
+
+def forget_user(user_id):
+    # Called from signals whenever a CustomUser is saved or deleted.
+    _user_cache().delete(_user_cache_key(user_id))
+
 class CustomAuthBackend(ModelBackend):
     def authenticate(self, request, username=None, password=None, **kwargs):
         try:
@@ -19,7 +34,18 @@ class CustomAuthBackend(ModelBackend):
             return None
 
     def get_user(self, user_id):
+        # With NOTESHUB_USER_CACHE_TTL set, AuthenticationMiddleware is served
+        # from the cache instead of one query per request. Changes made with
+        # QuerySet.update() bypass the invalidation and show up after the TTL.
+        ttl = getattr(settings, 'NOTESHUB_USER_CACHE_TTL', 0)
+        if ttl:
+            user = _user_cache().get(_user_cache_key(user_id))
+            if user is not None:
+                return user
         try:
-            return User.objects.get(pk=user_id)
+            user = User.objects.get(pk=user_id)
         except User.DoesNotExist:
             return None
+        if ttl:
+            _user_cache().set(_user_cache_key(user_id), user, ttl)
+        return user
@@ -0,0 +1,47 @@
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Notes, PdfBlob
+from .storage import digest_from_name, pdf_storage
+
+
+def attach(note):
+    """Point ``note.blob`` at the blob its file was stored as, adjusting refcounts."""
+    digest = digest_from_name(note.pdf.name)
+    if digest == note.blob_id:
+        return
+    with transaction.atomic():
+        if digest:
+            PdfBlob.objects.get_or_create(digest=digest, defaults={'size': note.pdf.size})
+            # The UPDATE waits for a running _delete_file and then keeps it off
+            # this blob until commit. A delete that got in first has removed the
+            # file storage deduplicated this upload against.
+            referenced = PdfBlob.objects.filter(pk=digest).update(refcount=F('refcount') + 1)
+            if not referenced or not pdf_storage.exists(pdf_storage.blob_name(digest)):
+                raise FileNotFoundError(f'PDF blob {digest} was deleted while it was being stored; upload it again.')
+        previous = note.blob_id
+        note.updated_at = timezone.now()
+        Notes.objects.filter(pk=note.pk).update(blob=digest, updated_at=note.updated_at)
+        note.blob_id = digest
+        if previous:
+            release(previous)
+
+
+def release(digest):
+    """Drop one reference; the file is deleted after commit once nothing points at it."""
+    with transaction.atomic():
+        PdfBlob.objects.filter(pk=digest).update(refcount=F('refcount') - 1)
+        if PdfBlob.objects.filter(pk=digest, refcount__lte=0).exists():
+            transaction.on_commit(lambda: _delete_file(digest))
+
+
+def _delete_file(digest):
+    # Re-checked under the row lock: attach() may have taken a new reference
+    # since the release committed, and it waits on this lock to take another.
+    with transaction.atomic():
+        orphan = PdfBlob.objects.select_for_update().filter(pk=digest, refcount__lte=0).first()
+        if orphan is None:
+            return
+        pdf_storage.delete(pdf_storage.blob_name(digest))
+        orphan.delete()
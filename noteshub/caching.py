@@ -0,0 +1,108 @@
+from hashlib import md5
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db import transaction
+
+FRAGMENT_TIMEOUT = 15 * 60
+
+NOTE_STATE_FIELDS = ('year', 'branch', 'subject', 'status', 'uploader_id')
+
+
+def _digest(*parts):
+    return md5('\x1f'.join(str(part or '') for part in parts).encode()).hexdigest()
+
+
+def _catalog_generation_key(year, branch, subject):
+    return f'noteshub:catalog-gen:{_digest(year, branch, subject)}'
+
+
+def _uploads_generation_key(user_id):
+    return f'noteshub:uploads-gen:{user_id}'
+
+
+def _generation(key):
+    """
+    Current token for an invalidation scope.
+
+    Invalidating a scope deletes its token, so every fragment cached under the
+    old token becomes unreachable and ages out of the LRU on its own.
+    """
+    token = cache.get(key)
+    if token is None:
+        cache.add(key, uuid4().hex, None)
+        token = cache.get(key)
+    return token
+
+
+def _fragment(key, render):
+    html = cache.get(key)
+    if html is None:
+        html = render()
+        cache.set(key, html, FRAGMENT_TIMEOUT)
+    return html
+
+
+def _catalog_key(year, branch, subject, after, before, generation):
+    return f'noteshub:catalog:{_digest(year, branch, subject, after, before, generation)}'
+
+
+def catalog_fragment(year, branch, subject, after, before, render):
+    generation = _generation(_catalog_generation_key(year, branch, subject))
+    return _fragment(_catalog_key(year, branch, subject, after, before, generation), render)
+
+
+def uploads_fragment(user_id, render):
+    generation = _generation(_uploads_generation_key(user_id))
+    return _fragment(f'noteshub:uploads:{user_id}:{generation}', render)
+
+
+# Async twins for the ASGI views; ``render`` is a coroutine function there.
+async def _ageneration(key):
+    token = await cache.aget(key)
+    if token is None:
+        await cache.aadd(key, uuid4().hex, None)
+        token = await cache.aget(key)
+    return token
+
+
+async def _afragment(key, render):
+    html = await cache.aget(key)
+    if html is None:
+        html = await render()
+        await cache.aset(key, html, FRAGMENT_TIMEOUT)
+    return html
+
+
+async def acatalog_fragment(year, branch, subject, after, before, render):
+    generation = await _ageneration(_catalog_generation_key(year, branch, subject))
+    return await _afragment(_catalog_key(year, branch, subject, after, before, generation), render)
+
+
+async def auploads_fragment(user_id, render):
+    generation = await _ageneration(_uploads_generation_key(user_id))
+    return await _afragment(f'noteshub:uploads:{user_id}:{generation}', render)
+
+
+def note_state(note):
+    return {field: getattr(note, field) for field in NOTE_STATE_FIELDS}
+
+
+def invalidate_note_states(states):
+    """
+    Expire exactly the fragments that can contain any of the given note states.
+
+    Runs once the surrounding transaction commits (at once outside one), so a
+    request cannot re-cache the old rows under the new generation.
+    """
+    keys = set()
+    for state in states:
+        keys.add(_uploads_generation_key(state['uploader_id']))
+        if state['status'] != 'approved':
+            continue
+        # A note shows up under its own filters and every "any value" wildcard.
+        for year in (state['year'], ''):
+            for branch in (state['branch'], ''):
+                for subject in (state['subject'], ''):
+                    keys.add(_catalog_generation_key(year, branch, subject))
+    transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,122 @@
+"""
+Read-only JSON catalog of approved notes.
+
+Every Notes change bumps the single ``CatalogVersion`` row in the same
+transaction (see ``signals``), so the version plus the request parameters
+identify a response exactly. The API answers ``If-None-Match`` from that
+strong ETag with one primary-key read and never queries the Notes table for
+an unchanged catalog.
+"""
+from hashlib import md5
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.urls import reverse
+
+from . import search
+from .models import CatalogVersion, Notes
+from .pagination import KeysetPaginator
+
+VERSION_PK = 1
+
+DEFAULT_LIMIT = 12
+MAX_LIMIT = 100
+
+# Request parameters that change the response body, in ETag order
+PARAMETERS = ('year', 'branch', 'subject', 'search', 'after', 'before')
+
+# ?fields= name -> value for a NoteRow
+FIELDS = {
+    'id': lambda row: row.id,
+    'title': lambda row: row.title,
+    'year': lambda row: row.year,
+    'branch': lambda row: row.branch,
+    'subject': lambda row: row.subject,
+    'chapter': lambda row: row.chapter,
+    'uploader': lambda row: row.uploader_name,
+    'uploaded_at': lambda row: row.uploaded_at.isoformat(),
+    'view_url': lambda row: reverse('view_note', args=[row.id]),
+    'download_url': lambda row: reverse('download_note', args=[row.id]),
+    'preview_url': lambda row: reverse('note_preview', args=[row.id, row.blob_id]) if row.blob_id else None,
+}
+
+
+# ===================== VERSION =====================
+def version():
+    return CatalogVersion.objects.filter(pk=VERSION_PK).values_list('version', flat=True).first() or 0
+
+
+def bump_version():
+    with transaction.atomic(savepoint=False):
+        if CatalogVersion.objects.filter(pk=VERSION_PK).update(version=F('version') + 1):
+            return
+        try:
+            # Counter row missing (e.g. flushed database); a concurrent insert wins the race.
+            with transaction.atomic():
+                CatalogVersion.objects.create(pk=VERSION_PK, version=1)
+        except IntegrityError:
+            CatalogVersion.objects.filter(pk=VERSION_PK).update(version=F('version') + 1)
+
+
+# ===================== REQUESTS =====================
+def parse_fields(value):
+    """``'id,title'`` -> ``('id', 'title')``; every field when empty."""
+    if not value:
+        return tuple(FIELDS)
+    fields = tuple(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+    unknown = [name for name in fields if name not in FIELDS]
+    if unknown or not fields:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(FIELDS)}")
+    return fields
+
+
+def parse_limit(value):
+    if not value:
+        return DEFAULT_LIMIT
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError('limit must be a number') from None
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ValueError(f'limit must be between 1 and {MAX_LIMIT}')
+    return limit
+
+
+def etag(catalog_version, params, fields, limit):
+    digest = md5('\x1f'.join(
+        [params.get(name, '') for name in PARAMETERS] + [','.join(fields), str(limit)]
+    ).encode()).hexdigest()
+    return f'"{catalog_version}-{digest}"'
+
+
+def approved_notes(year=None, branch=None, subject=None, search_query=''):
+    """
+    Approved note rows for the catalog filters, ordering left to the paginator.
+
+    A search keeps the ``search.max_results()`` best matches within the
+    filters; the paginator then lists those newest first, not by rank.
+    """
+    notes = Notes.objects.catalog()
+    if year:
+        notes = notes.filter(year=year)
+    if branch:
+        notes = notes.filter(branch=branch)
+    if subject:
+        notes = notes.filter(subject=subject)
+    if search_query:
+        notes = notes.filter(id__in=search.search_ids(
+            search_query, status='approved', year=year, branch=branch, subject=subject,
+        ))
+    return notes
+
+
+def page(params, fields, limit):
+    notes = approved_notes(params.get('year'), params.get('branch'), params.get('subject'), params.get('search', ''))
+    page_obj = KeysetPaginator(notes, limit).get_page(after=params.get('after'), before=params.get('before'))
+    return {
+        'results': [{name: FIELDS[name](row) for name in fields} for row in page_obj],
+        'has_next': page_obj.has_next,
+        'has_previous': page_obj.has_previous,
+        'next_cursor': page_obj.next_cursor,
+        'previous_cursor': page_obj.previous_cursor,
+    }
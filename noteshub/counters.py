@@ -0,0 +1,120 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, Value, When
+
+from .models import Notes, StatusCount, UserStatusCount
+
+STATUSES = tuple(status for status, _ in Notes.STATUS_CHOICES)
+
+
+def state_deltas(previous_states, new_states):
+    """Count changes implied by notes moving from ``previous_states`` to ``new_states``."""
+    deltas = Counter()
+    for state in previous_states:
+        if state:
+            deltas[(state['uploader_id'], state['status'])] -= 1
+    for state in new_states:
+        if state:
+            deltas[(state['uploader_id'], state['status'])] += 1
+    return {key: delta for key, delta in deltas.items() if delta}
+
+
+def add_counts(model, deltas, key_fields):
+    """
+    Add ``{key: delta}`` to ``model.count``, keys being values of ``key_fields``.
+
+    Missing rows for positive deltas are bulk-inserted first (a concurrent
+    insert just wins), then every row gets one
+    ``UPDATE ... SET count = count + CASE ... END``. Nothing is taken away
+    from a missing row (e.g. its user is being deleted).
+    """
+    keys = {key: dict(zip(key_fields, key)) for key in deltas}
+    model.objects.bulk_create(
+        [model(count=0, **keys[key]) for key, delta in deltas.items() if delta > 0],
+        ignore_conflicts=True,
+    )
+    # IN lists rather than one OR per key: the CASE leaves other matches at +0.
+    lookups = {f'{field}__in': {key[i] for key in deltas} for i, field in enumerate(key_fields)}
+    whens = [When(**keys[key], then=Value(delta)) for key, delta in deltas.items()]
+    model.objects.filter(**lookups).update(
+        count=F('count') + Case(*whens, default=Value(0), output_field=IntegerField()),
+    )
+
+
+def apply_deltas(deltas):
+    """
+    Add ``{(uploader_id, status): delta}`` to the per-user and global counters.
+
+    Runs in the caller's transaction, so the counts commit or roll back with
+    the note change that caused them. Global rows are updated first; a
+    concurrent ``reconcile`` holds those locks while it recounts. Each table
+    takes two queries however many notes changed.
+    """
+    if not deltas:
+        return
+    totals = Counter()
+    for (_, status), delta in deltas.items():
+        totals[(status,)] += delta
+    totals = {key: delta for key, delta in totals.items() if delta}
+    # No savepoint: a failure here must roll back the note change too.
+    with transaction.atomic(savepoint=False):
+        if totals:
+            add_counts(StatusCount, totals, ('status',))
+        add_counts(UserStatusCount, deltas, ('user_id', 'status'))
+
+
+def reconcile():
+    """
+    Recount every counter from the notes table with one aggregate query.
+
+    Returns the number of counters that had drifted and were corrected.
+    """
+    with transaction.atomic():
+        # Every note change updates a global row first, so holding these
+        # locks keeps writers out until the recount commits.
+        stored_totals = {row.status: row for row in StatusCount.objects.select_for_update()}
+        stored = {(row.user_id, row.status): row for row in UserStatusCount.objects.all()}
+
+        actual = {
+            (row['uploader_id'], row['status']): row['count']
+            for row in Notes.objects.values('uploader_id', 'status').annotate(count=Count('id')).order_by()
+        }
+        actual_totals = Counter(dict.fromkeys(STATUSES, 0))
+        for (_, status), count in actual.items():
+            actual_totals[status] += count
+
+        fixed = _sync(StatusCount, stored_totals, actual_totals, lambda status: {'status': status})
+        fixed += _sync(UserStatusCount, stored, actual, lambda key: {'user_id': key[0], 'status': key[1]})
+    return fixed
+
+
+def _sync(model, stored, actual, fields):
+    changed = []
+    for key, count in actual.items():
+        row = stored.get(key)
+        if row is not None and row.count != count:
+            row.count = count
+            changed.append(row)
+    missing = [model(count=count, **fields(key)) for key, count in actual.items() if key not in stored]
+    # Per-user rows whose notes are all gone (global rows cover every status)
+    stale = [row for key, row in stored.items() if key not in actual]
+    model.objects.bulk_update(changed, ['count'])
+    model.objects.bulk_create(missing)
+    model.objects.filter(pk__in=[row.pk for row in stale]).delete()
+    return len(changed) + len(missing) + sum(1 for row in stale if row.count)
+
+
+def status_counts():
+    """``{status: count}`` over every note, for the moderation tabs."""
+    counts = dict.fromkeys(STATUSES, 0)
+    counts.update(StatusCount.objects.values_list('status', 'count'))
+    return counts
+
+
+def user_status_counts(user_id):
+    """``{status: count, 'total': count}`` over one user's uploads."""
+    counts = dict.fromkeys(STATUSES, 0)
+    counts.update(UserStatusCount.objects.filter(user_id=user_id).values_list('status', 'count'))
+    counts['total'] = sum(counts.values())
+    return counts
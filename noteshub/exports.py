@@ -0,0 +1,105 @@
+"""
+Streaming ZIP export of approved notes.
+
+The archive is produced while it is sent: ``ZipFile`` writes into a sink
+that is drained after every chunk, entries use ZIP_STORED (PDFs are already
+compressed) and, since the sink cannot seek, sizes and CRCs go into data
+descriptors after each file. Memory stays at one read chunk per response.
+"""
+import os
+import zipfile
+
+from django.utils import timezone
+
+from . import search
+from .models import Notes
+
+CHUNK_SIZE = 64 * 1024
+
+# Larger exports have to be narrowed with the filters.
+MAX_EXPORT_NOTES = 500
+
+
+class ZipSink:
+    """Write-only, non-seekable file that hands ``ZipFile`` output to a generator."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def export_notes(year=None, branch=None, subject=None, search_query=''):
+    """
+    Approved notes matching the studentdashboard filters, oldest first.
+
+    Only approved notes are exported, whoever asks: the same rule
+    ``download_note`` applies to other people's notes. Raises ValueError
+    when no filter is given or the export would be too large.
+    """
+    if not (year or branch or subject or search_query):
+        raise ValueError('Choose a year, branch, subject or search to export.')
+
+    notes = Notes.objects.filter(status='approved')
+    if year:
+        notes = notes.filter(year=year)
+    if branch:
+        notes = notes.filter(branch=branch)
+    if subject:
+        notes = notes.filter(subject=subject)
+    if search_query:
+        notes = notes.filter(id__in=search.search_ids(
+            search_query, status='approved', year=year, branch=branch, subject=subject,
+        ))
+
+    notes = list(
+        notes.only('id', 'year', 'branch', 'subject', 'chapter', 'pdf', 'uploaded_at')
+        .order_by('uploaded_at', 'id')[:MAX_EXPORT_NOTES + 1]
+    )
+    if len(notes) > MAX_EXPORT_NOTES:
+        raise ValueError(f'More than {MAX_EXPORT_NOTES} notes match; narrow the filters.')
+    return notes
+
+
+def _entry_names(notes):
+    seen = {}
+    for note in notes:
+        base = f'{note.year}/{note.branch}/{note.subject}_{note.chapter}'
+        base = base.replace('\\', '_').replace('..', '_')
+        seen[base] = seen.get(base, 0) + 1
+        yield note, base + ('.pdf' if seen[base] == 1 else f' ({seen[base]}).pdf')
+
+
+def stream_zip(notes):
+    """Yield the ZIP archive of ``notes`` piece by piece."""
+    sink = ZipSink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for note, name in _entry_names(notes):
+            try:
+                f = open(note.pdf.path, 'rb')
+            except FileNotFoundError:
+                continue
+            with f:
+                info = zipfile.ZipInfo(name, date_time=timezone.localtime(note.uploaded_at).timetuple()[:6])
+                info.file_size = os.fstat(f.fileno()).st_size
+                with archive.open(info, 'w') as entry:
+                    for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                        entry.write(chunk)
+                        yield sink.drain()
+            yield sink.drain()
+    yield sink.drain()
@@ -0,0 +1,171 @@
+"""
+PDF text/metadata extraction.
+
+Runs inside the ``process_notes`` worker pool, so nothing here may touch the
+database: each call takes a file path and returns plain data. pypdf is used
+when it is installed; otherwise a small built-in parser pulls text out of the
+Flate-compressed content streams, which covers most generated notes.
+"""
+import re
+import zlib
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # pragma: no cover - optional dependency
+    PdfReader = None
+
+# Cap on stored text per note; keeps the search index and NoteContent rows small.
+MAX_TEXT_CHARS = 200_000
+
+METADATA_KEYS = ('Title', 'Author', 'Subject', 'Creator', 'Producer', 'CreationDate')
+
+_STREAM_RE = re.compile(rb'>>\s*stream\r?\n')
+_PAGE_RE = re.compile(rb'/Type\s*/Page(?![A-Za-z])')
+_TEXT_BLOCK_RE = re.compile(rb'BT(.*?)ET', re.S)
+_STRING_RE = re.compile(rb'\((.*?)(?<!\\)\)\s*(?:Tj|\'|")|\[(.*?)\]\s*TJ', re.S)
+_ARRAY_STRING_RE = re.compile(rb'\((.*?)(?<!\\)\)', re.S)
+_INFO_RE = re.compile(rb'/(%s)\s*\((.*?)(?<!\\)\)' % b'|'.join(k.encode() for k in METADATA_KEYS), re.S)
+_SKIP_STREAM_KEYS = (b'/Subtype', b'/Length1', b'/Type', b'/DecodeParms')
+_ESCAPES = {b'n': b'\n', b'r': b'\r', b't': b'\t', b'b': b'\b', b'f': b'\f'}
+
+
+def _unescape(raw):
+    def replace(match):
+        octal, char = match.groups()
+        if octal:
+            return bytes([int(octal, 8) & 0xFF])
+        return _ESCAPES.get(char, char)
+    value = re.sub(rb'\\(?:([0-7]{1,3})|(.))', replace, raw, flags=re.S)
+    if value.startswith(b'\xfe\xff'):
+        return value[2:].decode('utf-16-be', 'replace')
+    return value.decode('latin-1')
+
+
+def _is_readable(text):
+    printable = sum(ch.isprintable() or ch.isspace() for ch in text)
+    return printable >= 0.9 * len(text)
+
+
+def _extract_with_pypdf(path):
+    reader = PdfReader(path)
+    chunks, size = [], 0
+    for page in reader.pages:
+        if size >= MAX_TEXT_CHARS:
+            break
+        text = page.extract_text() or ''
+        chunks.append(text)
+        size += len(text)
+    info = reader.metadata or {}
+    metadata = {key: str(info.get('/' + key)) for key in METADATA_KEYS if info.get('/' + key)}
+    return {
+        'text': '\n'.join(chunks)[:MAX_TEXT_CHARS],
+        'page_count': len(reader.pages),
+        'metadata': metadata,
+    }
+
+
+def _streams(data):
+    """Yield ``(dictionary, raw bytes)`` for every stream object in ``data``."""
+    pos = 0
+    while True:
+        match = _STREAM_RE.search(data, pos)
+        if match is None:
+            return
+        end = data.find(b'endstream', match.end())
+        if end == -1:
+            end = len(data)
+        header = data[data.rfind(b'obj', 0, match.start()):match.start()]
+        pos = end
+        yield header, data[match.end():end]
+
+
+def _stream_text(header, stream):
+    """Text shown by one content stream; empty for images, fonts, xref and metadata."""
+    if any(key in header for key in _SKIP_STREAM_KEYS):
+        return []
+    if b'/FlateDecode' in header:
+        try:
+            stream = zlib.decompressobj().decompress(stream)
+        except zlib.error:
+            return []
+    chunks = []
+    for block in _TEXT_BLOCK_RE.finditer(stream):
+        parts = []
+        for simple, array in _STRING_RE.findall(block.group(1)):
+            if array:
+                parts.extend(_unescape(s) for s in _ARRAY_STRING_RE.findall(array))
+            else:
+                parts.append(_unescape(simple))
+        text = ''.join(parts).strip()
+        if text and _is_readable(text):
+            chunks.append(text)
+    return chunks
+
+
+def _extract_builtin(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    chunks, size = [], 0
+    for header, stream in _streams(data):
+        if size >= MAX_TEXT_CHARS:
+            break
+        for text in _stream_text(header, stream):
+            chunks.append(text)
+            size += len(text)
+
+    metadata = {}
+    for key, value in _INFO_RE.findall(data):
+        metadata.setdefault(key.decode(), _unescape(value))
+
+    return {
+        'text': '\n'.join(chunks)[:MAX_TEXT_CHARS],
+        'page_count': len(_PAGE_RE.findall(data)),
+        'metadata': metadata,
+    }
+
+
+def extract_pdf(path):
+    """Return ``{'text', 'page_count', 'metadata'}`` for the PDF at ``path``."""
+    if PdfReader is not None:
+        return _extract_with_pypdf(path)
+    return _extract_builtin(path)
+
+
+# ===================== FIRST PAGE =====================
+def _first_page_with_pypdf(path):
+    page = PdfReader(path).pages[0]
+    image = None
+    xobjects = (page.get('/Resources') or {}).get('/XObject') or {}
+    for ref in xobjects.values():
+        xobject = ref.get_object()
+        # DCT (JPEG) data passes through pypdf's filters unchanged.
+        if xobject.get('/Subtype') == '/Image' and xobject.get('/Filter') == '/DCTDecode':
+            image = xobject.get_data()
+            break
+    return {'text': page.extract_text() or '', 'image': image}
+
+
+def _first_page_builtin(path):
+    # Without a page tree walk, the first text stream and the first JPEG in
+    # file order stand in for the first page; producers write pages in order.
+    with open(path, 'rb') as f:
+        data = f.read()
+    text, image = None, None
+    for header, stream in _streams(data):
+        if image is None and b'/DCTDecode' in header and b'/Image' in header:
+            stream = stream.rstrip(b'\r\n')
+            if stream.startswith(b'\xff\xd8'):
+                image = stream
+        elif text is None:
+            text = '\n'.join(_stream_text(header, stream)) or None
+        if text is not None and image is not None:
+            break
+    return {'text': text or '', 'image': image}
+
+
+def first_page(path):
+    """Return ``{'text', 'image'}``: first page text and its JPEG bytes (or None)."""
+    if PdfReader is not None:
+        return _first_page_with_pypdf(path)
+    return _first_page_builtin(path)
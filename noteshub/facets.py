@@ -0,0 +1,74 @@
+from collections import Counter
+from functools import reduce
+from operator import or_
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+
+from . import counters
+from .models import FacetCount, Notes
+
+FACETS_CACHE_KEY = 'noteshub:facets'
+
+# Bounds how long a snapshot cached by a request racing a commit can be stale.
+FACETS_TIMEOUT = 5 * 60
+
+
+def _key(state):
+    return (state['year'], state['branch'], state['subject'])
+
+
+def state_deltas(previous_states, new_states):
+    """Count changes implied by notes moving from ``previous_states`` to ``new_states``."""
+    deltas = Counter()
+    for state in previous_states:
+        if state and state['status'] == 'approved':
+            deltas[_key(state)] -= 1
+    for state in new_states:
+        if state and state['status'] == 'approved':
+            deltas[_key(state)] += 1
+    return {key: delta for key, delta in deltas.items() if delta}
+
+
+def apply_deltas(deltas):
+    """Add ``{(year, branch, subject): delta}`` to the counts, two queries plus one delete."""
+    if not deltas:
+        return
+    # No savepoint: runs in the transaction of the note change it counts.
+    with transaction.atomic(savepoint=False):
+        counters.add_counts(FacetCount, deltas, ('year', 'branch', 'subject'))
+        emptied = [
+            Q(year=year, branch=branch, subject=subject)
+            for (year, branch, subject), delta in deltas.items() if delta < 0
+        ]
+        if emptied:
+            # Only combinations just decremented can have reached zero (unique index lookups).
+            FacetCount.objects.filter(reduce(or_, emptied), count__lte=0).delete()
+    transaction.on_commit(lambda: cache.delete(FACETS_CACHE_KEY))
+
+
+def rebuild():
+    """Recount every combination from the notes table in one aggregate query."""
+    rows = (
+        Notes.objects.filter(status='approved')
+        .values('year', 'branch', 'subject')
+        .annotate(count=Count('id'))
+    )
+    with transaction.atomic():
+        FacetCount.objects.all().delete()
+        created = FacetCount.objects.bulk_create(FacetCount(**row) for row in rows)
+    cache.delete(FACETS_CACHE_KEY)
+    return len(created)
+
+
+def snapshot():
+    """Every non-empty (year, branch, subject) with its approved-note count."""
+    facets = cache.get(FACETS_CACHE_KEY)
+    if facets is None:
+        facets = list(
+            FacetCount.objects.order_by('year', 'branch', 'subject')
+            .values_list('year', 'branch', 'subject', 'count')
+        )
+        cache.set(FACETS_CACHE_KEY, facets, FACETS_TIMEOUT)
+    return facets
@@ -3,8 +3,11 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, UserChangeForm
 from django.core.exceptions import ValidationError
-from .models import CustomUser, Notes
-import magic    
+from .models import CustomUser, Notes, UploadSession
+import magic
+
+# Largest PDF accepted by any upload path
+MAX_PDF_SIZE = 10 * 1024 * 1024
 
 class CustomUserCreationForm(UserCreationForm):
     class Meta:
@@ -74,6 +77,9 @@ class NotesUploadForm(forms.ModelForm):
 
     def clean_pdf(self):
         pdf = self.cleaned_data.get('pdf')
+        # Streamed through PdfUploadHandler: already checked without re-reading it
+        if getattr(pdf, 'sha256', None):
+            return pdf
         if pdf:
             # Check file type
             file_type = magic.from_buffer(pdf.read(2048), mime=True)
@@ -84,7 +90,27 @@ class NotesUploadForm(forms.ModelForm):
             pdf.seek(0)
 
             # Check file size (10MB max)
-            if pdf.size > 10 * 1024 * 1024:
+            if pdf.size > MAX_PDF_SIZE:
                 raise ValidationError('File size must be less than 10MB.')
 
         return pdf
+
+
+class UploadSessionForm(forms.ModelForm):
+    class Meta:
+        model = UploadSession
+        fields = ['year', 'branch', 'subject', 'chapter', 'filename', 'total_size']
+
+    def clean_filename(self):
+        filename = self.cleaned_data['filename']
+        if not filename.lower().endswith('.pdf'):
+            raise ValidationError('Only PDF files are allowed.')
+        return filename
+
+    def clean_total_size(self):
+        total_size = self.cleaned_data['total_size']
+        if total_size <= 0:
+            raise ValidationError('File is empty.')
+        if total_size > MAX_PDF_SIZE:
+            raise ValidationError('File size must be less than 10MB.')
+        return total_size
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class FastPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 with a site-chosen iteration count.
+
+    Listed first in PASSWORD_HASHERS when ``NOTESHUB_FAST_PASSWORD_HASHER``
+    is on. Django re-encodes a password with the preferred hasher on the next
+    successful login, so switching either way, or changing
+    ``NOTESHUB_FAST_HASHER_ITERATIONS``, migrates users transparently. The
+    separate algorithm name keeps these hashes verifiable when the stock
+    hasher is preferred again.
+    """
+
+    algorithm = 'pbkdf2_sha256_fast'
+
+    @property
+    def iterations(self):
+        return settings.NOTESHUB_FAST_HASHER_ITERATIONS
@@ -0,0 +1,111 @@
+import csv
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from itertools import islice
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from noteshub import provisioning
+
+
+def hash_passwords(passwords):
+    """Worker entry point: hash one chunk of passwords with the preferred hasher."""
+    return [make_password(password) for password in passwords]
+
+
+class Command(BaseCommand):
+    help = ('Create student/teacher accounts from a CSV with a roll_number column and optional '
+            'username, password and role columns ("-" reads stdin).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path')
+        parser.add_argument('--role', choices=provisioning.ROLES, default='student',
+                            help='Role for rows without a role column (default: student).')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Users hashed and inserted per transaction (default: 1000).')
+        parser.add_argument('--generate-passwords', metavar='CREDENTIALS_CSV',
+                            help='Give rows without a password a random one and write them to this file.')
+        parser.add_argument('--skipped', metavar='REPORT_CSV',
+                            help='Write skipped rows to this file instead of listing them on stderr.')
+
+    def handle(self, *args, **options):
+        workers = max(options['workers'], 1)
+        batch_size = max(options['batch_size'], 1)
+        seen = {'roll_number': set(), 'username': set()}
+        total = created = skipped = 0
+
+        with ExitStack() as files:
+            source = sys.stdin if options['csv_path'] == '-' else files.enter_context(
+                self._open(options['csv_path'], 'r')
+            )
+            credentials = self._writer(files, options['generate_passwords'], ('roll_number', 'username', 'password'))
+            report = self._writer(files, options['skipped'], ('line', 'roll_number', 'username', 'reason'))
+            rows = provisioning.read_rows(source, options['role'])
+            started = time.perf_counter()
+
+            # Fork the workers before this process holds a database connection.
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+                pool.submit(hash_passwords, []).result()
+                while True:
+                    try:
+                        batch = list(islice(rows, batch_size))
+                    except (ValueError, csv.Error) as exc:
+                        raise CommandError(f'{options["csv_path"]}: {exc}')
+                    if not batch:
+                        break
+
+                    # Conflicts are dropped first so they are never hashed
+                    accepted, rejected = provisioning.check(batch, seen, credentials is not None)
+                    passwords = [row.password for row in accepted]
+                    chunk = -(-len(passwords) // workers) or 1
+                    chunks = [passwords[i:i + chunk] for i in range(0, len(passwords), chunk)]
+                    hashes = [password_hash for hashed in pool.map(hash_passwords, chunks) for password_hash in hashed]
+                    inserted, conflicts = provisioning.insert(accepted, hashes)
+
+                    for row in inserted:
+                        if row.generated:
+                            credentials.writerow([row.roll_number, row.username or '', row.password])
+                    for row, reason in rejected + conflicts:
+                        if report is not None:
+                            report.writerow([row.line, row.roll_number, row.username or '', reason])
+                        else:
+                            self.stderr.write(f'Line {row.line}: {reason}')
+
+                    total += len(batch)
+                    created += len(inserted)
+                    skipped += len(rejected) + len(conflicts)
+                    elapsed = time.perf_counter() - started
+                    self.stdout.write(
+                        f'{total} row(s): {created} created, {skipped} skipped, {created / elapsed:.0f} users/s'
+                    )
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {created} user(s), skipped {skipped} of {total} row(s) in {elapsed:.1f}s '
+            f'({created / elapsed:.0f} users/s, {workers} worker(s)).'
+        ))
+
+    def _open(self, path, mode):
+        try:
+            if mode == 'r':
+                # utf-8-sig drops the byte order mark spreadsheet exports start with
+                return open(path, newline='', encoding='utf-8-sig')
+            # Owner-only: the credentials file holds plain-text passwords
+            return open(path, 'w', newline='', encoding='utf-8', opener=lambda name, flags: os.open(name, flags, 0o600))
+        except OSError as exc:
+            raise CommandError(f'Cannot open {path}: {exc}')
+
+    def _writer(self, files, path, header):
+        if not path:
+            return None
+        writer = csv.writer(files.enter_context(self._open(path, 'w')))
+        writer.writerow(header)
+        return writer
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from noteshub import blobs
+from noteshub.models import Notes
+from noteshub.storage import pdf_storage
+
+
+class Command(BaseCommand):
+    help = 'Move PDFs uploaded before content-addressed storage into shared blobs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-originals', action='store_true',
+                            help='Leave the old per-upload files on disk.')
+
+    def handle(self, *args, **options):
+        moved = missing = 0
+        legacy_names = set()
+        for note in Notes.objects.filter(blob__isnull=True).iterator():
+            old_name = note.pdf.name
+            if not old_name or not pdf_storage.exists(old_name):
+                missing += 1
+                continue
+            with pdf_storage.open(old_name, 'rb') as f:
+                new_name = pdf_storage.save(old_name, f)
+            Notes.objects.filter(pk=note.pk).update(pdf=new_name)
+            note.pdf.name = new_name
+            blobs.attach(note)
+            legacy_names.add(old_name)
+            moved += 1
+
+        if not options['keep_originals']:
+            still_used = set(Notes.objects.filter(pdf__in=legacy_names).values_list('pdf', flat=True))
+            for name in legacy_names - still_used:
+                pdf_storage.delete(name)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Moved {moved} note(s) into blobs; {missing} had no file on disk.'
+        ))
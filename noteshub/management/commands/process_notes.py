@@ -0,0 +1,75 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from noteshub import extraction, pipeline, previews
+
+
+def process_pdf(path, digest, kind='full'):
+    """Worker entry point: render the card preview, then extract the text."""
+    # First: previews.render falls back to a blank card, so a PDF whose text
+    # cannot be extracted still gets its preview.
+    if digest:
+        previews.generate(path, digest)
+    if kind == 'preview':
+        return None
+    return extraction.extract_pdf(path)
+
+
+class Command(BaseCommand):
+    help = 'Drain the PDF processing queue with a pool of worker processes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Jobs claimed per round (default: 4 per worker).')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit when the queue is empty instead of polling.')
+        parser.add_argument('--poll-interval', type=float, default=5.0)
+        parser.add_argument('--all', action='store_true',
+                            help='First queue every note that was never processed (e.g. uploaded before the queue existed).')
+
+    def handle(self, *args, **options):
+        workers = max(options['workers'], 1)
+        batch_size = options['batch_size'] or workers * 4
+        processed = failed = 0
+
+        if options['all']:
+            self.stdout.write(f'Queued {pipeline.backfill()} unprocessed note(s).')
+
+        requeued = pipeline.requeue_stale()
+        if requeued:
+            self.stdout.write(f'Requeued {requeued} stale job(s).')
+
+        # Workers only parse files; all database work stays in this process.
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            while True:
+                jobs = pipeline.claim(batch_size)
+                if not jobs:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                futures = {
+                    pool.submit(process_pdf, job.note.pdf.path, job.note.blob_id, job.kind): job
+                    for job in jobs
+                }
+                for future in as_completed(futures):
+                    job = futures[future]
+                    try:
+                        pipeline.complete(job, future.result())
+                        processed += 1
+                    except Exception as exc:
+                        status = pipeline.fail(job, exc)
+                        failed += 1
+                        self.stderr.write(f'Note {job.note_id}: {exc} ({status})')
+                previews.prune()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed {processed} note(s), {failed} failure(s).'
+        ))
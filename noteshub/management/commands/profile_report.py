@@ -0,0 +1,50 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from noteshub import profiling
+
+
+class Command(BaseCommand):
+    help = 'Show per-view query counts and latency percentiles collected by QueryStatsMiddleware.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', default=settings.NOTESHUB_PROFILING_DIR,
+                            help='Directory the web processes dump their samples to.')
+        parser.add_argument('--json', action='store_true', help='Print the raw report as JSON.')
+        parser.add_argument('--sort', default='total_ms', choices=profiling.METRICS,
+                            help='Metric whose p95 orders the views (default: total_ms).')
+
+    def handle(self, *args, **options):
+        report = profiling.load_dumps(options['dir']).snapshot()
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        if not report:
+            self.stdout.write(f"No profiling dumps in {options['dir']}; is NOTESHUB_PROFILING=1 set?")
+            return
+
+        sort_key = options['sort']
+        rows = sorted(report.items(), key=lambda item: item[1][sort_key]['p95'] or 0, reverse=True)
+        self.stdout.write(
+            f"{'view':<24}{'reqs':>7}{'queries p50/p95':>18}{'db ms p95':>11}"
+            f"{'tpl ms p95':>12}{'total ms p50/p95/p99':>24}{'KB p95':>9}"
+        )
+        for name, stats in rows:
+            queries, total = stats['queries'], stats['total_ms']
+            query_cell = f"{queries['p50']}/{queries['p95']}"
+            total_cell = f"{total['p50']:.1f}/{total['p95']:.1f}/{total['p99']:.1f}"
+            size = (stats['bytes']['p95'] or 0) / 1024
+            self.stdout.write(
+                f"{name:<24}{total['count']:>7}{query_cell:>18}{stats['db_ms']['p95']:>11.1f}"
+                f"{stats['template_ms']['p95']:>12.1f}{total_cell:>24}{size:>9.1f}"
+            )
+
+        flagged = [(name, stats) for name, stats in rows if stats['n_plus_one_requests']]
+        for name, stats in flagged:
+            self.stdout.write(self.style.WARNING(
+                f"\n{name}: {stats['n_plus_one_requests']} request(s) repeated a query per row"
+            ))
+            for query in stats['repeated_queries']:
+                self.stdout.write(f"  x{query['count']}  {query['sql'][:160]}")
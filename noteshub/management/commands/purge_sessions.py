@@ -0,0 +1,39 @@
+import time
+
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = 'Delete expired sessions in small batches so the session table never holds long locks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--pause', type=float, default=0.1,
+                            help='Seconds to sleep between batches.')
+        parser.add_argument('--every', type=float, default=None,
+                            help='Keep running and purge every N seconds instead of exiting.')
+
+    def handle(self, *args, **options):
+        while True:
+            deleted = self.purge(options['batch_size'], options['pause'])
+            self.stdout.write(f'Deleted {deleted} expired session(s).')
+            if options['every'] is None:
+                break
+            time.sleep(options['every'])
+
+    def purge(self, batch_size, pause):
+        deleted = 0
+        cutoff = timezone.now()
+        while True:
+            keys = list(
+                Session.objects.filter(expire_date__lt=cutoff)
+                .values_list('session_key', flat=True)[:batch_size]
+            )
+            if not keys:
+                return deleted
+            deleted += Session.objects.filter(session_key__in=keys, expire_date__lt=cutoff).delete()[0]
+            if len(keys) < batch_size:
+                return deleted
+            time.sleep(pause)
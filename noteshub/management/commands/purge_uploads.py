@@ -0,0 +1,54 @@
+import os
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from noteshub.models import UploadSession
+from noteshub.uploads import session_path
+
+
+class Command(BaseCommand):
+    help = 'Abort chunked uploads that received nothing for --hours and delete their partial files.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=float, default=24,
+                            help='Idle time after which an active upload is abandoned (default: 24).')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--pause', type=float, default=0.1,
+                            help='Seconds to sleep between batches.')
+        parser.add_argument('--every', type=float, default=None,
+                            help='Keep running and purge every N seconds instead of exiting.')
+
+    def handle(self, *args, **options):
+        while True:
+            aborted = self.purge(timedelta(hours=options['hours']), options['batch_size'], options['pause'])
+            self.stdout.write(f'Aborted {aborted} abandoned upload(s).')
+            if options['every'] is None:
+                break
+            time.sleep(options['every'])
+
+    def purge(self, idle, batch_size, pause):
+        aborted = 0
+        cutoff = timezone.now() - idle
+        while True:
+            ids = list(
+                UploadSession.objects.filter(status='active', updated_at__lt=cutoff)
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not ids:
+                return aborted
+            # A chunk written since the select bumps updated_at and keeps its session.
+            now = timezone.now()
+            aborted += UploadSession.objects.filter(pk__in=ids, status='active', updated_at__lt=cutoff).update(
+                status='aborted', updated_at=now,
+            )
+            for session in UploadSession.objects.filter(pk__in=ids, status='aborted', updated_at=now):
+                try:
+                    os.unlink(session_path(session))
+                except FileNotFoundError:
+                    pass
+            if len(ids) < batch_size:
+                return aborted
+            time.sleep(pause)
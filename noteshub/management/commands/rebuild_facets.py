@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from noteshub import facets
+
+
+class Command(BaseCommand):
+    help = 'Recount approved notes per year/branch/subject from scratch.'
+
+    def handle(self, *args, **options):
+        combinations = facets.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {combinations} facet combination(s).'))
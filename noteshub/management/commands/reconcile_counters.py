@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from noteshub import counters
+
+
+class Command(BaseCommand):
+    help = 'Recount notes per status and per uploader from scratch and fix any drifted counters.'
+
+    def handle(self, *args, **options):
+        fixed = counters.reconcile()
+        self.stdout.write(self.style.SUCCESS(f'Reconciled status counters; {fixed} counter(s) corrected.'))
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('noteshub', '0005_remove_notes_is_approved_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notes',
+            index=models.Index(fields=['status', 'uploaded_at'], name='notes_status_uploaded_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notes',
+            index=models.Index(fields=['uploader', 'uploaded_at'], name='notes_uploader_uploaded_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notes',
+            index=models.Index(fields=['status', 'year', 'branch', 'subject'], name='notes_status_catalog_idx'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+from django.db import migrations
+
+# The SQL is inlined so this migration keeps creating the index as it was
+# when it was written, whatever noteshub.search looks like later.
+UPLOADER_SQL = "CASE WHEN u.is_teacher THEN COALESCE(u.username, '') ELSE u.roll_number END"
+SOURCE_SQL = 'FROM noteshub_notes n JOIN noteshub_customuser u ON u.id = n.uploader_id'
+
+SQLITE_CREATE = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS noteshub_notes_fts USING fts5("
+    "subject, chapter, branch, uploader, body, tokenize='porter unicode61')",
+    "INSERT INTO noteshub_notes_fts (rowid, subject, chapter, branch, uploader, body) "
+    f"SELECT n.id, n.subject, n.chapter, n.branch, {UPLOADER_SQL}, '' {SOURCE_SQL}",
+]
+POSTGRES_CREATE = [
+    'CREATE TABLE IF NOT EXISTS noteshub_notes_search ('
+    'note_id bigint PRIMARY KEY REFERENCES noteshub_notes (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, '
+    "body text NOT NULL DEFAULT '', "
+    'document tsvector NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS noteshub_notes_search_document_gin ON noteshub_notes_search USING GIN (document)',
+    'INSERT INTO noteshub_notes_search (note_id, body, document) '
+    "SELECT n.id, '', "
+    "setweight(to_tsvector('simple', n.subject), 'A') || "
+    "setweight(to_tsvector('simple', n.chapter), 'A') || "
+    "setweight(to_tsvector('simple', n.branch), 'C') || "
+    f"setweight(to_tsvector('simple', {UPLOADER_SQL}), 'C') || "
+    f"setweight(to_tsvector('simple', ''), 'D') {SOURCE_SQL}",
+]
+
+CREATE = {'sqlite': SQLITE_CREATE, 'postgresql': POSTGRES_CREATE}
+DROP = {
+    'sqlite': 'DROP TABLE IF EXISTS noteshub_notes_fts',
+    'postgresql': 'DROP TABLE IF EXISTS noteshub_notes_search',
+}
+
+
+def create_search_index(apps, schema_editor):
+    for sql in CREATE.get(schema_editor.connection.vendor, ()):
+        schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    sql = DROP.get(schema_editor.connection.vendor)
+    if sql is not None:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('noteshub', '0006_notes_catalog_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:16
+
+import django.core.validators
+import django.db.models.deletion
+import django.utils.timezone
+import noteshub.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('noteshub', '0008_processing_pipeline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PdfBlob',
+            fields=[
+                ('digest', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('refcount', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='notes',
+            name='pdf',
+            field=models.FileField(storage=noteshub.storage.ContentAddressedStorage(), upload_to='noteshub/Notes_pdfs/', validators=[django.core.validators.FileExtensionValidator(['pdf'])]),
+        ),
+        migrations.AddField(
+            model_name='notes',
+            name='blob',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='notes', to='noteshub.pdfblob'),
+        ),
+    ]
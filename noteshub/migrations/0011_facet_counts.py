@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:32
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_facets(apps, schema_editor):
+    Notes = apps.get_model('noteshub', 'Notes')
+    FacetCount = apps.get_model('noteshub', 'FacetCount')
+    rows = (
+        Notes.objects.using(schema_editor.connection.alias)
+        .filter(status='approved')
+        .values('year', 'branch', 'subject')
+        .annotate(count=Count('id'))
+    )
+    FacetCount.objects.using(schema_editor.connection.alias).bulk_create(
+        FacetCount(**row) for row in rows
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('noteshub', '0010_upload_sessions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FacetCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.CharField(max_length=10)),
+                ('branch', models.CharField(max_length=50)),
+                ('subject', models.CharField(max_length=100)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('year', 'branch', 'subject'), name='facet_unique_combination')],
+            },
+        ),
+        migrations.RunPython(backfill_facets, migrations.RunPython.noop),
+    ]
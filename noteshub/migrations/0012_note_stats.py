@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('noteshub', '0011_facet_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoteStats',
+            fields=[
+                ('note', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='noteshub.notes')),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('downloads', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='NoteDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('downloads', models.PositiveIntegerField(default=0)),
+                ('note', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='noteshub.notes')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day', 'note'], name='daily_stats_day_note_idx')],
+                'constraints': [models.UniqueConstraint(fields=('note', 'day'), name='daily_stats_unique_note_day')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('noteshub', '0012_note_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notes',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
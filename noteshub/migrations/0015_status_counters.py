@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:57
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_counters(apps, schema_editor):
+    Notes = apps.get_model('noteshub', 'Notes')
+    StatusCount = apps.get_model('noteshub', 'StatusCount')
+    UserStatusCount = apps.get_model('noteshub', 'UserStatusCount')
+    alias = schema_editor.connection.alias
+    totals = dict.fromkeys(('pending', 'approved', 'rejected'), 0)
+    rows = Notes.objects.using(alias).values('uploader_id', 'status').annotate(count=Count('id')).order_by()
+    per_user = []
+    for row in rows:
+        totals[row['status']] = totals.get(row['status'], 0) + row['count']
+        per_user.append(UserStatusCount(user_id=row['uploader_id'], status=row['status'], count=row['count']))
+    StatusCount.objects.using(alias).bulk_create(
+        StatusCount(status=status, count=count) for status, count in totals.items()
+    )
+    UserStatusCount.objects.using(alias).bulk_create(per_user)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('noteshub', '0014_catalog_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatusCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(max_length=10, unique=True)),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UserStatusCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(max_length=10)),
+                ('count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_counts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'status'), name='user_status_unique')],
+            },
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
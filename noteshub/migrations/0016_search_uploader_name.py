@@ -0,0 +1,38 @@
+from django.db import migrations
+
+# The indexed uploader is now the displayed name (username, else roll number)
+# for every user, not the username for teachers only. The SQL is inlined so
+# the migration does not change with noteshub.search.
+SQLITE_SQL = (
+    "UPDATE noteshub_notes_fts SET uploader = COALESCE(("
+    "SELECT COALESCE(NULLIF(u.username, ''), u.roll_number) "
+    "FROM noteshub_notes n JOIN noteshub_customuser u ON u.id = n.uploader_id "
+    "WHERE n.id = noteshub_notes_fts.rowid), '')"
+)
+POSTGRES_SQL = (
+    "UPDATE noteshub_notes_search s SET document = "
+    "setweight(to_tsvector('simple', n.subject), 'A') || "
+    "setweight(to_tsvector('simple', n.chapter), 'A') || "
+    "setweight(to_tsvector('simple', n.branch), 'C') || "
+    "setweight(to_tsvector('simple', COALESCE(NULLIF(u.username, ''), u.roll_number)), 'C') || "
+    "setweight(to_tsvector('simple', s.body), 'D') "
+    "FROM noteshub_notes n JOIN noteshub_customuser u ON u.id = n.uploader_id "
+    "WHERE n.id = s.note_id"
+)
+
+
+def reindex_uploaders(apps, schema_editor):
+    sql = {'sqlite': SQLITE_SQL, 'postgresql': POSTGRES_SQL}.get(schema_editor.connection.vendor)
+    if sql is not None:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('noteshub', '0015_status_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(reindex_uploaders, migrations.RunPython.noop),
+    ]
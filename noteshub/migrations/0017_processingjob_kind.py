@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('noteshub', '0016_search_uploader_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='processingjob',
+            name='kind',
+            field=models.CharField(choices=[('full', 'Text extraction and preview'), ('preview', 'Preview only')], default='full', max_length=10),
+        ),
+    ]
@@ -1,7 +1,11 @@
+import uuid
+
 from django.db import models
+from django.db.models.query import ValuesIterable
 from django.core.validators import FileExtensionValidator
 from django.utils import timezone
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
+from .storage import pdf_storage
 
 class UserManager(BaseUserManager):
     def create_user(self, roll_number, username=None, password=None, is_teacher=False, is_student=False):
@@ -61,6 +65,82 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     def has_module_perms(self, app_label):
         return True
 
+# One stored PDF, shared by every note with identical content
+class PdfBlob(models.Model):
+    digest = models.CharField(max_length=64, primary_key=True)
+    size = models.PositiveBigIntegerField(default=0)
+    refcount = models.IntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.digest} ({self.refcount} refs)"
+
+# Lightweight list row: just the columns a note card renders
+class NoteRow:
+    FIELDS = (
+        'id', 'year', 'branch', 'subject', 'chapter', 'status', 'uploaded_at',
+        'uploader_id', 'uploader__username', 'uploader__roll_number', 'blob_id',
+        'updated_at',
+    )
+    __slots__ = ('id', 'year', 'branch', 'subject', 'chapter', 'status', 'uploaded_at',
+                 'uploader_id', 'uploader_username', 'uploader_roll_number', 'blob_id',
+                 'updated_at')
+
+    def __init__(self, row):
+        self.id = row['id']
+        self.year = row['year']
+        self.branch = row['branch']
+        self.subject = row['subject']
+        self.chapter = row['chapter']
+        self.status = row['status']
+        self.uploaded_at = row['uploaded_at']
+        self.uploader_id = row['uploader_id']
+        self.uploader_username = row['uploader__username']
+        self.uploader_roll_number = row['uploader__roll_number']
+        self.blob_id = row['blob_id']
+        self.updated_at = row['updated_at']
+
+    @property
+    def pk(self):
+        return self.id
+
+    @property
+    def title(self):
+        return f"{self.subject} - {self.chapter}"
+
+    @property
+    def uploader_name(self):
+        # Same as str(CustomUser): the username when there is one, else the roll number
+        return self.uploader_username or self.uploader_roll_number
+
+
+class NoteRowIterable(ValuesIterable):
+    def __iter__(self):
+        for row in super().__iter__():
+            yield NoteRow(row)
+
+
+class NotesQuerySet(models.QuerySet):
+    def rows(self):
+        """One query (uploader joined), only card columns, NoteRow objects instead of models."""
+        queryset = self.values(*NoteRow.FIELDS)
+        # Private, but Django has no public hook that maps rows and keeps a
+        # queryset the paginator can still filter and slice; every clone
+        # copies it (pinned by NoteRowTests).
+        queryset._iterable_class = NoteRowIterable
+        return queryset
+
+    def catalog(self):
+        return self.filter(status='approved').rows()
+
+    def moderation_queue(self, status=None):
+        queryset = self.filter(status=status) if status else self
+        return queryset.rows()
+
+    def uploads_of(self, user):
+        return self.filter(uploader=user).rows()
+
+
 # Notes Model
 class Notes(models.Model):
     uploader = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
@@ -68,8 +148,11 @@ class Notes(models.Model):
     branch = models.CharField(max_length=50)
     subject = models.CharField(max_length=100)
     chapter = models.CharField(max_length=100)
-    pdf = models.FileField(upload_to='noteshub/Notes_pdfs/', validators=[FileExtensionValidator(['pdf'])])
+    pdf = models.FileField(upload_to='noteshub/Notes_pdfs/', storage=pdf_storage, validators=[FileExtensionValidator(['pdf'])])
+    blob = models.ForeignKey(PdfBlob, on_delete=models.PROTECT, null=True, blank=True, editable=False, related_name='notes')
     uploaded_at = models.DateTimeField(default=timezone.now)
+    # Bumped on every change, including bulk UPDATEs; keys the per-note card fragments
+    updated_at = models.DateTimeField(auto_now=True)
     
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -77,7 +160,159 @@ class Notes(models.Model):
         ('rejected', 'Rejected'),
     ]
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
-    
+
+    objects = NotesQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'uploaded_at'], name='notes_status_uploaded_idx'),
+            models.Index(fields=['uploader', 'uploaded_at'], name='notes_uploader_uploaded_idx'),
+            models.Index(fields=['status', 'year', 'branch', 'subject'], name='notes_status_catalog_idx'),
+        ]
 
     def __str__(self):
         return f"{self.subject} - {self.chapter} uploaded by {self.uploader}"
+
+
+# Extracted PDF data, filled in by the process_notes worker pool
+class NoteContent(models.Model):
+    note = models.OneToOneField(Notes, on_delete=models.CASCADE, related_name='content')
+    text = models.TextField(blank=True)
+    page_count = models.PositiveIntegerField(default=0)
+    metadata = models.JSONField(default=dict, blank=True)
+    extracted_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Content of {self.note_id} ({self.page_count} pages)"
+
+
+# Database-backed job queue drained by `manage.py process_notes`
+class ProcessingJob(models.Model):
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    KIND_CHOICES = [
+        ('full', 'Text extraction and preview'),
+        ('preview', 'Preview only'),
+    ]
+    note = models.ForeignKey(Notes, on_delete=models.CASCADE, related_name='jobs')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, default='full')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='job_status_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Job {self.pk} for note {self.note_id} ({self.status})"
+
+
+# Resumable chunked upload, finalized into a Notes row
+class UploadSession(models.Model):
+    STATUS_CHOICES = [
+        ('active', 'Active'),
+        ('complete', 'Complete'),
+        ('aborted', 'Aborted'),
+    ]
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='upload_sessions')
+    year = models.CharField(max_length=10)
+    branch = models.CharField(max_length=50)
+    subject = models.CharField(max_length=100)
+    chapter = models.CharField(max_length=100)
+    filename = models.CharField(max_length=255)
+    total_size = models.PositiveBigIntegerField()
+    received = models.PositiveBigIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='active')
+    note = models.ForeignKey(Notes, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Upload {self.pk} ({self.received}/{self.total_size} bytes)"
+
+
+# Approved-note counts per filter combination, kept current by noteshub.facets
+class FacetCount(models.Model):
+    year = models.CharField(max_length=10)
+    branch = models.CharField(max_length=50)
+    subject = models.CharField(max_length=100)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['year', 'branch', 'subject'], name='facet_unique_combination'),
+        ]
+
+    def __str__(self):
+        return f"{self.year} / {self.branch} / {self.subject}: {self.count}"
+
+
+# Notes per status, kept current by noteshub.counters
+class StatusCount(models.Model):
+    status = models.CharField(max_length=10, unique=True)
+    count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.status}: {self.count}"
+
+
+# Notes per uploader and status, kept current by noteshub.counters
+class UserStatusCount(models.Model):
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='status_counts')
+    status = models.CharField(max_length=10)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'status'], name='user_status_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} / {self.status}: {self.count}"
+
+
+# Single-row counter bumped on every Notes change, kept by noteshub.catalog
+class CatalogVersion(models.Model):
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"Catalog version {self.version}"
+
+
+# Lifetime view/download totals per note, written in batches by noteshub.analytics
+class NoteStats(models.Model):
+    note = models.OneToOneField(Notes, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    views = models.PositiveIntegerField(default=0)
+    downloads = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"Note {self.note_id}: {self.views} views, {self.downloads} downloads"
+
+
+# Per-day totals behind the "most downloaded this week" sort
+class NoteDailyStats(models.Model):
+    note = models.ForeignKey(Notes, on_delete=models.CASCADE, related_name='daily_stats')
+    day = models.DateField()
+    views = models.PositiveIntegerField(default=0)
+    downloads = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['note', 'day'], name='daily_stats_unique_note_day'),
+        ]
+        indexes = [
+            models.Index(fields=['day', 'note'], name='daily_stats_day_note_idx'),
+        ]
+
+    def __str__(self):
+        return f"Note {self.note_id} on {self.day}: {self.views} views, {self.downloads} downloads"
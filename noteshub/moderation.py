@@ -0,0 +1,95 @@
+from django.db import transaction
+from django.utils import timezone
+
+from . import counters, facets, search
+from .caching import NOTE_STATE_FIELDS
+from .models import Notes
+from .signals import notes_status_changed
+
+# Bulk action name -> resulting note status
+MODERATION_ACTIONS = {
+    'approve': 'approved',
+    'reject': 'rejected',
+    'pending': 'pending',
+}
+
+# Teacherdashboard tabs a filter scope can target
+DASHBOARD_TABS = ('my-uploads', 'pending', 'approved', 'rejected')
+
+# Upper bound for an explicit id list; larger jobs should use the filter scope.
+MAX_BULK_IDS = 1000
+
+
+def dashboard_notes(user, params):
+    """
+    Notes listed on a teacherdashboard tab for the given filter parameters.
+
+    A search keeps the ``search.max_results()`` best matches within the tab
+    and filters; the paginator then lists those newest first, not by rank.
+    """
+    current_tab = params.get('tab', 'pending')
+
+    # Filter by tab first
+    tab_filter = {}
+    if current_tab == 'my-uploads':
+        notes = Notes.objects.uploads_of(user)
+        tab_filter = {'uploader_id': user.id}
+    elif current_tab in ('pending', 'approved', 'rejected'):
+        notes = Notes.objects.moderation_queue(current_tab)
+        tab_filter = {'status': current_tab}
+    else:
+        notes = Notes.objects.moderation_queue()
+
+    # Then apply additional filters (exact matches so the catalog index is used)
+    if params.get('year'):
+        notes = notes.filter(year=params['year'])
+    if params.get('branch'):
+        notes = notes.filter(branch=params['branch'])
+    if params.get('subject'):
+        notes = notes.filter(subject=params['subject'])
+    if params.get('search'):
+        notes = notes.filter(id__in=search.search_ids(
+            params['search'], year=params.get('year'), branch=params.get('branch'),
+            subject=params.get('subject'), **tab_filter,
+        ))
+    return notes
+
+
+def bulk_set_status(status, ids=None, queryset=None):
+    """
+    Move many notes to ``status`` with one UPDATE.
+
+    Pass either explicit ``ids`` or a ``queryset`` (e.g. ``dashboard_notes``).
+    Returns ``{note_id: 'updated' | 'unchanged' | 'not_found'}``. Per-note
+    signals are not sent; the status and facet counters move in the same
+    transaction and ``notes_status_changed`` fires once for the batch after
+    it commits.
+    """
+    if queryset is None:
+        queryset = Notes.objects.filter(id__in=ids)
+
+    with transaction.atomic():
+        rows = list(queryset.select_for_update().values('id', *NOTE_STATE_FIELDS))
+        changed = [row for row in rows if row['status'] != status]
+        changed_ids = [row['id'] for row in changed]
+        if changed_ids:
+            # Guard on the old status so a concurrent moderator's change is not reported twice.
+            Notes.objects.filter(id__in=changed_ids).exclude(status=status).update(
+                status=status, updated_at=timezone.now(),
+            )
+            previous_states = [{field: row[field] for field in NOTE_STATE_FIELDS} for row in changed]
+            new_states = [dict(state, status=status) for state in previous_states]
+            counters.apply_deltas(counters.state_deltas(previous_states, new_states))
+            facets.apply_deltas(facets.state_deltas(previous_states, new_states))
+            transaction.on_commit(lambda: notes_status_changed.send(
+                sender=Notes,
+                note_ids=changed_ids,
+                previous_states=previous_states,
+                status=status,
+            ))
+
+    results = {row['id']: 'unchanged' for row in rows}
+    results.update({note_id: 'updated' for note_id in changed_ids})
+    for note_id in ids or ():
+        results.setdefault(note_id, 'not_found')
+    return results
@@ -0,0 +1,96 @@
+import base64
+import binascii
+from datetime import datetime
+
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(row):
+    raw = f'{row.uploaded_at.isoformat()}|{row.id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        uploaded_at, pk = base64.urlsafe_b64decode(padded).decode().split('|')
+        return datetime.fromisoformat(uploaded_at), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise InvalidCursor(cursor) from exc
+
+
+class CursorPage:
+    def __init__(self, object_list, has_next, has_previous):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+
+    @property
+    def next_cursor(self):
+        if self.has_next and self.object_list:
+            return encode_cursor(self.object_list[-1])
+        return ''
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous and self.object_list:
+            return encode_cursor(self.object_list[0])
+        return ''
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """
+    Newest-first pagination keyed on ``(uploaded_at, id)``.
+
+    Each page is a single indexed range scan of ``per_page + 1`` rows, so
+    page N costs the same as page 1 and no ``COUNT(*)`` is ever issued.
+    """
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset
+        self.per_page = per_page
+
+    def get_page(self, after=None, before=None):
+        queryset, backwards, has_cursor = self._window(after, before)
+        return self._page(list(queryset), backwards, has_cursor)
+
+    async def aget_page(self, after=None, before=None):
+        queryset, backwards, has_cursor = self._window(after, before)
+        return self._page([row async for row in queryset], backwards, has_cursor)
+
+    def _window(self, after, before):
+        """Return the ``per_page + 1`` row slice for a cursor and its direction."""
+        try:
+            if before:
+                uploaded_at, pk = decode_cursor(before)
+                queryset = self.queryset.order_by('uploaded_at', 'id').filter(
+                    Q(uploaded_at__gt=uploaded_at) | Q(uploaded_at=uploaded_at, id__gt=pk)
+                )
+                return queryset[:self.per_page + 1], True, True
+            if after:
+                uploaded_at, pk = decode_cursor(after)
+                queryset = self.queryset.order_by('-uploaded_at', '-id').filter(
+                    Q(uploaded_at__lt=uploaded_at) | Q(uploaded_at=uploaded_at, id__lt=pk)
+                )
+                return queryset[:self.per_page + 1], False, True
+        except InvalidCursor:
+            pass
+        return self.queryset.order_by('-uploaded_at', '-id')[:self.per_page + 1], False, False
+
+    def _page(self, rows, backwards, has_cursor):
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+            return CursorPage(rows, has_next=True, has_previous=more)
+        return CursorPage(rows, has_next=more, has_previous=has_cursor)
@@ -0,0 +1,114 @@
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import catalog, search
+from .models import NoteContent, Notes, ProcessingJob
+
+MAX_ATTEMPTS = 3
+
+# A running job older than this is assumed to belong to a dead worker.
+STALE_AFTER = timedelta(minutes=15)
+
+# A preview missing again this soon after a job ran is not queued again.
+PREVIEW_RETRY_AFTER = timedelta(hours=1)
+
+
+def enqueue(note):
+    return ProcessingJob.objects.create(note=note)
+
+
+def backfill(batch_size=1000):
+    """
+    Queue a full job for every note that never had one.
+
+    Notes uploaded before the pipeline existed have no extracted text and no
+    preview until this runs (``process_notes --all``). Returns the number of
+    jobs queued.
+    """
+    notes = Notes.objects.filter(content__isnull=True).exclude(jobs__kind='full').order_by('id')
+    queued = 0
+    last_id = 0
+    while True:
+        ids = list(notes.filter(id__gt=last_id).values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return queued
+        ProcessingJob.objects.bulk_create([ProcessingJob(note_id=note_id) for note_id in ids])
+        queued += len(ids)
+        last_id = ids[-1]
+
+def request_preview(note):
+    """
+    Queue a preview-only job for ``note`` (e.g. its preview was evicted).
+
+    Nothing is queued while a job is pending, after one has failed (a broken
+    PDF would fail again) or within PREVIEW_RETRY_AFTER of the last one, so
+    repeated card requests cost one read each.
+    """
+    recent = ProcessingJob.objects.filter(note=note).filter(
+        Q(status__in=('queued', 'running', 'failed')) | Q(finished_at__gte=timezone.now() - PREVIEW_RETRY_AFTER)
+    )
+    if not recent.exists():
+        ProcessingJob.objects.create(note=note, kind='preview')
+
+
+def requeue_stale():
+    cutoff = timezone.now() - STALE_AFTER
+    return ProcessingJob.objects.filter(status='running', started_at__lt=cutoff).update(status='queued')
+
+
+def claim(batch_size):
+    """Atomically move up to ``batch_size`` queued jobs to running and return them."""
+    now = timezone.now()
+    with transaction.atomic():
+        queued = ProcessingJob.objects.filter(status='queued').order_by('created_at')
+        if connection.features.has_select_for_update_skip_locked:
+            queued = queued.select_for_update(skip_locked=True)
+        ids = list(queued.values_list('id', flat=True)[:batch_size])
+        # The status guard makes the claim safe even without row locks (SQLite).
+        ProcessingJob.objects.filter(id__in=ids, status='queued').update(
+            status='running',
+            started_at=now,
+            attempts=F('attempts') + 1,
+        )
+    return list(
+        ProcessingJob.objects.filter(id__in=ids, status='running', started_at=now)
+        .select_related('note__uploader')
+    )
+
+
+def complete(job, result):
+    if job.kind == 'preview':
+        # Only the preview file changed; text, index and catalog stay as they are.
+        ProcessingJob.objects.filter(pk=job.pk).update(status='done', error='', finished_at=timezone.now())
+        return
+    with transaction.atomic():
+        NoteContent.objects.update_or_create(
+            note=job.note,
+            defaults={
+                'text': result['text'],
+                'page_count': result['page_count'],
+                'metadata': result['metadata'],
+                'extracted_at': timezone.now(),
+            },
+        )
+        search.index_note(job.note, body=result['text'])
+        # PDF text is searchable now, so ?search= results can change.
+        catalog.bump_version()
+        ProcessingJob.objects.filter(pk=job.pk).update(
+            status='done',
+            error='',
+            finished_at=timezone.now(),
+        )
+
+
+def fail(job, error):
+    status = 'failed' if job.attempts >= MAX_ATTEMPTS else 'queued'
+    ProcessingJob.objects.filter(pk=job.pk).update(
+        status=status,
+        error=str(error)[:2000],
+        finished_at=timezone.now(),
+    )
+    return status
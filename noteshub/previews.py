@@ -0,0 +1,182 @@
+"""
+First-page previews for note cards.
+
+Previews are rendered by the ``process_notes`` worker pool (nothing here
+touches the database) and kept in a size-bounded directory keyed by the
+PDF's SHA-256, so notes sharing a blob share a preview. There is no PDF
+rasterizer among the dependencies, so a scanned first page is previewed by
+its embedded JPEG (shrunk when Pillow is installed) and any other page is
+drawn as a small SVG of its text.
+"""
+import io
+import os
+import re
+import tempfile
+import time
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+
+from . import extraction
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - optional dependency
+    Image = None
+
+WIDTH, HEIGHT = 240, 340
+
+# Without Pillow an embedded JPEG is served as-is, so only small ones are used.
+MAX_EMBEDDED_BYTES = 256 * 1024
+
+# A first page with less text than this and an image is treated as a scan.
+SCAN_TEXT_CHARS = 40
+
+MAX_LINES = 30
+MAX_LINE_CHARS = 48
+
+# Recently served previews are re-touched at most this often (LRU by mtime).
+TOUCH_INTERVAL = 3600
+
+CONTENT_TYPES = {
+    '.jpg': 'image/jpeg',
+    '.svg': 'image/svg+xml',
+}
+
+_CONTROL_RE = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+
+def cache_dir():
+    return settings.NOTESHUB_PREVIEW_DIR
+
+
+def _base_path(digest):
+    return os.path.join(cache_dir(), digest[:2], digest)
+
+
+def cached_path(digest):
+    """Path of the stored preview for ``digest``, or None."""
+    base = _base_path(digest)
+    for ext in CONTENT_TYPES:
+        if os.path.exists(base + ext):
+            return base + ext
+    return None
+
+
+def content_type(path):
+    return CONTENT_TYPES[os.path.splitext(path)[1]]
+
+
+def touch(path):
+    try:
+        if os.stat(path).st_mtime < time.time() - TOUCH_INTERVAL:
+            os.utime(path)
+    except FileNotFoundError:
+        pass
+
+
+# ===================== RENDERING =====================
+def _thumbnail(jpeg):
+    if Image is None:
+        return jpeg if len(jpeg) <= MAX_EMBEDDED_BYTES else None
+    image = Image.open(io.BytesIO(jpeg))
+    # JPEG draft mode decodes at 1/2..1/8 scale, skipping most of the work.
+    image.draft('RGB', (WIDTH, HEIGHT))
+    image = image.convert('RGB')
+    image.thumbnail((WIDTH, HEIGHT))
+    out = io.BytesIO()
+    image.save(out, 'JPEG', quality=70, optimize=True)
+    return out.getvalue()
+
+
+def _svg_page(text):
+    lines = []
+    for line in _CONTROL_RE.sub('', text).splitlines():
+        line = ' '.join(line.split())
+        while line and len(lines) < MAX_LINES:
+            lines.append(line[:MAX_LINE_CHARS])
+            line = line[MAX_LINE_CHARS:]
+    if not lines:
+        lines = ['No text on the first page']
+
+    rows = ''.join(
+        f'<text x="14" y="{24 + i * 10}">{escape(line)}</text>'
+        for i, line in enumerate(lines)
+    )
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{WIDTH}" height="{HEIGHT}" '
+        f'viewBox="0 0 {WIDTH} {HEIGHT}">'
+        f'<rect width="{WIDTH}" height="{HEIGHT}" fill="#fff" stroke="#ddd"/>'
+        f'<g font-family="sans-serif" font-size="7" fill="#444">{rows}</g>'
+        '</svg>'
+    ).encode()
+
+
+def render(pdf_path):
+    """Return ``(extension, bytes)`` for the preview of the PDF at ``pdf_path``."""
+    try:
+        page = extraction.first_page(pdf_path)
+    except Exception:
+        # Unparseable first page: fall back to a blank card rather than failing the job.
+        page = {'text': '', 'image': None}
+
+    if page['image'] and len(page['text'].strip()) < SCAN_TEXT_CHARS:
+        try:
+            jpeg = _thumbnail(page['image'])
+        except Exception:
+            jpeg = None
+        if jpeg:
+            return '.jpg', jpeg
+    return '.svg', _svg_page(page['text'])
+
+
+def generate(pdf_path, digest):
+    """Render and store the preview for ``digest`` unless it is already cached."""
+    path = cached_path(digest)
+    if path:
+        return path
+    ext, data = render(pdf_path)
+    path = _base_path(digest) + ext
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.part')
+    with os.fdopen(fd, 'wb') as tmp:
+        tmp.write(data)
+    os.replace(tmp_path, path)
+    return path
+
+
+# ===================== EVICTION =====================
+def prune(max_bytes=None):
+    """
+    Delete the least recently used previews until the cache fits ``max_bytes``.
+
+    An evicted preview is queued for ``process_notes`` again on its next
+    request, so pruning to 90% of the limit keeps this from running on every new preview.
+    """
+    if max_bytes is None:
+        max_bytes = settings.NOTESHUB_PREVIEW_CACHE_BYTES
+    entries, total = [], 0
+    root = cache_dir()
+    if not os.path.isdir(root):
+        return 0
+    for bucket in os.scandir(root):
+        if not bucket.is_dir():
+            continue
+        for entry in os.scandir(bucket.path):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+    if total <= max_bytes:
+        return 0
+
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes * 0.9:
+            break
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed += 1
+    return removed
@@ -0,0 +1,257 @@
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter, deque
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends.django import Template as DjangoTemplate
+
+# Samples kept per metric and view; older samples roll off.
+WINDOW = 1000
+
+# The same query shape this many times in one request is reported as N+1.
+REPEAT_THRESHOLD = 5
+
+METRICS = ('queries', 'db_ms', 'template_ms', 'total_ms', 'bytes')
+
+_current = ContextVar('noteshub_request_profile', default=None)
+
+_QUOTED_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\((?:\s*(?:\?|%s)\s*,)+\s*(?:\?|%s)\s*\)')
+
+
+def sql_shape(sql):
+    """Strip literals so queries that differ only in parameters compare equal."""
+    sql = _QUOTED_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    return _IN_LIST_RE.sub('(...)', sql)
+
+
+class RollingHistogram:
+    def __init__(self, size=WINDOW):
+        self.samples = deque(maxlen=size)
+        self.total = 0
+
+    def add(self, value):
+        self.samples.append(value)
+        self.total += 1
+
+    def percentile(self, pct):
+        ordered = sorted(self.samples)
+        if not ordered:
+            return None
+        index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+        return ordered[index]
+
+    def merge(self, samples, total):
+        self.samples.extend(samples)
+        self.total += total
+
+    def summary(self):
+        return {
+            'count': self.total,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+            'max': max(self.samples) if self.samples else None,
+        }
+
+
+class RequestProfile:
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+            self.shapes[sql_shape(sql)] += 1
+
+    def repeated_queries(self):
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= REPEAT_THRESHOLD]
+
+
+class ViewStats:
+    def __init__(self):
+        self.histograms = {metric: RollingHistogram() for metric in METRICS}
+        self.n_plus_one = 0
+        self.last_repeated = []
+
+    def summary(self):
+        data = {metric: histogram.summary() for metric, histogram in self.histograms.items()}
+        data['n_plus_one_requests'] = self.n_plus_one
+        data['repeated_queries'] = [{'sql': shape, 'count': count} for shape, count in self.last_repeated]
+        return data
+
+    def export(self):
+        return {
+            'histograms': {
+                metric: {'samples': list(histogram.samples), 'total': histogram.total}
+                for metric, histogram in self.histograms.items()
+            },
+            'n_plus_one': self.n_plus_one,
+            'repeated': self.last_repeated,
+        }
+
+    def merge(self, data):
+        for metric, histogram in data['histograms'].items():
+            self.histograms[metric].merge(histogram['samples'], histogram['total'])
+        self.n_plus_one += data['n_plus_one']
+        self.last_repeated = [tuple(item) for item in data['repeated']] or self.last_repeated
+
+
+class StatsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def record(self, view_name, profile, total_time, size):
+        repeated = profile.repeated_queries()
+        with self._lock:
+            stats = self._views.setdefault(view_name, ViewStats())
+            stats.histograms['queries'].add(profile.queries)
+            stats.histograms['db_ms'].add(profile.db_time * 1000)
+            stats.histograms['template_ms'].add(profile.template_time * 1000)
+            stats.histograms['total_ms'].add(total_time * 1000)
+            if size is not None:
+                stats.histograms['bytes'].add(size)
+            if repeated:
+                stats.n_plus_one += 1
+                stats.last_repeated = repeated[:5]
+
+    def snapshot(self):
+        with self._lock:
+            return {name: stats.summary() for name, stats in sorted(self._views.items())}
+
+    def export(self):
+        with self._lock:
+            return {name: stats.export() for name, stats in self._views.items()}
+
+    def merge(self, views):
+        with self._lock:
+            for name, data in views.items():
+                self._views.setdefault(name, ViewStats()).merge(data)
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+
+registry = StatsRegistry()
+
+
+# ===================== TEMPLATE TIMING =====================
+_original_render = None
+
+
+def _timed_render(self, context=None, request=None):
+    profile = _current.get()
+    if profile is None:
+        return _original_render(self, context, request)
+    # Only the outermost render is timed; nested render_to_string calls are part of it.
+    profile.template_depth += 1
+    start = time.perf_counter()
+    try:
+        return _original_render(self, context, request)
+    finally:
+        profile.template_depth -= 1
+        if profile.template_depth == 0:
+            profile.template_time += time.perf_counter() - start
+
+
+def install_template_timer():
+    global _original_render
+    if _original_render is None:
+        _original_render = DjangoTemplate.render
+        DjangoTemplate.render = _timed_render
+
+
+# ===================== MIDDLEWARE =====================
+def _response_size(response):
+    if response.streaming:
+        length = response.get('Content-Length')
+        return int(length) if length else None
+    return len(response.content)
+
+
+class QueryStatsMiddleware:
+    """
+    Opt-in per-view cost report, enabled with ``NOTESHUB_PROFILING``.
+
+    Put it first in MIDDLEWARE so session and auth queries are counted. The
+    numbers live in each web process's memory, so every process also writes
+    its raw samples to ``NOTESHUB_PROFILING_DIR`` every
+    ``NOTESHUB_PROFILING_DUMP_INTERVAL`` seconds for ``profile_report``.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'NOTESHUB_PROFILING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.dump_dir = getattr(settings, 'NOTESHUB_PROFILING_DIR', None)
+        self.dump_interval = getattr(settings, 'NOTESHUB_PROFILING_DUMP_INTERVAL', 30)
+        self.last_dump = time.monotonic()
+        install_template_timer()
+
+    def __call__(self, request):
+        profile = RequestProfile()
+        token = _current.set(profile)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for conn in connections.all():
+                    stack.enter_context(conn.execute_wrapper(profile))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total_time = time.perf_counter() - start
+
+        match = getattr(request, 'resolver_match', None)
+        view_name = (match.url_name or match.view_name) if match else 'unresolved'
+        registry.record(view_name, profile, total_time, _response_size(response))
+        self._maybe_dump()
+        return response
+
+    def _maybe_dump(self):
+        if not self.dump_dir or time.monotonic() - self.last_dump < self.dump_interval:
+            return
+        self.last_dump = time.monotonic()
+        dump(self.dump_dir)
+
+
+# ===================== DUMPS =====================
+DUMP_PREFIX = 'noteshub-profile-'
+
+
+def dump(directory):
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{DUMP_PREFIX}{os.getpid()}.json')
+    with open(f'{path}.tmp', 'w') as f:
+        json.dump({'pid': os.getpid(), 'written_at': time.time(), 'views': registry.export()}, f)
+    os.replace(f'{path}.tmp', path)
+
+
+def load_dumps(directory):
+    """Merge the samples dumped by every web process into one registry."""
+    merged = StatsRegistry()
+    if not os.path.isdir(directory):
+        return merged
+    for filename in sorted(os.listdir(directory)):
+        if filename.startswith(DUMP_PREFIX) and filename.endswith('.json'):
+            with open(os.path.join(directory, filename)) as f:
+                merged.merge(json.load(f)['views'])
+    return merged
@@ -0,0 +1,148 @@
+"""
+Bulk account creation for ``manage.py import_users``.
+
+Rows are checked against the rest of the file and against the database
+before any password is hashed, so a re-run over an already imported intake
+costs one lookup per batch instead of a hash per user. The surviving rows
+are hashed by the command's process pool and each batch is written by
+``insert`` with a single ``bulk_create`` in its own transaction.
+"""
+import csv
+import secrets
+
+from django.db import transaction
+from django.db.models import Q
+
+from .models import CustomUser
+
+ROLES = ('student', 'teacher')
+
+ROLL_NUMBER_LENGTH = CustomUser._meta.get_field('roll_number').max_length
+USERNAME_LENGTH = CustomUser._meta.get_field('username').max_length
+
+
+class ImportRow:
+    __slots__ = ('line', 'roll_number', 'username', 'password', 'role', 'generated')
+
+    def __init__(self, line, roll_number, username, password, role):
+        self.line = line
+        self.roll_number = roll_number
+        self.username = username or None
+        self.password = password
+        self.role = role
+        self.generated = False
+
+
+def read_rows(lines, default_role='student'):
+    """
+    Stream ``ImportRow`` objects from CSV text with a header line.
+
+    ``roll_number`` is required; ``username``, ``password`` and ``role``
+    columns are optional.
+    """
+    reader = csv.DictReader(lines)
+    if 'roll_number' not in (reader.fieldnames or ()):
+        raise ValueError('The CSV header must include a roll_number column.')
+    for record in reader:
+        yield ImportRow(
+            reader.line_num,
+            (record.get('roll_number') or '').strip(),
+            (record.get('username') or '').strip(),
+            record.get('password') or '',
+            (record.get('role') or default_role).strip().lower(),
+        )
+
+
+def _problem(row):
+    if not row.roll_number:
+        return 'missing roll number'
+    if len(row.roll_number) > ROLL_NUMBER_LENGTH:
+        return f'roll number longer than {ROLL_NUMBER_LENGTH} characters'
+    if row.username and len(row.username) > USERNAME_LENGTH:
+        return f'username longer than {USERNAME_LENGTH} characters'
+    if row.role not in ROLES:
+        return f"unknown role '{row.role}'"
+    if row.role == 'teacher' and not row.username:
+        return 'teachers need a username to log in'
+    return None
+
+
+def check(rows, seen, generate_passwords=False):
+    """
+    Split a batch into rows to create and ``(row, reason)`` pairs to skip.
+
+    ``seen`` holds the roll numbers and usernames accepted from earlier
+    batches; it is updated in place.
+    """
+    accepted, skipped = [], []
+    for row in rows:
+        reason = _problem(row)
+        if reason is None and not row.password:
+            if generate_passwords:
+                row.password, row.generated = secrets.token_urlsafe(9), True
+            else:
+                reason = 'missing password'
+        if reason is None and row.roll_number in seen['roll_number']:
+            reason = f'roll number {row.roll_number} appears earlier in the file'
+        if reason is None and row.username and row.username in seen['username']:
+            reason = f'username {row.username} appears earlier in the file'
+        if reason:
+            skipped.append((row, reason))
+            continue
+        seen['roll_number'].add(row.roll_number)
+        if row.username:
+            seen['username'].add(row.username)
+        accepted.append(row)
+
+    # One indexed lookup for the whole batch
+    roll_numbers = [row.roll_number for row in accepted]
+    usernames = [row.username for row in accepted if row.username]
+    existing = CustomUser.objects.filter(Q(roll_number__in=roll_numbers) | Q(username__in=usernames))
+    taken_roll_numbers, taken_usernames = set(), set()
+    for roll_number, username in existing.values_list('roll_number', 'username'):
+        taken_roll_numbers.add(roll_number)
+        if username:
+            taken_usernames.add(username)
+
+    fresh = []
+    for row in accepted:
+        if row.roll_number in taken_roll_numbers:
+            skipped.append((row, f'roll number {row.roll_number} already exists'))
+        elif row.username and row.username in taken_usernames:
+            skipped.append((row, f'username {row.username} already exists'))
+        else:
+            fresh.append(row)
+    return fresh, skipped
+
+
+def insert(rows, password_hashes):
+    """
+    Create users for ``rows`` with their precomputed password hashes.
+
+    Returns ``(created, conflicts)``. Accounts created by someone else since
+    ``check`` are left alone and reported as conflicts; the random salt makes
+    every hash unique, so a stored hash identifies the rows this call wrote.
+    """
+    users = [
+        CustomUser(
+            roll_number=row.roll_number,
+            username=row.username,
+            password=password_hash,
+            is_teacher=row.role == 'teacher',
+            is_student=row.role == 'student',
+        )
+        for row, password_hash in zip(rows, password_hashes)
+    ]
+    with transaction.atomic():
+        CustomUser.objects.bulk_create(users, ignore_conflicts=True)
+        stored = set(
+            CustomUser.objects.filter(roll_number__in=[row.roll_number for row in rows])
+            .values_list('password', flat=True)
+        )
+    created, conflicts = [], []
+    for row, user in zip(rows, users):
+        if user.password in stored:
+            created.append(row)
+        else:
+            conflicts.append((row, f'roll number {row.roll_number} or username {row.username} was taken meanwhile'))
+    return created, conflicts
@@ -0,0 +1,235 @@
+import re
+
+from django.conf import settings
+from django.db import connection
+
+from .models import Notes
+
+SQLITE_TABLE = 'noteshub_notes_fts'
+POSTGRES_TABLE = 'noteshub_notes_search'
+NOTES_TABLE = 'noteshub_notes'
+USERS_TABLE = 'noteshub_customuser'
+CONTENT_TABLE = 'noteshub_notecontent'
+
+# Uploader column of the index, as document_fields() computes it, for bulk rebuilds.
+UPLOADER_SQL = "COALESCE(NULLIF(u.username, ''), u.roll_number)"
+REINDEX_SOURCE = (
+    f'FROM {NOTES_TABLE} n JOIN {USERS_TABLE} u ON u.id = n.uploader_id '
+    f'LEFT JOIN {CONTENT_TABLE} c ON c.note_id = n.id'
+)
+
+# Exact-match note columns search_ids() can narrow by inside the index query
+FILTER_COLUMNS = ('status', 'year', 'branch', 'subject', 'uploader_id')
+
+
+def max_results():
+    """Hits beyond this many best matches (after filters) are never ranked or paged through."""
+    return getattr(settings, 'NOTESHUB_SEARCH_MAX_RESULTS', 1000)
+
+
+def query_terms(query):
+    return re.findall(r'\w+', query or '')[:16]
+
+
+# Note columns the indexed document is built from
+INDEXED_FIELDS = ('subject', 'chapter', 'branch', 'uploader_id')
+
+
+def document_fields(note):
+    return {
+        'subject': note.subject,
+        'chapter': note.chapter,
+        'branch': note.branch,
+        # The name the cards show (NoteRow.uploader_name)
+        'uploader': str(note.uploader),
+    }
+
+
+class SqliteSearchBackend:
+    """FTS5 index whose rowid is the note id, ranked with bm25()."""
+
+    def create(self, cursor):
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_TABLE} USING fts5("
+            "subject, chapter, branch, uploader, body, tokenize='porter unicode61')"
+        )
+
+    def drop(self, cursor):
+        cursor.execute(f'DROP TABLE IF EXISTS {SQLITE_TABLE}')
+
+    def index(self, cursor, note_id, fields, body=None):
+        if body is None:
+            cursor.execute(f'SELECT body FROM {SQLITE_TABLE} WHERE rowid = %s', [note_id])
+            row = cursor.fetchone()
+            body = row[0] if row else ''
+        cursor.execute(f'DELETE FROM {SQLITE_TABLE} WHERE rowid = %s', [note_id])
+        cursor.execute(
+            f'INSERT INTO {SQLITE_TABLE} (rowid, subject, chapter, branch, uploader, body) '
+            'VALUES (%s, %s, %s, %s, %s, %s)',
+            [note_id, fields['subject'], fields['chapter'], fields['branch'], fields['uploader'] or '', body],
+        )
+
+    def reindex(self, cursor):
+        cursor.execute(f'DELETE FROM {SQLITE_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {SQLITE_TABLE} (rowid, subject, chapter, branch, uploader, body) '
+            f"SELECT n.id, n.subject, n.chapter, n.branch, {UPLOADER_SQL}, COALESCE(c.text, '') {REINDEX_SOURCE}"
+        )
+
+    def remove(self, cursor, note_ids):
+        cursor.execute(
+            f"DELETE FROM {SQLITE_TABLE} WHERE rowid IN ({', '.join(['%s'] * len(note_ids))})",
+            list(note_ids),
+        )
+
+    def search(self, cursor, terms, filters, limit, offset):
+        match = ' '.join('"%s"*' % term for term in terms)
+        sql = (
+            f'SELECT n.id FROM {SQLITE_TABLE} f JOIN {NOTES_TABLE} n ON n.id = f.rowid '
+            f'WHERE {SQLITE_TABLE} MATCH %s'
+        )
+        params = [match]
+        for column, value in filters.items():
+            sql += f' AND n.{column} = %s'
+            params.append(value)
+        sql += f' ORDER BY bm25({SQLITE_TABLE}, 10.0, 8.0, 3.0, 2.0, 1.0) LIMIT %s OFFSET %s'
+        cursor.execute(sql, params + [limit, offset])
+        return [row[0] for row in cursor.fetchall()]
+
+
+class PostgresSearchBackend:
+    """Weighted tsvector per note with a GIN index, ranked with ts_rank_cd()."""
+
+    def create(self, cursor):
+        cursor.execute(
+            f'CREATE TABLE IF NOT EXISTS {POSTGRES_TABLE} ('
+            f'note_id bigint PRIMARY KEY REFERENCES {NOTES_TABLE} (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, '
+            "body text NOT NULL DEFAULT '', "
+            'document tsvector NOT NULL)'
+        )
+        cursor.execute(
+            f'CREATE INDEX IF NOT EXISTS {POSTGRES_TABLE}_document_gin ON {POSTGRES_TABLE} USING GIN (document)'
+        )
+
+    def drop(self, cursor):
+        cursor.execute(f'DROP TABLE IF EXISTS {POSTGRES_TABLE}')
+
+    @staticmethod
+    def _document(body_sql, fields_sql=('%s', '%s', '%s', '%s')):
+        subject, chapter, branch, uploader = fields_sql
+        return (
+            f"setweight(to_tsvector('simple', {subject}), 'A') || "
+            f"setweight(to_tsvector('simple', {chapter}), 'A') || "
+            f"setweight(to_tsvector('simple', {branch}), 'C') || "
+            f"setweight(to_tsvector('simple', {uploader}), 'C') || "
+            f"setweight(to_tsvector('simple', {body_sql}), 'D')"
+        )
+
+    def index(self, cursor, note_id, fields, body=None):
+        values = [fields['subject'], fields['chapter'], fields['branch'], fields['uploader'] or '']
+        if body is None:
+            # Keep the extracted text already stored for this note.
+            insert_document = self._document("''")
+            update_document = self._document(f'{POSTGRES_TABLE}.body')
+            cursor.execute(
+                f"INSERT INTO {POSTGRES_TABLE} (note_id, body, document) VALUES (%s, '', {insert_document}) "
+                f'ON CONFLICT (note_id) DO UPDATE SET document = {update_document}',
+                [note_id] + values + values,
+            )
+        else:
+            document = self._document('%s')
+            cursor.execute(
+                f'INSERT INTO {POSTGRES_TABLE} (note_id, body, document) VALUES (%s, %s, {document}) '
+                'ON CONFLICT (note_id) DO UPDATE SET body = EXCLUDED.body, document = EXCLUDED.document',
+                [note_id, body] + values + [body],
+            )
+
+    def reindex(self, cursor):
+        body = "COALESCE(c.text, '')"
+        document = self._document(body, ('n.subject', 'n.chapter', 'n.branch', UPLOADER_SQL))
+        cursor.execute(f'TRUNCATE {POSTGRES_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {POSTGRES_TABLE} (note_id, body, document) '
+            f'SELECT n.id, {body}, {document} {REINDEX_SOURCE}'
+        )
+
+    def remove(self, cursor, note_ids):
+        cursor.execute(f'DELETE FROM {POSTGRES_TABLE} WHERE note_id = ANY(%s)', [list(note_ids)])
+
+    def search(self, cursor, terms, filters, limit, offset):
+        tsquery = ' & '.join('%s:*' % term for term in terms)
+        sql = (
+            f'SELECT n.id FROM {POSTGRES_TABLE} s JOIN {NOTES_TABLE} n ON n.id = s.note_id, '
+            "to_tsquery('simple', %s) q WHERE s.document @@ q"
+        )
+        params = [tsquery]
+        for column, value in filters.items():
+            sql += f' AND n.{column} = %s'
+            params.append(value)
+        sql += ' ORDER BY ts_rank_cd(s.document, q) DESC, n.id DESC LIMIT %s OFFSET %s'
+        cursor.execute(sql, params + [limit, offset])
+        return [row[0] for row in cursor.fetchall()]
+
+
+BACKENDS = {
+    'sqlite': SqliteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_backend(conn=None):
+    backend = BACKENDS.get((conn or connection).vendor)
+    return backend() if backend else None
+
+
+def index_note(note, body=None):
+    backend = get_backend()
+    if backend is not None:
+        with connection.cursor() as cursor:
+            backend.index(cursor, note.pk, document_fields(note), body)
+
+
+def index_uploader_notes(user_id):
+    """Re-index every note of ``user_id``, e.g. after their username or roll number changed."""
+    backend = get_backend()
+    if backend is not None:
+        with connection.cursor() as cursor:
+            for note in Notes.objects.filter(uploader_id=user_id).select_related('uploader').iterator():
+                backend.index(cursor, note.pk, document_fields(note))
+
+
+def reindex_all():
+    """Rebuild the whole index from the notes table in one statement (e.g. after bulk inserts)."""
+    backend = get_backend()
+    if backend is not None:
+        with connection.cursor() as cursor:
+            backend.reindex(cursor)
+
+
+def remove_notes(note_ids):
+    backend = get_backend()
+    if backend is not None and note_ids:
+        with connection.cursor() as cursor:
+            backend.remove(cursor, note_ids)
+
+
+def search_ids(query, limit=None, offset=0, **filters):
+    """
+    Return note ids matching ``query``, best match first.
+
+    Keyword ``filters`` (see ``FILTER_COLUMNS``; empty values are ignored)
+    are applied in the index query, so the ``max_results()`` cap counts only
+    notes that pass them.
+    """
+    unknown = set(filters) - set(FILTER_COLUMNS)
+    if unknown:
+        raise TypeError(f"Unknown search filters: {', '.join(sorted(unknown))}")
+    filters = {column: value for column, value in filters.items() if value}
+    terms = query_terms(query)
+    backend = get_backend()
+    cap = max_results()
+    if not terms or backend is None or offset >= cap:
+        return []
+    limit = cap - offset if limit is None else min(limit, cap - offset)
+    with connection.cursor() as cursor:
+        return backend.search(cursor, terms, filters, limit, offset)
@@ -0,0 +1,250 @@
+import asyncio
+import os
+import re
+from urllib.parse import quote
+from uuid import uuid4
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+CHUNK_SIZE = 64 * 1024
+
+# More ranges than this in one request are answered with the whole file.
+MAX_RANGES = 16
+
+_RANGE_SPEC_RE = re.compile(r'^(\d*)-(\d*)$')
+
+
+class PdfTransfer:
+    """
+    Everything needed to answer a request for one note's PDF.
+
+    ``prepare`` resolves validators, conditional headers and Range into either
+    a finished response (304, 412, 416 or a proxy hand-off) or a list of byte
+    segments; the sync and async views only differ in how they stream those.
+    """
+
+    def __init__(self, note, disposition):
+        self.path = note.pdf.path
+        stat = os.stat(self.path)
+        self.size = stat.st_size
+        self.last_modified = int(stat.st_mtime)
+        self.etag = quote_etag(note.blob_id or f'{stat.st_size:x}-{self.last_modified:x}')
+        self.storage_name = note.pdf.name
+        self.filename = f'{note.subject}_{note.chapter}.pdf'
+        self.disposition = disposition
+        self.ranges = None
+        self.boundary = None
+
+    # ===================== REQUEST PARSING =====================
+    def parse_ranges(self, header):
+        """Return [(start, end)] inclusive, [] if unsatisfiable, None to ignore."""
+        unit, _, spec = header.partition('=')
+        if unit.strip() != 'bytes' or not spec:
+            return None
+        ranges = []
+        for part in spec.split(','):
+            match = _RANGE_SPEC_RE.match(part.strip())
+            if not match or match.groups() == ('', ''):
+                return None
+            first, last = match.groups()
+            if first == '':
+                length = int(last)
+                if length == 0:
+                    continue
+                start, end = max(self.size - length, 0), self.size - 1
+            else:
+                start = int(first)
+                end = min(int(last), self.size - 1) if last else self.size - 1
+                if last and int(last) < start:
+                    return None
+                if start >= self.size:
+                    continue
+            ranges.append((start, end))
+        if len(ranges) > MAX_RANGES:
+            return None
+        return self._coalesce(ranges)
+
+    @staticmethod
+    def _coalesce(ranges):
+        merged = []
+        for start, end in sorted(ranges):
+            if merged and start <= merged[-1][1] + 1:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        return merged
+
+    def _if_range_matches(self, request):
+        if_range = request.META.get('HTTP_IF_RANGE')
+        if not if_range:
+            return True
+        if if_range.startswith(('"', 'W/')):
+            return if_range == self.etag
+        return parse_http_date_safe(if_range) == self.last_modified
+
+    # ===================== RESPONSE PLANNING =====================
+    def prepare(self, request):
+        response = get_conditional_response(request, etag=self.etag, last_modified=self.last_modified)
+        if response is not None:
+            return self.finish(response)
+
+        sendfile = self._sendfile_response()
+        if sendfile is not None:
+            return sendfile
+
+        range_header = request.META.get('HTTP_RANGE')
+        if range_header and self.size and self._if_range_matches(request):
+            ranges = self.parse_ranges(range_header)
+            if ranges == []:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{self.size}'
+                return self.finish(response)
+            if ranges:
+                self.ranges = ranges
+                if len(ranges) > 1:
+                    self.boundary = uuid4().hex
+        return None
+
+    def _sendfile_response(self):
+        backend = getattr(settings, 'NOTESHUB_SENDFILE_BACKEND', None)
+        if not backend:
+            return None
+        response = HttpResponse(content_type='application/pdf')
+        if backend == 'nginx':
+            prefix = getattr(settings, 'NOTESHUB_SENDFILE_URL', '/protected-media/')
+            response['X-Accel-Redirect'] = prefix + quote(self.storage_name)
+        else:
+            response['X-Sendfile'] = self.path
+        # The proxy serves the body and answers Range from the file itself.
+        return self.finish(response)
+
+    def finish(self, response):
+        response['ETag'] = self.etag
+        response['Last-Modified'] = http_date(self.last_modified)
+        response['Accept-Ranges'] = 'bytes'
+        response['Cache-Control'] = 'private, no-cache'
+        if response.status_code in (200, 206):
+            response['Content-Disposition'] = self.content_disposition()
+        return response
+
+    def content_disposition(self):
+        ascii_name = self.filename.encode('ascii', 'ignore').decode().replace('"', '')
+        return (
+            f'{self.disposition}; filename="{ascii_name}"; '
+            f"filename*=UTF-8''{quote(self.filename)}"
+        )
+
+    # ===================== BODY =====================
+    def part_header(self, start, end):
+        return (
+            f'--{self.boundary}\r\n'
+            'Content-Type: application/pdf\r\n'
+            f'Content-Range: bytes {start}-{end}/{self.size}\r\n\r\n'
+        ).encode()
+
+    def closing_boundary(self):
+        return f'\r\n--{self.boundary}--\r\n'.encode()
+
+    def body_length(self):
+        if self.ranges is None:
+            return self.size
+        if self.boundary is None:
+            start, end = self.ranges[0]
+            return end - start + 1
+        length = len(self.closing_boundary())
+        for index, (start, end) in enumerate(self.ranges):
+            length += len(self.part_header(start, end)) + (end - start + 1) + (2 if index else 0)
+        return length
+
+    def segments(self):
+        """Yield ``bytes`` literals and ``(start, end)`` file spans in body order."""
+        if self.boundary is None:
+            yield self.ranges[0]
+            return
+        for index, (start, end) in enumerate(self.ranges):
+            yield (b'\r\n' if index else b'') + self.part_header(start, end)
+            yield (start, end)
+        yield self.closing_boundary()
+
+    def apply_headers(self, response):
+        response['Content-Length'] = str(self.body_length())
+        if self.boundary is not None:
+            response['Content-Type'] = f'multipart/byteranges; boundary={self.boundary}'
+        else:
+            response['Content-Type'] = 'application/pdf'
+            start, end = self.ranges[0]
+            response['Content-Range'] = f'bytes {start}-{end}/{self.size}'
+        return self.finish(response)
+
+    def iter_body(self):
+        with open(self.path, 'rb') as f:
+            for segment in self.segments():
+                if isinstance(segment, bytes):
+                    yield segment
+                    continue
+                start, end = segment
+                f.seek(start)
+                remaining = end - start + 1
+                while remaining > 0:
+                    chunk = f.read(min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    yield chunk
+
+    async def aiter_body(self):
+        """
+        Async twin of ``iter_body``; also streams whole files (``ranges`` None).
+
+        Reads run in the default executor one chunk at a time and the next read
+        only starts once the server has taken the previous chunk, so a slow
+        client holds one open file and one buffer, not a thread.
+        """
+        spans = [(0, self.size - 1)] if self.ranges is None else self.segments()
+        f = await asyncio.to_thread(open, self.path, 'rb')
+        try:
+            for segment in spans:
+                if isinstance(segment, bytes):
+                    yield segment
+                    continue
+                start, end = segment
+                await asyncio.to_thread(f.seek, start)
+                remaining = end - start + 1
+                while remaining > 0:
+                    chunk = await asyncio.to_thread(f.read, min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    yield chunk
+        finally:
+            await asyncio.to_thread(f.close)
+
+
+def serve_pdf(request, note, disposition='inline'):
+    transfer = PdfTransfer(note, disposition)
+    response = transfer.prepare(request)
+    if response is not None:
+        return response
+    if transfer.ranges is None:
+        # Whole file: FileResponse lets the server use wsgi.file_wrapper/sendfile().
+        response = FileResponse(open(transfer.path, 'rb'), content_type='application/pdf')
+        return transfer.finish(response)
+    response = StreamingHttpResponse(transfer.iter_body(), status=206)
+    return transfer.apply_headers(response)
+
+
+async def aserve_pdf(request, note, disposition='inline'):
+    # Under ASGI Django reads a sync FileResponse fully into memory first; stream async chunks instead.
+    transfer = await asyncio.to_thread(PdfTransfer, note, disposition)
+    response = transfer.prepare(request)
+    if response is not None:
+        return response
+    if transfer.ranges is None:
+        response = StreamingHttpResponse(transfer.aiter_body(), content_type='application/pdf')
+        response['Content-Length'] = str(transfer.size)
+        return transfer.finish(response)
+    response = StreamingHttpResponse(transfer.aiter_body(), status=206)
+    return transfer.apply_headers(response)
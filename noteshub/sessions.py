@@ -0,0 +1,49 @@
+"""
+Session engine: ``SESSION_ENGINE = 'noteshub.sessions'``.
+
+Django's cached_db store (write-through cache in front of the session table)
+that also skips the write when a session marked as modified still holds the
+data it was loaded with, so reads such as the dashboards never reach the
+session table once the cache is warm.
+"""
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+
+
+class SessionStore(CachedDBStore):
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        self._loaded_state = None
+
+    def _state(self, data):
+        # Compare the serialized data, not encode(): that output is signed with a timestamp.
+        return self.serializer().dumps(data)
+
+    def _unchanged(self, must_create):
+        return (
+            not must_create
+            and self.session_key is not None
+            and self._loaded_state is not None
+            and self._state(self._session) == self._loaded_state
+        )
+
+    def load(self):
+        data = super().load()
+        self._loaded_state = self._state(data)
+        return data
+
+    async def aload(self):
+        data = await super().aload()
+        self._loaded_state = self._state(data)
+        return data
+
+    def save(self, must_create=False):
+        if self._unchanged(must_create):
+            return
+        super().save(must_create)
+        self._loaded_state = self._state(self._session)
+
+    async def asave(self, must_create=False):
+        if self._unchanged(must_create):
+            return
+        await super().asave(must_create)
+        self._loaded_state = self._state(self._session)
@@ -0,0 +1,167 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import Signal, receiver
+
+from . import backends, blobs, caching, catalog, counters, facets, pipeline, search
+from .models import CustomUser, Notes
+
+# Sent once per bulk moderation batch (see moderation.bulk_set_status) with
+# note_ids, previous_states and the new status. Per-note save signals are not
+# sent for those notes, so every cache below must also listen here.
+notes_status_changed = Signal()
+
+PREVIOUS_STATE_FIELDS = tuple(dict.fromkeys(caching.NOTE_STATE_FIELDS + search.INDEXED_FIELDS))
+
+
+# ===================== PREVIOUS STATE =====================
+@receiver(pre_save, sender=Notes)
+def remember_previous_state(sender, instance, raw=False, **kwargs):
+    # Handlers below need to know what a note looked like before this save.
+    instance._previous_state = None
+    if instance.pk and not raw:
+        previous = Notes.objects.filter(pk=instance.pk)
+        if transaction.get_connection().in_atomic_block:
+            # Views save in a transaction; the row lock stops a concurrent
+            # save from counting the same transition twice.
+            previous = previous.select_for_update()
+        instance._previous_state = previous.values(*PREVIOUS_STATE_FIELDS).first()
+
+
+@receiver(pre_delete, sender=Notes)
+def remember_deleted_state(sender, instance, **kwargs):
+    # The instance may predate a bulk status change; count what is actually stored.
+    instance._previous_state = (
+        Notes.objects.select_for_update().filter(pk=instance.pk).values(*caching.NOTE_STATE_FIELDS).first()
+    )
+
+
+# ===================== SEARCH INDEX =====================
+@receiver(post_save, sender=Notes)
+def index_saved_note(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_state', None)
+    # Status-only changes (moderation) leave the indexed text as it is.
+    if previous and all(previous[field] == getattr(instance, field) for field in search.INDEXED_FIELDS):
+        return
+    transaction.on_commit(lambda: search.index_note(instance))
+
+
+@receiver(post_delete, sender=Notes)
+def unindex_deleted_note(sender, instance, **kwargs):
+    search.remove_notes([instance.pk])
+
+
+# ===================== PROCESSING QUEUE =====================
+@receiver(post_save, sender=Notes)
+def queue_note_processing(sender, instance, created=False, raw=False, **kwargs):
+    if created and not raw:
+        pipeline.enqueue(instance)
+
+
+# ===================== PDF BLOBS =====================
+@receiver(post_save, sender=Notes)
+def attach_pdf_blob(sender, instance, raw=False, **kwargs):
+    if not raw:
+        blobs.attach(instance)
+
+
+@receiver(post_delete, sender=Notes)
+def release_pdf_blob(sender, instance, **kwargs):
+    if instance.blob_id:
+        blobs.release(instance.blob_id)
+
+
+# ===================== DASHBOARD CACHE =====================
+@receiver(post_save, sender=Notes)
+def expire_saved_note_fragments(sender, instance, **kwargs):
+    states = [caching.note_state(instance)]
+    previous = getattr(instance, '_previous_state', None)
+    if previous:
+        states.append(previous)
+    caching.invalidate_note_states(states)
+
+
+@receiver(post_delete, sender=Notes)
+def expire_deleted_note_fragments(sender, instance, **kwargs):
+    caching.invalidate_note_states([caching.note_state(instance)])
+
+
+@receiver(notes_status_changed, sender=Notes)
+def expire_moderated_note_fragments(sender, previous_states, status, **kwargs):
+    states = list(previous_states)
+    states.extend(dict(state, status=status) for state in previous_states)
+    caching.invalidate_note_states(states)
+
+
+# ===================== FACET COUNTS =====================
+# Bulk moderation applies its deltas inside its own transaction (moderation.bulk_set_status).
+@receiver(post_save, sender=Notes)
+def count_saved_note(sender, instance, raw=False, **kwargs):
+    if not raw:
+        previous = getattr(instance, '_previous_state', None)
+        facets.apply_deltas(facets.state_deltas([previous], [caching.note_state(instance)]))
+
+
+@receiver(post_delete, sender=Notes)
+def uncount_deleted_note(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_state', None) or caching.note_state(instance)
+    facets.apply_deltas(facets.state_deltas([previous], []))
+
+
+# ===================== STATUS COUNTERS =====================
+# Bulk moderation updates these inside its own transaction (moderation.bulk_set_status).
+@receiver(post_save, sender=Notes)
+def count_saved_note_status(sender, instance, raw=False, **kwargs):
+    if not raw:
+        previous = getattr(instance, '_previous_state', None)
+        counters.apply_deltas(counters.state_deltas([previous], [caching.note_state(instance)]))
+
+
+@receiver(post_delete, sender=Notes)
+def uncount_deleted_note_status(sender, instance, **kwargs):
+    previous = getattr(instance, '_previous_state', None) or caching.note_state(instance)
+    counters.apply_deltas(counters.state_deltas([previous], []))
+
+
+# ===================== CATALOG VERSION =====================
+@receiver(post_save, sender=Notes)
+@receiver(post_delete, sender=Notes)
+def bump_catalog_version(sender, raw=False, **kwargs):
+    if not raw:
+        catalog.bump_version()
+
+
+@receiver(notes_status_changed, sender=Notes)
+def bump_catalog_version_for_moderation(sender, **kwargs):
+    catalog.bump_version()
+
+
+# ===================== UPLOADER NAMES =====================
+NAME_FIELDS = ('username', 'roll_number')
+
+
+@receiver(pre_save, sender=CustomUser)
+def remember_previous_name(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._previous_name = None
+    # Logins save last_login only; skip the lookup for saves that cannot rename.
+    if instance.pk and not raw and (update_fields is None or set(NAME_FIELDS) & set(update_fields)):
+        instance._previous_name = CustomUser.objects.filter(pk=instance.pk).values_list(*NAME_FIELDS).first()
+
+
+@receiver(post_save, sender=CustomUser)
+def republish_renamed_uploader(sender, instance, raw=False, **kwargs):
+    previous = getattr(instance, '_previous_name', None)
+    if raw or previous is None or previous == tuple(getattr(instance, field) for field in NAME_FIELDS):
+        return
+    # Catalog payloads, dashboard pages and the search index carry the uploader's name.
+    catalog.bump_version()
+    caching.invalidate_note_states(Notes.objects.filter(uploader=instance).values(*caching.NOTE_STATE_FIELDS))
+    transaction.on_commit(lambda: search.index_uploader_notes(instance.pk))
+
+
+# ===================== USER CACHE =====================
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def forget_cached_user(sender, instance, **kwargs):
+    backends.forget_user(instance.pk)
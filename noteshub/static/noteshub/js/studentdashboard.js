@@ -0,0 +1,206 @@
+// Filter dropdowns built from the precomputed facet counts (one request)
+(function() {
+    const form = document.querySelector('.filter-form');
+    const fields = ['year', 'branch', 'subject'];
+    if (!form || !window.fetch) {
+        return;
+    }
+
+    fetch(form.dataset.facetsUrl, {credentials: 'same-origin'})
+        .then(response => response.json())
+        .then(data => {
+            if (data.status !== 'success') {
+                return;
+            }
+            const selects = {};
+            fields.forEach(field => {
+                const input = form.elements[field];
+                const select = document.createElement('select');
+                select.name = field;
+                select.id = input.id;
+                select.dataset.current = input.value;
+                input.replaceWith(select);
+                selects[field] = select;
+            });
+
+            function refresh() {
+                fields.forEach((field, index) => {
+                    // Each dropdown only counts notes matching the choices before it
+                    const totals = new Map();
+                    data.facets.forEach(facet => {
+                        const matches = fields.slice(0, index).every(
+                            previous => !selects[previous].value || facet[previous] === selects[previous].value
+                        );
+                        if (matches) {
+                            totals.set(facet[field], (totals.get(facet[field]) || 0) + facet.count);
+                        }
+                    });
+                    const select = selects[field];
+                    const current = select.value || select.dataset.current;
+                    select.innerHTML = '';
+                    select.add(new Option(`Any ${field}`, ''));
+                    [...totals.keys()].sort().forEach(value => {
+                        select.add(new Option(`${value} (${totals.get(value)})`, value, false, value === current));
+                    });
+                    select.dataset.current = '';
+                });
+            }
+
+            fields.forEach(field => selects[field].addEventListener('change', refresh));
+            refresh();
+        })
+        .catch(() => {});
+})();
+
+// Filtering and paging redraw the grid from the JSON catalog instead of reloading the page
+(function() {
+    const container = document.getElementById('catalog');
+    const form = document.querySelector('.filter-form');
+    const exportButton = document.getElementById('exportButton');
+    const filters = ['year', 'branch', 'subject', 'search'];
+    const fields = 'id,title,year,branch,chapter,uploader,view_url,download_url,preview_url';
+    if (!container || !form || !window.fetch || !window.history.pushState) {
+        return;
+    }
+
+    function element(tag, className, text) {
+        const node = document.createElement(tag);
+        if (className) {
+            node.className = className;
+        }
+        if (text !== undefined) {
+            node.textContent = text;
+        }
+        return node;
+    }
+
+    function link(className, text, href) {
+        const anchor = element('a', className, text);
+        anchor.href = href;
+        return anchor;
+    }
+
+    // Same markup as includes/catalog_card.html
+    function card(note) {
+        const node = element('div', 'note-card');
+        if (note.preview_url) {
+            const preview = element('img', 'note-preview');
+            Object.assign(preview, {
+                src: note.preview_url, alt: `First page of ${note.title}`, width: 120, height: 170,
+                loading: 'lazy', decoding: 'async', onerror: () => preview.remove(),
+            });
+            node.append(preview);
+        }
+        const meta = element('div', 'note-meta');
+        meta.append(
+            element('span', '', `🎓 ${note.branch}`),
+            element('span', '', `📅 ${note.year}`),
+            element('span', '', `📤 Uploaded by ${note.uploader}`),
+        );
+        const view = link('btn btn-success btn-sm', '📄 View', note.view_url);
+        view.target = '_blank';
+        const buttons = element('div', 'action-buttons');
+        buttons.append(view, link('btn btn-success btn-sm', '⬇ Download', note.download_url));
+        const actions = element('div', 'note-actions');
+        actions.append(buttons);
+        node.append(
+            element('div', 'note-title', note.title), meta,
+            element('div', 'note-description', `${note.chapter} (PDF Notes)`), actions,
+        );
+        return node;
+    }
+
+    // Same links as the pager in includes/catalog_grid.html
+    function pageLink(params, cursorName, cursor, text) {
+        const query = new URLSearchParams([[cursorName, cursor]]);
+        filters.forEach(name => query.set(name, params.get(name) || ''));
+        return link('btn btn-primary', text, `?${query}`);
+    }
+
+    function render(data, params) {
+        const grid = element('div', 'notes-grid');
+        grid.id = 'notesGrid';
+        if (data.results.length) {
+            data.results.forEach(note => grid.append(card(note)));
+        } else {
+            grid.append(element('p', '', 'No approved notes available yet.'));
+        }
+        const nodes = [grid];
+        if (data.has_previous || data.has_next) {
+            const pager = element('div', 'filter-buttons');
+            if (data.has_previous) {
+                pager.append(pageLink(params, 'before', data.previous_cursor, '⬅ Newer'));
+            }
+            if (data.has_next) {
+                pager.append(pageLink(params, 'after', data.next_cursor, 'Older ➡'));
+            }
+            nodes.push(pager);
+        }
+        container.replaceChildren(...nodes);
+        if (exportButton) {
+            exportButton.hidden = !filters.some(name => params.get(name));
+        }
+    }
+
+    function load(params, push) {
+        const query = new URLSearchParams([['fields', fields]]);
+        [...filters, 'after', 'before'].forEach(name => {
+            if (params.get(name)) {
+                query.set(name, params.get(name));
+            }
+        });
+        // The browser revalidates with the ETag, so an unchanged catalog is a 304
+        return fetch(`${container.dataset.catalogUrl}?${query}`, {credentials: 'same-origin'})
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error(response.statusText);
+                }
+                return response.json();
+            })
+            .then(data => {
+                render(data, params);
+                if (push) {
+                    window.history.pushState(null, '', `?${params}`);
+                }
+            })
+            .catch(() => {
+                window.location.search = params.toString();
+            });
+    }
+
+    form.addEventListener('submit', event => {
+        // The ZIP export posts to its own URL
+        if (event.submitter && event.submitter.hasAttribute('formaction')) {
+            return;
+        }
+        const params = new URLSearchParams(new FormData(form));
+        // The weekly popularity ranking stays server-rendered
+        if (params.get('sort')) {
+            return;
+        }
+        event.preventDefault();
+        load(params, true);
+    });
+
+    container.addEventListener('click', event => {
+        const anchor = event.target.closest('.filter-buttons a');
+        if (!anchor || event.ctrlKey || event.metaKey || event.shiftKey) {
+            return;
+        }
+        const params = new URLSearchParams(anchor.search);
+        if (params.get('sort')) {
+            return;
+        }
+        event.preventDefault();
+        load(params, true);
+    });
+
+    window.addEventListener('popstate', () => {
+        const params = new URLSearchParams(window.location.search);
+        if (params.get('sort')) {
+            window.location.reload();
+        } else {
+            load(params, false);
+        }
+    });
+})();
@@ -0,0 +1,290 @@
+// Endpoint URLs come from data-*-url attributes on <body>
+const urls = document.body.dataset;
+let currentNoteId = null;
+
+function approveNote(noteId) {
+    if (confirm('Are you sure you want to approve this note?')) {
+        showLoading();
+
+        fetch(urls.approveUrl.replace('0', noteId), {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': getCookie('csrftoken'),
+                'X-Requested-With': 'XMLHttpRequest'
+            }
+        })
+        .then(response => response.json())
+        .then(data => {
+            hideLoading();
+            if (data.status === 'success') {
+                showAlert('success', data.message);
+                setTimeout(() => location.reload(), 1500);
+            } else {
+                showAlert('danger', 'Error approving note. Please try again.');
+            }
+        })
+        .catch(error => {
+            hideLoading();
+            showAlert('danger', 'Error approving note. Please try again.');
+        });
+    }
+}
+
+function rejectNote(noteId) {
+    currentNoteId = noteId;
+    const modal = new bootstrap.Modal(document.getElementById('rejectModal'));
+    modal.show();
+}
+
+function confirmReject() {
+    if (!currentNoteId) return;
+
+    showLoading();
+    const reason = document.getElementById('rejectionReason').value;
+
+    fetch(urls.rejectUrl.replace('0', currentNoteId), {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/x-www-form-urlencoded',
+            'X-CSRFToken': getCookie('csrftoken'),
+            'X-Requested-With': 'XMLHttpRequest'
+        },
+        body: `reason=${encodeURIComponent(reason)}`
+    })
+    .then(response => response.json())
+    .then(data => {
+        hideLoading();
+        if (data.status === 'success') {
+            showAlert('success', data.message);
+            bootstrap.Modal.getInstance(document.getElementById('rejectModal')).hide();
+            setTimeout(() => location.reload(), 1500);
+        } else {
+            showAlert('danger', 'Error rejecting note. Please try again.');
+        }
+    })
+    .catch(error => {
+        hideLoading();
+        showAlert('danger', 'Error rejecting note. Please try again.');
+    });
+}
+
+document.querySelectorAll('.bulk-select-all').forEach(toggle => {
+    toggle.addEventListener('change', () => {
+        const tab = toggle.closest('.bulk-actions').dataset.tab;
+        document.querySelectorAll(`.bulk-select[data-tab="${tab}"]`).forEach(box => {
+            box.checked = toggle.checked;
+        });
+    });
+});
+
+function bulkModerate(tab, action) {
+    const byFilter = document.getElementById(`${tab}-scope-filter`).checked;
+    const payload = {action: action};
+    if (byFilter) {
+        payload.filter = {
+            tab: tab,
+            year: document.getElementById(`${tab}-year`).value,
+            branch: document.getElementById(`${tab}-branch`).value,
+            subject: document.getElementById(`${tab}-subject`).value,
+            search: document.getElementById(`${tab}-search`).value
+        };
+    } else {
+        payload.ids = Array.from(document.querySelectorAll(`.bulk-select[data-tab="${tab}"]:checked`), box => box.value);
+        if (!payload.ids.length) {
+            showAlert('warning', 'Select at least one note.');
+            return;
+        }
+    }
+    const target = byFilter ? 'every note matching the filter' : `${payload.ids.length} selected note(s)`;
+    if (!confirm(`Apply "${action}" to ${target}?`)) {
+        return;
+    }
+
+    showLoading();
+    fetch(urls.moderateUrl, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'X-CSRFToken': getCookie('csrftoken'),
+            'X-Requested-With': 'XMLHttpRequest'
+        },
+        body: JSON.stringify(payload)
+    })
+    .then(response => response.json())
+    .then(data => {
+        hideLoading();
+        if (data.status === 'success') {
+            showAlert('success', data.message);
+            setTimeout(() => location.reload(), 1500);
+        } else {
+            showAlert('danger', data.message || 'Error updating notes. Please try again.');
+        }
+    })
+    .catch(error => {
+        hideLoading();
+        showAlert('danger', 'Error updating notes. Please try again.');
+    });
+}
+
+function showLoading() {
+    document.getElementById('loadingOverlay').style.display = 'block';
+}
+
+function hideLoading() {
+    document.getElementById('loadingOverlay').style.display = 'none';
+}
+
+function showAlert(type, message) {
+    const alertDiv = document.createElement('div');
+    alertDiv.className = `alert alert-${type} alert-dismissible fade show`;
+    alertDiv.innerHTML = `
+        ${message}
+        <button type="button" class="btn-close" data-bs-dismiss="alert"></button>
+    `;
+
+    const container = document.querySelector('.main-content');
+    container.insertBefore(alertDiv, container.firstChild);
+
+    setTimeout(() => {
+        alertDiv.style.opacity = '0';
+        setTimeout(() => alertDiv.remove(), 500);
+    }, 5000);
+}
+
+function getCookie(name) {
+    let cookieValue = null;
+    if (document.cookie && document.cookie !== '') {
+        const cookies = document.cookie.split(';');
+        for (let i = 0; i < cookies.length; i++) {
+            const cookie = cookies[i].trim();
+            if (cookie.substring(0, name.length + 1) === (name + '=')) {
+                cookieValue = decodeURIComponent(cookie.substring(name.length + 1));
+                break;
+            }
+        }
+    }
+    return cookieValue;
+}
+
+function viewNote(noteId) {
+    if (!noteId) {
+        showAlert('danger', 'Invalid note ID');
+        return;
+    }
+    const url = urls.viewUrl.replace('0', noteId);
+    window.location.href = url;
+}
+
+function downloadNote(noteId) {
+    if (!noteId) {
+        showAlert('danger', 'Invalid note ID');
+        return;
+    }
+    const url = urls.downloadUrl.replace('0', noteId);
+    window.location.href = url;
+}
+
+function deleteNote(noteId) {
+    if (!noteId) {
+        showAlert('danger', 'Invalid note ID');
+        return;
+    }
+    if (confirm('Are you sure you want to delete this note? This action cannot be undone.')) {
+        showLoading();
+
+        fetch(urls.deleteUrl.replace('0', noteId), {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': getCookie('csrftoken'),
+                'X-Requested-With': 'XMLHttpRequest'
+            }
+        })
+        .then(response => response.json())
+        .then(data => {
+            hideLoading();
+            if (data.status === 'success') {
+                showAlert('success', data.message);
+                setTimeout(() => location.reload(), 1500);
+            } else {
+                showAlert('danger', 'Error deleting note. Please try again.');
+            }
+        })
+        .catch(error => {
+            hideLoading();
+            showAlert('danger', 'Error deleting note. Please try again.');
+        });
+    }
+}
+
+function pendingNote(noteId) {
+    if (!noteId) {
+        showAlert('danger', 'Invalid note ID');
+        return;
+    }
+    if (confirm('Are you sure you want to set this note to pending?')) {
+        showLoading();
+
+        fetch(urls.pendingUrl.replace('0', noteId), {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': getCookie('csrftoken'),
+                'X-Requested-With': 'XMLHttpRequest'
+            }
+        })
+        .then(response => response.json())
+        .then(data => {
+            hideLoading();
+            if (data.status === 'success') {
+                showAlert('success', data.message);
+                setTimeout(() => location.reload(), 1500);
+            } else {
+                showAlert('danger', 'Error setting note to pending. Please try again.');
+            }
+        })
+        .catch(error => {
+            hideLoading();
+            showAlert('danger', 'Error setting note to pending. Please try again.');
+        });
+    }
+}
+
+// Auto-submit filter forms on change
+document.querySelectorAll('.filter-form input').forEach(input => {
+    input.addEventListener('change', function() {
+        const form = this.closest('form');
+        form.submit();
+    });
+});
+
+// Add submit buttons to filter forms
+document.querySelectorAll('.filter-form').forEach(form => {
+    const submitButton = document.createElement('button');
+    submitButton.type = 'submit';
+    submitButton.className = 'btn btn-primary mt-3';
+    submitButton.innerHTML = '<i class="fas fa-filter me-1"></i>Filter';
+    form.appendChild(submitButton);
+});
+
+// Add active class to current nav item
+document.addEventListener('DOMContentLoaded', function() {
+    const currentUrl = window.location.href;
+    const navLinks = document.querySelectorAll('.sidebar .nav-link');
+
+    navLinks.forEach(link => {
+        if (currentUrl.includes(link.getAttribute('href'))) {
+            link.classList.add('active');
+        }
+    });
+});
+
+// Auto-hide alerts after 5 seconds
+setTimeout(function() {
+    const alerts = document.querySelectorAll('.alert');
+    alerts.forEach(alert => {
+        alert.style.opacity = '0';
+        setTimeout(() => alert.remove(), 500);
+    });
+}, 5000);
@@ -0,0 +1,85 @@
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+BLOB_PREFIX = 'noteshub/blobs'
+
+_BLOB_NAME_RE = re.compile(r'^%s/[0-9a-f]{2}/[0-9a-f]{2}/([0-9a-f]{64})\.pdf$' % BLOB_PREFIX)
+
+
+def digest_from_name(name):
+    match = _BLOB_NAME_RE.match(name or '')
+    return match.group(1) if match else None
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Stores every file once under its SHA-256 digest.
+
+    The upload is hashed while it is streamed to a temporary file next to the
+    blob directory; if a blob with that digest already exists the temporary
+    file is dropped, otherwise it is renamed into place. The name passed in by
+    ``upload_to`` is ignored, and reference counting of blobs lives in
+    ``noteshub.blobs``.
+    """
+
+    chunk_size = 64 * 1024
+
+    def blob_name(self, digest):
+        return f'{BLOB_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}.pdf'
+
+    def temp_dir(self):
+        """Scratch directory on the blob filesystem, so finished files can be renamed into place."""
+        path = self.path(f'{BLOB_PREFIX}/tmp')
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def get_available_name(self, name, max_length=None):
+        # Names never collide: identical content maps to the same blob.
+        return name
+
+    def _save(self, name, content):
+        if hasattr(content, 'temporary_file_path'):
+            return self._save_from_path(content.temporary_file_path(), getattr(content, 'sha256', None))
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.temp_dir(), suffix='.part')
+        try:
+            sha256 = hashlib.sha256()
+            with os.fdopen(fd, 'wb') as tmp:
+                for chunk in content.chunks(self.chunk_size):
+                    sha256.update(chunk)
+                    tmp.write(chunk)
+            return self._commit(tmp_path, sha256.hexdigest())
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    def _save_from_path(self, path, digest=None):
+        # Already on disk (chunked or large uploads): hash it unless the
+        # uploader already did, then move rather than copy.
+        if digest is None:
+            sha256 = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(self.chunk_size), b''):
+                    sha256.update(chunk)
+            digest = sha256.hexdigest()
+        return self._commit(path, digest)
+
+    def _commit(self, path, digest):
+        name = self.blob_name(digest)
+        full_path = self.path(name)
+        if not os.path.exists(full_path):
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            file_move_safe(path, full_path, allow_overwrite=True)
+            if self.file_permissions_mode is not None:
+                os.chmod(full_path, self.file_permissions_mode)
+        return name
+
+
+pdf_storage = ContentAddressedStorage()
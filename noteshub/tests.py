@@ -1,3 +1,1254 @@
-from django.test import TestCase
+import csv
+import gzip
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth import authenticate
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import AsyncRequestFactory, Client, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import (
+    analytics, async_views, catalog, counters, exports, facets, moderation, pipeline, previews, profiling, provisioning,
+    search, uploads,
+)
+from .assets import IMMUTABLE_CACHE_CONTROL
+from .backends import CustomAuthBackend
+from .sessions import SessionStore
+from .forms import MAX_PDF_SIZE
+from .models import (
+    CustomUser, FacetCount, NoteContent, NoteDailyStats, NoteRow, Notes, NoteStats, PdfBlob, ProcessingJob,
+    StatusCount, UploadSession, UserStatusCount
+)
+from .pagination import InvalidCursor, KeysetPaginator, decode_cursor, encode_cursor
+from .serving import MAX_RANGES, PdfTransfer
+from .management.commands.process_notes import process_pdf
+from .storage import pdf_storage
+
+
+def make_pdf(size=4096, seed=0):
+    """Bytes the upload checks accept: PDF header, padding to ``size``, %%EOF."""
+    head = b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n'
+    tail = b'\n%%EOF\n'
+    filler = f'% noteshub test {seed}\n'.encode()
+    body_size = max(size - len(head) - len(tail), 0)
+    return head + (filler * (body_size // len(filler) + 1))[:body_size] + tail
+
+
+# Pages link hashed static names; the tests run without collectstatic.
+unhashed_static = override_settings(STORAGES={
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+})
+
+
+class MediaTestCase(TestCase):
+    """Each test class gets its own MEDIA_ROOT and empty caches."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp(prefix='noteshub-test-')
+        cls._media = override_settings(
+            MEDIA_ROOT=cls.media_root,
+            NOTESHUB_PREVIEW_DIR=os.path.join(cls.media_root, 'noteshub', 'previews'),
+        )
+        cls._media.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls._media.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        # Served PDFs buffer analytics events; the atexit flush must not see them.
+        analytics.buffer.discard()
+        self.addCleanup(analytics.buffer.discard)
+        # Unusable passwords: the tests log in with force_login, so skip the hasher.
+        self.student = CustomUser.objects.create_user('S100', is_student=True)
+        self.teacher = CustomUser.objects.create_user('T100', username='teacher', is_teacher=True)
+
+    def create_note(self, content=None, uploader=None, **fields):
+        values = {'year': '1', 'branch': 'CSE', 'subject': 'Maths', 'chapter': 'Limits', 'status': 'approved'}
+        values.update(fields)
+        note = Notes(uploader=uploader or self.teacher, **values)
+        note.pdf.save('note.pdf', ContentFile(content or make_pdf()), save=False)
+        with self.captureOnCommitCallbacks(execute=True):
+            note.save()
+        return note
+
+
+# ===================== LOGIN =====================
+FAST_HASHERS = ['noteshub.hashers.FastPBKDF2PasswordHasher', 'django.contrib.auth.hashers.PBKDF2PasswordHasher']
+
+
+class UserCacheTests(MediaTestCase):
+    @override_settings(NOTESHUB_USER_CACHE_TTL=60)
+    def test_cached_user_is_dropped_when_saved(self):
+        backend = CustomAuthBackend()
+        with self.assertNumQueries(1):
+            backend.get_user(self.student.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(backend.get_user(self.student.pk).roll_number, 'S100')
+
+        self.student.username = 'asha'
+        self.student.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(backend.get_user(self.student.pk).username, 'asha')
+        self.student.delete()
+        self.assertIsNone(backend.get_user(self.student.pk))
+
+    def test_cache_is_off_by_default(self):
+        backend = CustomAuthBackend()
+        backend.get_user(self.student.pk)
+        with self.assertNumQueries(1):
+            backend.get_user(self.student.pk)
+
+
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, NOTESHUB_FAST_HASHER_ITERATIONS=1000)
+class FastHasherTests(MediaTestCase):
+    def test_roll_number_login_with_the_fast_hasher(self):
+        self.student.set_password('s3cret-pass')
+        self.student.save()
+        self.assertTrue(self.student.password.startswith('pbkdf2_sha256_fast$1000$'))
+        self.assertEqual(authenticate(roll_number='S100', password='s3cret-pass'), self.student)
+        self.assertIsNone(authenticate(roll_number='S100', password='wrong'))
+        self.assertIsNone(authenticate(roll_number='S999', password='s3cret-pass'))
+
+    def test_passwords_are_rehashed_on_login(self):
+        self.teacher.set_password('s3cret-pass')
+        self.teacher.save()
+        with self.settings(NOTESHUB_FAST_HASHER_ITERATIONS=2000):
+            self.assertEqual(authenticate(username='teacher', password='s3cret-pass'), self.teacher)
+        self.teacher.refresh_from_db()
+        self.assertTrue(self.teacher.password.startswith('pbkdf2_sha256_fast$2000$'))
+
+        # Stock hashes still verify while the fast hasher is preferred
+        with self.settings(PASSWORD_HASHERS=FAST_HASHERS[::-1]):
+            self.teacher.set_password('other-pass')
+            self.teacher.save()
+        self.assertEqual(authenticate(username='teacher', password='other-pass'), self.teacher)
+        self.teacher.refresh_from_db()
+        self.assertTrue(self.teacher.password.startswith('pbkdf2_sha256_fast$'))
+
+
+# ===================== USER IMPORT =====================
+@override_settings(PASSWORD_HASHERS=FAST_HASHERS, NOTESHUB_FAST_HASHER_ITERATIONS=1000)
+class ImportUsersTests(MediaTestCase):
+    CSV = (
+        'roll_number,username,password,role\n'
+        'S200,,pass-200,\n'
+        'T200,prof,pass-t200,teacher\n'
+        'S201,,,\n'
+        'S200,,again,student\n'
+        'S100,,taken,student\n'
+        'S202,,pass-202,admin\n'
+        'T201,,pass-t201,teacher\n'
+    )
+
+    def run_import(self, text, *args):
+        path = os.path.join(self.media_root, 'intake.csv')
+        with open(path, 'w') as f:
+            f.write(text)
+        out = StringIO()
+        call_command('import_users', path, '--workers', '1', '--batch-size', '2', *args, stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def read_csv(self, name):
+        with open(os.path.join(self.media_root, name)) as f:
+            return list(csv.reader(f))[1:]
+
+    def test_intake_is_imported_and_problems_reported(self):
+        credentials = os.path.join(self.media_root, 'credentials.csv')
+        skipped = os.path.join(self.media_root, 'skipped.csv')
+        out = self.run_import(self.CSV, '--generate-passwords', credentials, '--skipped', skipped)
+        self.assertIn('Imported 3 user(s), skipped 4 of 7 row(s)', out)
+
+        self.assertEqual(authenticate(roll_number='S200', password='pass-200').is_student, True)
+        self.assertEqual(authenticate(username='prof', password='pass-t200').is_teacher, True)
+        [(roll_number, username, password)] = self.read_csv('credentials.csv')
+        self.assertEqual((roll_number, username), ('S201', ''))
+        self.assertEqual(authenticate(roll_number='S201', password=password).roll_number, 'S201')
+        self.assertEqual(os.stat(credentials).st_mode & 0o777, 0o600)
+
+        reasons = {line: reason for line, _, _, reason in self.read_csv('skipped.csv')}
+        self.assertEqual(reasons, {
+            '5': 'roll number S200 appears earlier in the file',
+            '6': 'roll number S100 already exists',
+            '7': "unknown role 'admin'",
+            '8': 'teachers need a username to log in',
+        })
+
+    def test_rerun_creates_nothing(self):
+        self.run_import(self.CSV)
+        out = self.run_import(self.CSV)
+        self.assertIn('Imported 0 user(s)', out)
+        self.assertEqual(CustomUser.objects.count(), 4)
+
+    def test_missing_roll_number_column(self):
+        with self.assertRaises(CommandError):
+            self.run_import('username,password\nprof,secret\n')
+
+    def test_accounts_created_meanwhile_are_conflicts(self):
+        rows, _ = provisioning.check(provisioning.read_rows(['roll_number,password', 'S300,pw']),
+                                     {'roll_number': set(), 'username': set()})
+        CustomUser.objects.create_user('S300', is_student=True)
+        created, conflicts = provisioning.insert(rows, ['pbkdf2_sha256_fast$1000$salt$hash'])
+        self.assertEqual(created, [])
+        self.assertEqual(len(conflicts), 1)
+
+
+# ===================== SESSIONS =====================
+@override_settings(SESSION_ENGINE='noteshub.sessions')
+class SessionStoreTests(MediaTestCase):
+    def session_queries(self, queries):
+        return [query['sql'] for query in queries if 'django_session' in query['sql']]
+
+    def test_unchanged_session_is_not_written(self):
+        store = SessionStore()
+        store['cart'] = [1, 2]
+        store.save()
+        store = SessionStore(store.session_key)
+        with CaptureQueriesContext(connection) as queries:
+            store['cart'] = [1, 2]
+            store.save()
+        self.assertEqual(self.session_queries(queries), [])
+
+        with CaptureQueriesContext(connection) as queries:
+            store['cart'] = [3]
+            store.save()
+        self.assertTrue(self.session_queries(queries))
+        self.assertEqual(SessionStore(store.session_key)['cart'], [3])
+
+    def test_new_sessions_are_saved(self):
+        store = SessionStore()
+        store.save()
+        self.assertTrue(SessionStore().exists(store.session_key))
+
+    @unhashed_static
+    def test_dashboard_reads_skip_the_session_table(self):
+        self.client.force_login(self.student)
+        self.client.get(reverse('studentdashboard'))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(reverse('studentdashboard')).status_code, 200)
+        self.assertEqual(self.session_queries(queries), [])
+
+    def test_purge_sessions_deletes_expired_rows(self):
+        live, expired = SessionStore(), SessionStore()
+        live.save()
+        expired.set_expiry(-60)
+        expired.save()
+        out = StringIO()
+        call_command('purge_sessions', '--batch-size', '1', '--pause', '0', stdout=out)
+        self.assertIn('Deleted 1 expired session(s).', out.getvalue())
+        self.assertTrue(SessionStore().exists(live.session_key))
+
+
+# ===================== RANGE REQUESTS =====================
+class RangeParsingTests(SimpleTestCase):
+    def transfer(self, size=1000):
+        transfer = PdfTransfer.__new__(PdfTransfer)
+        transfer.size = size
+        return transfer
+
+    def test_single_and_open_ended(self):
+        self.assertEqual(self.transfer().parse_ranges('bytes=0-99'), [(0, 99)])
+        self.assertEqual(self.transfer().parse_ranges('bytes=900-'), [(900, 999)])
+        self.assertEqual(self.transfer().parse_ranges('bytes=-100'), [(900, 999)])
+
+    def test_end_is_clamped_to_the_file(self):
+        self.assertEqual(self.transfer().parse_ranges('bytes=990-5000'), [(990, 999)])
+        self.assertEqual(self.transfer().parse_ranges('bytes=-5000'), [(0, 999)])
+
+    def test_overlapping_and_adjacent_ranges_are_merged(self):
+        self.assertEqual(
+            self.transfer().parse_ranges('bytes=50-99, 0-49, 200-299, 250-320'),
+            [(0, 99), (200, 320)],
+        )
+
+    def test_unsatisfiable_ranges(self):
+        self.assertEqual(self.transfer().parse_ranges('bytes=1000-'), [])
+        self.assertEqual(self.transfer().parse_ranges('bytes=-0'), [])
+
+    def test_malformed_headers_are_ignored(self):
+        for header in ('bytes=', 'items=0-10', 'bytes=a-b', 'bytes=-', 'bytes=10-5'):
+            with self.subTest(header=header):
+                self.assertIsNone(self.transfer().parse_ranges(header))
+
+    def test_too_many_ranges_are_ignored(self):
+        spec = ','.join(f'{i * 10}-{i * 10 + 1}' for i in range(MAX_RANGES + 1))
+        self.assertIsNone(self.transfer().parse_ranges('bytes=' + spec))
+
+    def test_multipart_length_matches_body(self):
+        transfer = self.transfer()
+        transfer.ranges = [(0, 9), (500, 519)]
+        transfer.boundary = 'b0undary'
+        body = b''.join(
+            segment if isinstance(segment, bytes) else b'x' * (segment[1] - segment[0] + 1)
+            for segment in transfer.segments()
+        )
+        self.assertEqual(transfer.body_length(), len(body))
+        self.assertTrue(body.startswith(b'--b0undary\r\nContent-Type: application/pdf\r\n'))
+        self.assertIn(b'Content-Range: bytes 500-519/1000\r\n\r\n', body)
+        self.assertTrue(body.endswith(b'\r\n--b0undary--\r\n'))
+
+
+class PdfServingTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.content = make_pdf(2000)
+        self.note = self.create_note(self.content)
+        self.client.force_login(self.student)
+        self.url = reverse('view_note', args=[self.note.id])
+
+    def test_single_range(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(self.content)}')
+        self.assertEqual(b''.join(response.streaming_content), self.content[100:200])
+
+    def test_multiple_ranges(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9,-10')
+        self.assertEqual(response.status_code, 206)
+        self.assertTrue(response['Content-Type'].startswith('multipart/byteranges; boundary='))
+        body = b''.join(response.streaming_content)
+        self.assertEqual(int(response['Content-Length']), len(body))
+        self.assertIn(self.content[:10], body)
+        self.assertIn(self.content[-10:], body)
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={len(self.content)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.content)}')
+
+    def test_stale_if_range_sends_the_whole_file(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+
+    @override_settings(DEBUG=True)
+    def test_pdf_is_not_served_from_media_url(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(f'/media/{self.note.pdf.name}').status_code, 404)
+
+    def test_etag_revalidation(self):
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(etag, f'"{self.note.blob_id}"')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+
+# ===================== SEARCH =====================
+class SearchTests(MediaTestCase):
+    def note(self, seed, **fields):
+        return self.create_note(make_pdf(seed=seed), **fields)
+
+    def test_title_matches_rank_above_body_matches(self):
+        in_body = self.note(1, subject='Physics', chapter='Heat')
+        in_title = self.note(2, subject='Physics', chapter='Thermodynamics')
+        search.index_note(in_body, body='The laws of thermodynamics, briefly.')
+        self.note(3, subject='Physics', chapter='Optics')
+        self.assertEqual(search.search_ids('thermodynamics'), [in_title.id, in_body.id])
+        # Terms are prefixes
+        self.assertEqual(search.search_ids('thermo'), [in_title.id, in_body.id])
+
+    def test_every_term_must_match(self):
+        note = self.note(1, subject='Physics', chapter='Wave optics')
+        self.note(2, subject='Physics', chapter='Geometric optics')
+        self.assertEqual(search.search_ids('wave optics'), [note.id])
+        self.assertEqual(search.search_ids('  -- "" '), [])
+
+    @override_settings(NOTESHUB_SEARCH_MAX_RESULTS=1)
+    def test_filters_apply_before_the_result_cap(self):
+        self.note(1, chapter='Matrices', branch='CSE')
+        ece = self.note(2, chapter='Matrices', branch='ECE', status='pending')
+        self.assertEqual(len(search.search_ids('matrices')), 1)
+        self.assertEqual(search.search_ids('matrices', branch='ECE', year='', status='pending'), [ece.id])
+        self.assertEqual(search.search_ids('matrices', offset=1), [])
+        with self.assertRaises(TypeError):
+            search.search_ids('matrices', chapter='Matrices')
+
+    def test_uploader_name_is_searchable_and_follows_renames(self):
+        note = self.note(1)
+        self.assertEqual(search.search_ids('teacher'), [note.id])
+        self.teacher.username = 'professor'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.teacher.save()
+        self.assertEqual(search.search_ids('teacher'), [])
+        self.assertEqual(search.search_ids('professor'), [note.id])
+
+    def test_deleted_notes_leave_the_index(self):
+        note = self.note(1, chapter='Integrals')
+        with self.captureOnCommitCallbacks(execute=True):
+            note.delete()
+        self.assertEqual(search.search_ids('integrals'), [])
+
+    def test_dashboard_search_lists_approved_matches_only(self):
+        approved = self.note(1, chapter='Vectors')
+        self.note(2, chapter='Vectors', status='pending')
+        rows = catalog.approved_notes(search_query='vectors')
+        self.assertEqual([row.id for row in rows], [approved.id])
+        self.assertEqual(list(catalog.approved_notes(branch='ECE', search_query='vectors')), [])
+
+
+# ===================== KEYSET PAGINATION =====================
+class CursorTests(SimpleTestCase):
+    def test_round_trip(self):
+        row = Notes(id=42, uploaded_at=datetime(2024, 5, 1, 9, 30, 15, 123456, tzinfo=dt_timezone.utc))
+        self.assertEqual(decode_cursor(encode_cursor(row)), (row.uploaded_at, 42))
+
+    def test_cursor_is_url_safe(self):
+        row = Notes(id=7, uploaded_at=datetime(2024, 5, 1, tzinfo=dt_timezone.utc))
+        self.assertRegex(encode_cursor(row), r'^[A-Za-z0-9_-]+$')
+
+    def test_invalid_cursors(self):
+        for cursor in ('', '!!!', 'bm90IGEgY3Vyc29y', 'eWVzdGVyZGF5fDE'):
+            with self.subTest(cursor=cursor):
+                with self.assertRaises(InvalidCursor):
+                    decode_cursor(cursor)
+
+
+class KeysetPaginatorTests(MediaTestCase):
+    def test_pages_forwards_and_backwards(self):
+        notes = [self.create_note(make_pdf(seed=i), chapter=f'c{i}') for i in range(5)]
+        newest_first = [note.id for note in reversed(notes)]
+        paginator = KeysetPaginator(Notes.objects.catalog(), 2)
+
+        first = paginator.get_page()
+        self.assertEqual([row.id for row in first], newest_first[:2])
+        self.assertFalse(first.has_previous)
+        second = paginator.get_page(after=first.next_cursor)
+        self.assertEqual([row.id for row in second], newest_first[2:4])
+        last = paginator.get_page(after=second.next_cursor)
+        self.assertEqual([row.id for row in last], newest_first[4:])
+        self.assertFalse(last.has_next)
+
+        back = paginator.get_page(before=last.previous_cursor)
+        self.assertEqual([row.id for row in back], newest_first[2:4])
+        self.assertTrue(back.has_previous)
+
+
+class NoteRowTests(MediaTestCase):
+    def test_rows_survive_queryset_chaining(self):
+        # rows() relies on QuerySet._iterable_class being kept by every clone.
+        note = self.create_note()
+        rows = Notes.objects.catalog().filter(year='1').exclude(id=0).order_by('-uploaded_at', '-id')
+        for row in (rows[:1][0], rows.all().first(), list(rows.filter(branch='CSE'))[0]):
+            self.assertIsInstance(row, NoteRow)
+            self.assertEqual((row.id, row.uploader_name, row.title), (note.id, 'teacher', 'Maths - Limits'))
+        self.assertEqual(rows.count(), 1)
+
+
+# ===================== PAGE QUERIES =====================
+@unhashed_static
+class PageQueryTests(MediaTestCase):
+    """A page costs the same number of queries whatever the notes on it."""
+
+    def add_notes(self, user, count, start=0):
+        # Every third note is the viewer's own upload
+        for i in range(start, start + count):
+            uploader = user if i % 3 == 0 else CustomUser.objects.create_user(f'S{i}', is_student=True)
+            self.create_note(uploader=uploader, status=('approved', 'pending')[i % 2], subject=f'Subject {i}')
+
+    def assertQueriesDoNotGrow(self, user, url):
+        self.client.force_login(user)
+        self.add_notes(user, 3, start=1000)
+        self.client.get(url)
+        caches['default'].clear()
+        caches['template_fragments'].clear()
+        with CaptureQueriesContext(connection) as few:
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+        self.add_notes(user, 30)
+        caches['default'].clear()
+        caches['template_fragments'].clear()
+        with self.assertNumQueries(len(few)):
+            self.client.get(url)
+
+    def test_student_dashboard(self):
+        self.assertQueriesDoNotGrow(self.student, reverse('studentdashboard'))
+
+    def test_teacher_dashboard(self):
+        self.assertQueriesDoNotGrow(self.teacher, reverse('teacherdashboard') + '?tab=pending')
+
+    def test_teacher_dashboard_approved_tab(self):
+        self.assertQueriesDoNotGrow(self.teacher, reverse('teacherdashboard') + '?tab=approved')
+
+    def test_teacher_dashboard_uploads_tab(self):
+        self.assertQueriesDoNotGrow(self.teacher, reverse('teacherdashboard') + '?tab=my-uploads')
+
+    def test_catalog_api(self):
+        self.assertQueriesDoNotGrow(self.student, reverse('catalog_api') + '?fields=id,title,uploader')
+
+
+# ===================== COUNTERS =====================
+class CounterReconcileTests(MediaTestCase):
+    def test_counters_follow_note_changes(self):
+        note = self.create_note(uploader=self.student, status='pending')
+        self.create_note(make_pdf(seed=1), uploader=self.student)
+        self.assertEqual(counters.user_status_counts(self.student.id)['pending'], 1)
+
+        note.status = 'approved'
+        note.save()
+        self.assertEqual(counters.status_counts()['approved'], 2)
+        self.assertEqual(counters.user_status_counts(self.student.id)['total'], 2)
+
+    def test_reconcile_repairs_drift(self):
+        self.create_note(uploader=self.student, status='pending')
+        self.create_note(make_pdf(seed=1), uploader=self.student)
+        StatusCount.objects.filter(status='approved').update(count=40)
+        UserStatusCount.objects.filter(user=self.student, status='pending').delete()
+        UserStatusCount.objects.create(user=self.teacher, status='rejected', count=3)
+
+        self.assertEqual(counters.reconcile(), 3)
+        self.assertEqual(counters.status_counts(), {'pending': 1, 'approved': 1, 'rejected': 0})
+        self.assertEqual(counters.user_status_counts(self.student.id)['pending'], 1)
+        self.assertFalse(UserStatusCount.objects.filter(user=self.teacher).exists())
+        self.assertEqual(counters.reconcile(), 0)
+
+    def test_apply_deltas_takes_two_queries_per_table(self):
+        users = [CustomUser.objects.create_user(f'S{i}', is_student=True) for i in range(200, 220)]
+        deltas = {(user.id, 'approved'): 3 for user in users}
+        deltas.update({(user.id, 'pending'): -1 for user in users[:5]})
+        UserStatusCount.objects.bulk_create(
+            UserStatusCount(user=user, status='pending', count=1) for user in users[:5]
+        )
+        StatusCount.objects.filter(status='pending').update(count=5)
+        with self.assertNumQueries(4):
+            counters.apply_deltas(deltas)
+        self.assertEqual(counters.status_counts(), {'pending': 0, 'approved': 60, 'rejected': 0})
+        self.assertEqual(counters.user_status_counts(users[0].id), {'pending': 0, 'approved': 3, 'rejected': 0, 'total': 3})
+        # Nothing to take away from a missing row
+        counters.apply_deltas({(self.teacher.id, 'rejected'): -1})
+        self.assertFalse(UserStatusCount.objects.filter(user=self.teacher, status='rejected').exists())
+
+
+# ===================== FACETS =====================
+class FacetTests(MediaTestCase):
+    def test_snapshot_follows_approvals(self):
+        note = self.create_note(status='pending')
+        self.create_note(make_pdf(seed=1), branch='ECE')
+        self.assertEqual(facets.snapshot(), [('1', 'ECE', 'Maths', 1)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            note.status = 'approved'
+            note.save()
+        self.assertEqual(facets.snapshot(), [('1', 'CSE', 'Maths', 1), ('1', 'ECE', 'Maths', 1)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            note.delete()
+        self.assertEqual(facets.snapshot(), [('1', 'ECE', 'Maths', 1)])
+        self.assertFalse(FacetCount.objects.filter(branch='CSE').exists())
+
+    def test_apply_deltas_does_not_grow_with_combinations(self):
+        FacetCount.objects.create(year='1', branch='CSE', subject='Maths', count=1)
+        deltas = {('2', 'CSE', f'Subject {i}'): 2 for i in range(30)}
+        deltas[('1', 'CSE', 'Maths')] = -1
+        # bulk insert, CASE update, delete of the emptied combination
+        with self.assertNumQueries(3):
+            facets.apply_deltas(deltas)
+        self.assertEqual(FacetCount.objects.count(), 30)
+        self.assertEqual(set(FacetCount.objects.values_list('count', flat=True)), {2})
+
+    def test_rebuild(self):
+        self.create_note()
+        self.create_note(make_pdf(seed=1), status='rejected')
+        FacetCount.objects.update(count=9)
+        self.assertEqual(facets.rebuild(), 1)
+        self.assertEqual(facets.snapshot(), [('1', 'CSE', 'Maths', 1)])
+
+
+# ===================== BULK MODERATION =====================
+class BulkModerationTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.uploaders = [CustomUser.objects.create_user(f'S{i}', is_student=True) for i in range(200, 220)]
+
+    def create_notes(self, count, start=0):
+        # Spread over 20 uploaders and up to 28 (year, branch, subject) combinations
+        return [
+            self.create_note(
+                uploader=self.uploaders[i % 20], status='pending',
+                year=str(i % 4 + 1), branch=('CSE', 'ECE')[i % 2], subject=f'Subject {i % 7}',
+            ).id
+            for i in range(start, start + count)
+        ]
+
+    def bulk_approve(self, ids):
+        with self.captureOnCommitCallbacks(execute=True):
+            return moderation.bulk_set_status('approved', ids=ids)
+
+    def test_queries_do_not_grow_with_the_batch(self):
+        few = self.create_notes(5)
+        many = self.create_notes(50, start=5)
+        with CaptureQueriesContext(connection) as small:
+            self.bulk_approve(few)
+        with self.assertNumQueries(len(small)):
+            self.bulk_approve(many)
+        self.assertEqual(counters.status_counts()['approved'], 55)
+        self.assertEqual(sum(count for *_, count in facets.snapshot()), 55)
+        self.assertEqual(counters.reconcile(), 0)
+
+    def test_results_by_id(self):
+        pending, approved = self.create_notes(2)
+        Notes.objects.filter(id=approved).update(status='approved')
+        results = self.bulk_approve([pending, approved, 999999])
+        self.assertEqual(results, {pending: 'updated', approved: 'unchanged', 999999: 'not_found'})
+
+    def test_filter_scope_moderates_the_dashboard_tab(self):
+        self.client.force_login(self.teacher)
+        ids = self.create_notes(8)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('bulk_moderate'),
+                {'action': 'reject', 'filter': {'tab': 'pending', 'branch': 'ECE'}},
+                content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['updated'], 4)
+        rejected = set(Notes.objects.filter(status='rejected').values_list('id', flat=True))
+        self.assertEqual(rejected, set(ids[1::2]))
+        self.assertEqual(counters.status_counts(), {'pending': 4, 'approved': 0, 'rejected': 4})
+
+    def test_malformed_requests_are_rejected(self):
+        self.client.force_login(self.teacher)
+        note_id = self.create_notes(1)[0]
+        bodies = (
+            [note_id],
+            {'action': 'approve', 'filter': ['pending']},
+            {'action': 'approve', 'filter': {'branch': 'CSE'}},
+            {'action': 'approve', 'filter': {'tab': 'everything'}},
+            {'action': 'approve', 'ids': ['x']},
+            {'action': 'publish', 'ids': [note_id]},
+        )
+        for body in bodies:
+            with self.subTest(body=body):
+                response = self.client.post(reverse('bulk_moderate'), body, content_type='application/json')
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json()['status'], 'error')
+        self.assertEqual(Notes.objects.get().status, 'pending')
+
+    def test_students_cannot_moderate(self):
+        self.client.force_login(self.student)
+        response = self.client.post(reverse('bulk_moderate'), {'action': 'approve', 'ids': [1]},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 403)
+
+
+# ===================== UPLOADS =====================
+class UploadHandlerTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = Client(enforce_csrf_checks=True)
+        self.client.force_login(self.student)
+        self.url = reverse('studentupload')
+        self.client.get(self.url)
+
+    def post(self, content, name='note.pdf'):
+        return self.client.post(self.url, {
+            'csrfmiddlewaretoken': self.client.cookies['csrftoken'].value,
+            'year': '1', 'branch': 'CSE', 'subject': 'Maths', 'chapter': 'Limits',
+            'pdf': ContentFile(content, name=name),
+        })
+
+    def tmp_files(self):
+        return os.listdir(pdf_storage.temp_dir())
+
+    def test_valid_pdf(self):
+        response = self.post(make_pdf())
+        self.assertRedirects(response, reverse('studentdashboard'), fetch_redirect_response=False)
+        note = Notes.objects.get()
+        self.assertEqual(note.status, 'pending')
+        self.assertIsNotNone(note.blob_id)
+        self.assertEqual(self.tmp_files(), [])
+
+    def test_not_a_pdf(self):
+        response = self.post(b'PK\x03\x04 not a pdf' * 100, name='note.pdf')
+        self.assertEqual(response.status_code, 415)
+        self.assertContains(response, 'Only PDF files are allowed.', status_code=415)
+        self.assertFalse(Notes.objects.exists())
+        self.assertEqual(self.tmp_files(), [])
+
+    def test_missing_eof_marker(self):
+        response = self.post(make_pdf()[:-8])
+        self.assertContains(response, 'The PDF file is incomplete or corrupted.', status_code=400)
+        self.assertFalse(Notes.objects.exists())
+
+    def test_oversized_upload_keeps_the_csrf_check(self):
+        response = self.post(make_pdf(MAX_PDF_SIZE + 1024))
+        self.assertContains(response, 'File size must be less than 10MB.', status_code=413)
+        self.assertFalse(Notes.objects.exists())
+        self.assertEqual(self.tmp_files(), [])
+
+
+class ChunkedUploadTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.student)
+
+    def initiate(self, content):
+        response = self.client.post(reverse('upload_initiate'), {
+            'year': '1', 'branch': 'CSE', 'subject': 'Maths', 'chapter': 'Limits',
+            'filename': 'note.pdf', 'total_size': len(content),
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        return response.json()['session']
+
+    def put(self, session_id, offset, data):
+        return self.client.put(reverse('upload_session', args=[session_id]), data,
+                               content_type='application/octet-stream', headers={'Upload-Offset': str(offset)})
+
+    def finalize(self, session_id):
+        return self.client.post(reverse('upload_finalize', args=[session_id]))
+
+    def test_chunks_are_assembled_into_a_note(self):
+        content = make_pdf(10000)
+        session_id = self.initiate(content)
+        self.assertEqual(self.put(session_id, 0, content[:6000]).json()['offset'], 6000)
+        self.assertEqual(self.put(session_id, 6000, content[6000:]).json()['offset'], 10000)
+
+        response = self.finalize(session_id)
+        self.assertEqual(response.status_code, 200)
+        note = Notes.objects.get(id=response.json()['note_id'])
+        self.assertEqual((note.status, note.uploader), ('pending', self.student))
+        self.assertEqual(note.pdf.read(), content)
+        self.assertFalse(os.path.exists(uploads.session_path(UploadSession.objects.get())))
+        # Retrying the finalize returns the same note
+        self.assertEqual(self.finalize(session_id).json()['note_id'], note.id)
+        self.assertEqual(Notes.objects.count(), 1)
+
+    def test_stale_session_object_does_not_create_a_second_note(self):
+        content = make_pdf()
+        session_id = self.initiate(content)
+        self.put(session_id, 0, content)
+        first, second = UploadSession.objects.get(), UploadSession.objects.get()
+        note = uploads.finalize(first)
+        self.assertEqual(uploads.finalize(second), note)
+        self.assertEqual(Notes.objects.count(), 1)
+
+    def test_out_of_order_chunk_is_rejected(self):
+        content = make_pdf()
+        session_id = self.initiate(content)
+        response = self.put(session_id, 100, content[100:])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['offset'], 0)
+
+    def test_not_a_pdf_aborts_on_the_first_chunk(self):
+        session_id = self.initiate(b'x' * 4096)
+        response = self.put(session_id, 0, b'PK\x03\x04' + b'x' * 4092)
+        self.assertEqual(response.status_code, 415)
+        self.assertEqual(response.json()['state'], 'aborted')
+
+    def test_incomplete_upload_cannot_be_finalized(self):
+        content = make_pdf()
+        session_id = self.initiate(content)
+        self.put(session_id, 0, content[:1000])
+        self.assertEqual(self.finalize(session_id).status_code, 409)
+        self.assertFalse(Notes.objects.exists())
+
+    def test_missing_eof_marker_is_rejected(self):
+        content = make_pdf()[:-8] + b'\n' * 8
+        session_id = self.initiate(content)
+        self.put(session_id, 0, content)
+        response = self.finalize(session_id)
+        self.assertContains(response, 'The PDF file is incomplete or corrupted.', status_code=400)
+        self.assertFalse(Notes.objects.exists())
+        self.assertEqual(UploadSession.objects.get().status, 'aborted')
+
+
+class PurgeUploadsTests(MediaTestCase):
+    def start(self, idle_hours):
+        session = UploadSession.objects.create(
+            user=self.student, year='1', branch='CSE', subject='Maths', chapter='Limits',
+            filename='note.pdf', total_size=4096,
+        )
+        os.makedirs(os.path.dirname(uploads.session_path(session)), exist_ok=True)
+        open(uploads.session_path(session), 'wb').close()
+        UploadSession.objects.filter(pk=session.pk).update(updated_at=timezone.now() - timedelta(hours=idle_hours))
+        return session
+
+    def test_abandoned_uploads_are_aborted(self):
+        stale, fresh = self.start(30), self.start(1)
+        out = StringIO()
+        call_command('purge_uploads', '--hours', '24', stdout=out)
+        self.assertIn('Aborted 1 abandoned upload(s).', out.getvalue())
+        self.assertEqual(UploadSession.objects.get(pk=stale.pk).status, 'aborted')
+        self.assertFalse(os.path.exists(uploads.session_path(stale)))
+        self.assertEqual(UploadSession.objects.get(pk=fresh.pk).status, 'active')
+        self.assertTrue(os.path.exists(uploads.session_path(fresh)))
+
+    def test_written_chunk_keeps_the_upload_alive(self):
+        session = self.start(30)
+        uploads.write_chunk(session, 0, 4096, ContentFile(make_pdf()))
+        call_command('purge_uploads', '--hours', '24', stdout=StringIO())
+        self.assertEqual(UploadSession.objects.get(pk=session.pk).status, 'active')
+
+
+# ===================== PDF BLOBS =====================
+class BlobRefcountTests(MediaTestCase):
+    def test_identical_uploads_share_one_blob(self):
+        first = self.create_note()
+        second = self.create_note(chapter='Other')
+        self.assertEqual(first.blob_id, second.blob_id)
+        self.assertEqual(PdfBlob.objects.get(pk=first.blob_id).refcount, 2)
+
+    def test_file_is_deleted_with_its_last_reference(self):
+        first = self.create_note()
+        second = self.create_note(chapter='Other')
+        digest = first.blob_id
+        name = pdf_storage.blob_name(digest)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(PdfBlob.objects.get(pk=digest).refcount, 1)
+        self.assertTrue(pdf_storage.exists(name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(PdfBlob.objects.filter(pk=digest).exists())
+        self.assertFalse(pdf_storage.exists(name))
+
+    def test_blob_referenced_again_before_the_delete_runs_is_kept(self):
+        first = self.create_note()
+        digest = first.blob_id
+        with self.captureOnCommitCallbacks() as callbacks:
+            first.delete()
+        self.create_note(chapter='Again')
+        for callback in callbacks:
+            callback()
+        self.assertEqual(PdfBlob.objects.get(pk=digest).refcount, 1)
+        self.assertTrue(pdf_storage.exists(pdf_storage.blob_name(digest)))
+
+    def test_replacing_the_file_releases_the_old_blob(self):
+        note = self.create_note()
+        old_digest = note.blob_id
+        note.pdf.save('new.pdf', ContentFile(make_pdf(seed=1)), save=False)
+        with self.captureOnCommitCallbacks(execute=True):
+            note.save()
+        self.assertNotEqual(note.blob_id, old_digest)
+        self.assertFalse(PdfBlob.objects.filter(pk=old_digest).exists())
+        self.assertFalse(pdf_storage.exists(pdf_storage.blob_name(old_digest)))
+
+
+# ===================== CATALOG API =====================
+class CatalogEtagTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.note = self.create_note()
+        self.client.force_login(self.student)
+        self.url = reverse('catalog_api')
+
+    def test_unchanged_catalog_revalidates_to_304(self):
+        response = self.client.get(self.url, {'fields': 'id,title'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.json()['results']], [self.note.id])
+        with self.assertNumQueries(2):
+            # The user and the version row (sessions are cached); the notes are never read.
+            cached = self.client.get(self.url, {'fields': 'id,title'}, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached['ETag'], response['ETag'])
+
+    def test_parameters_change_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        self.assertNotEqual(self.client.get(self.url, {'year': '1'})['ETag'], etag)
+        self.assertNotEqual(self.client.get(self.url, {'limit': '5'})['ETag'], etag)
+
+    def test_note_changes_invalidate_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        self.create_note(make_pdf(seed=1), chapter='New')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 2)
+
+    def test_uploader_rename_invalidates_the_etag(self):
+        response = self.client.get(self.url, {'fields': 'id,uploader'})
+        self.teacher.username = 'professor'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.teacher.save()
+        renamed = self.client.get(self.url, {'fields': 'id,uploader'}, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(renamed.status_code, 200)
+        self.assertEqual(renamed.json()['results'][0]['uploader'], 'professor')
+
+    def test_invalid_parameters(self):
+        response = self.client.get(self.url, {'fields': 'id,nope'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['status'], 'error')
+
+
+# ===================== DASHBOARD CACHE =====================
+@unhashed_static
+class CatalogFragmentTests(MediaTestCase):
+    def test_uploader_rename_expires_cached_cards(self):
+        self.create_note()
+        self.client.force_login(self.student)
+        url = reverse('studentdashboard')
+        self.assertContains(self.client.get(url), 'Uploaded by teacher')
+        self.teacher.username = 'professor'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.teacher.save()
+        response = self.client.get(url)
+        self.assertContains(response, 'Uploaded by professor')
+        self.assertNotContains(response, 'Uploaded by teacher')
+
+
+# ===================== ASYNC VIEWS =====================
+@unhashed_static
+class AsyncViewTests(MediaTestCase):
+    async def call(self, view, user, *args, path='/', data=None, **headers):
+        request = AsyncRequestFactory().get(path, data, headers=headers)
+        request.user = user
+
+        async def auser():
+            return user
+        request.auser = auser
+        return await view(request, *args)
+
+    async def test_catalog_search_matches_the_sync_view(self):
+        await sync_to_async(self.create_note)(chapter='Eigenvalues')
+        await sync_to_async(self.create_note)(make_pdf(seed=1))
+        response = await self.call(async_views.studentdashboard, self.student, data={'search': 'eigenvalues'})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Eigenvalues')
+        self.assertNotContains(response, 'Limits')
+
+    async def test_pdf_is_streamed(self):
+        content = make_pdf(2000)
+        note = await sync_to_async(self.create_note)(content)
+        response = await self.call(async_views.view_note, self.student, note.id)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join([chunk async for chunk in response.streaming_content]), content)
+
+    async def test_unapproved_notes_are_hidden_from_students(self):
+        note = await sync_to_async(self.create_note)(status='pending')
+        response = await self.call(async_views.download_note, self.student, note.id, X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(json.loads(response.content)['message'], 'Note not accessible')
+
+    async def test_approve_updates_the_counters(self):
+        note = await sync_to_async(self.create_note)(status='pending')
+        response = await self.call(async_views.approve_note, self.teacher, note.id, X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(json.loads(response.content)['status'], 'success')
+        counts = await sync_to_async(counters.status_counts)()
+        self.assertEqual((counts['pending'], counts['approved']), (0, 1))
+
+
+# ===================== ANALYTICS =====================
+class AnalyticsTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.note = self.create_note(make_pdf(2000))
+        self.client.force_login(self.student)
+        self.url = reverse('view_note', args=[self.note.id])
+
+    def flushed_views(self):
+        analytics.buffer.flush()
+        return NoteStats.objects.filter(note=self.note).values_list('views', flat=True).first() or 0
+
+    def test_only_responses_that_send_the_document_are_counted(self):
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=0-99').status_code, 206)
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=100-199').status_code, 206)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=5000-').status_code, 416)
+        self.assertEqual(self.flushed_views(), 2)
+
+    @override_settings(NOTESHUB_SENDFILE_BACKEND='nginx')
+    def test_proxy_hand_off_counts_the_first_range_only(self):
+        self.client.get(self.url, HTTP_RANGE='bytes=0-99')
+        self.client.get(self.url, HTTP_RANGE='bytes=100-199')
+        self.assertEqual(self.flushed_views(), 1)
+
+    def test_flush_writes_totals_and_daily_rollups(self):
+        other = self.create_note(make_pdf(seed=1))
+        today = timezone.localdate()
+        analytics.write_events({
+            (self.note.id, today, 'download'): 3,
+            (self.note.id, today - timedelta(days=1), 'download'): 2,
+            (other.id, today, 'download'): 4,
+            (other.id, today, 'view'): 1,
+            (999999, today, 'view'): 1,
+        })
+        analytics.write_events({(self.note.id, today, 'download'): 1})
+        self.assertEqual(NoteStats.objects.get(note=self.note).downloads, 6)
+        self.assertEqual(NoteDailyStats.objects.get(note=self.note, day=today).downloads, 4)
+        self.assertFalse(NoteStats.objects.filter(note_id=999999).exists())
+        self.assertEqual([row.id for row in analytics.popular_this_week()], [self.note.id, other.id])
+
+        Notes.objects.filter(id=self.note.id).update(status='pending')
+        self.assertEqual([row.id for row in analytics.popular_this_week()], [other.id])
+
+    def test_old_days_fall_out_of_the_weekly_ranking(self):
+        day = timezone.localdate() - timedelta(days=analytics.POPULAR_DAYS)
+        analytics.write_events({(self.note.id, day, 'download'): 5})
+        self.assertEqual(analytics.popular_this_week(), [])
+
+
+# ===================== STATIC ASSETS =====================
+class StaticAssetTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.static_root = tempfile.mkdtemp(prefix='noteshub-static-')
+        cls.addClassCleanup(shutil.rmtree, cls.static_root, ignore_errors=True)
+        cls.enterClassContext(override_settings(STATIC_ROOT=cls.static_root, STORAGES={
+            'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+            'staticfiles': {'BACKEND': 'noteshub.assets.CompressedManifestStaticFilesStorage'},
+        }))
+        call_command('collectstatic', interactive=False, verbosity=0)
+        cls.name = staticfiles_storage.stored_name('noteshub/css/studentdashboard.css')
+        cls.url = '/static/' + cls.name
+        with open(os.path.join(cls.static_root, 'noteshub/css/studentdashboard.css'), 'rb') as f:
+            cls.source = f.read()
+
+    def test_collectstatic_writes_hashed_and_gzipped_copies(self):
+        self.assertRegex(self.name, r'^noteshub/css/studentdashboard\.[0-9a-f]{12}\.css$')
+        with open(os.path.join(self.static_root, self.name + '.gz'), 'rb') as f:
+            self.assertEqual(gzip.decompress(f.read()), self.source)
+
+    def test_hashed_names_are_served_compressed_and_immutable(self):
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='br;q=0, gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Cache-Control'], IMMUTABLE_CACHE_CONTROL)
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertTrue(response['Content-Type'].startswith('text/css'))
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), self.source)
+
+        revalidated = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_identity_and_unhashed_names(self):
+        response = self.client.get(self.url)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(b''.join(response.streaming_content), self.source)
+        response = self.client.get('/static/noteshub/css/studentdashboard.css')
+        self.assertEqual(response['Cache-Control'], 'public, no-cache')
+
+    def test_paths_outside_static_root_are_not_served(self):
+        self.assertEqual(self.client.get('/static/../manage.py').status_code, 404)
+        self.assertEqual(self.client.get('/static/noteshub/missing.css').status_code, 404)
+
+
+# ===================== ZIP EXPORT =====================
+class ZipExportTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.student)
+
+    def export(self, **params):
+        return self.client.get(reverse('export_notes'), params)
+
+    def test_archive_holds_the_approved_notes(self):
+        first = make_pdf(3000, seed=1)
+        second = make_pdf(5000, seed=2)
+        self.create_note(first)
+        self.create_note(second)
+        self.create_note(make_pdf(seed=3), status='pending')
+        self.create_note(make_pdf(seed=4), subject='Physics')
+
+        response = self.export(subject='Maths')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="notes-Maths.zip"; '
+                                                          "filename*=UTF-8''notes-Maths.zip")
+        self.assertFalse(response.has_header('Content-Length'))
+        archive = zipfile.ZipFile(BytesIO(b''.join(response.streaming_content)))
+        self.assertIsNone(archive.testzip())
+        self.assertEqual(archive.namelist(), ['1/CSE/Maths_Limits.pdf', '1/CSE/Maths_Limits (2).pdf'])
+        self.assertEqual(archive.read('1/CSE/Maths_Limits (2).pdf'), second)
+
+        analytics.buffer.flush()
+        self.assertEqual(sorted(NoteStats.objects.values_list('downloads', flat=True)), [1, 1])
+
+    def test_missing_files_are_skipped(self):
+        gone = self.create_note(make_pdf(seed=1), chapter='Gone')
+        self.create_note(make_pdf(seed=2))
+        os.unlink(gone.pdf.path)
+        archive = zipfile.ZipFile(BytesIO(b''.join(exports.stream_zip(exports.export_notes(branch='CSE')))))
+        self.assertEqual(archive.namelist(), ['1/CSE/Maths_Limits.pdf'])
+
+    def test_unfiltered_and_oversized_exports_are_refused(self):
+        self.create_note(make_pdf(seed=1))
+        self.create_note(make_pdf(seed=2))
+        self.assertContains(self.export(), 'Choose a year', status_code=400)
+        with mock.patch.object(exports, 'MAX_EXPORT_NOTES', 1):
+            self.assertContains(self.export(year='1'), 'narrow the filters', status_code=400)
+
+
+# ===================== PROFILING =====================
+class ProfilingUnitTests(SimpleTestCase):
+    def test_sql_shape_ignores_parameters(self):
+        self.assertEqual(
+            profiling.sql_shape("SELECT * FROM t WHERE id = 42 AND name = 'it''s' AND x IN (%s, %s, %s)"),
+            'SELECT * FROM t WHERE id = ? AND name = ? AND x IN (...)',
+        )
+
+    def test_repeated_query_shapes_are_flagged(self):
+        profile = profiling.RequestProfile()
+        for note_id in range(profiling.REPEAT_THRESHOLD):
+            profile(lambda *args: None, f'SELECT * FROM noteshub_notes WHERE id = {note_id}', None, False, {})
+        profile(lambda *args: None, 'SELECT 1', None, False, {})
+        self.assertEqual(profile.queries, profiling.REPEAT_THRESHOLD + 1)
+        self.assertEqual(profile.repeated_queries(),
+                         [('SELECT * FROM noteshub_notes WHERE id = ?', profiling.REPEAT_THRESHOLD)])
+
+    def test_histogram_keeps_a_rolling_window(self):
+        histogram = profiling.RollingHistogram(size=100)
+        for value in range(1, 201):
+            histogram.add(value)
+        summary = histogram.summary()
+        self.assertEqual((summary['count'], summary['max']), (200, 200))
+        self.assertEqual((summary['p50'], summary['p99']), (151, 199))
+
+
+@override_settings(NOTESHUB_PROFILING=True)
+class ProfilingMiddlewareTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        profiling.registry.reset()
+        self.addCleanup(profiling.registry.reset)
+        self.dump_dir = os.path.join(self.media_root, 'profiling')
+        # The middleware is only loaded when the client first sends a request.
+        self.client = Client()
+        self.client.force_login(self.student)
+
+    def test_views_are_recorded_and_reported(self):
+        self.create_note()
+        self.client.get(reverse('catalog_api'))
+        self.client.get(reverse('catalog_api'))
+        stats = profiling.registry.snapshot()['catalog_api']
+        self.assertEqual(stats['queries']['count'], 2)
+        self.assertGreater(stats['queries']['p50'], 0)
+        self.assertGreater(stats['bytes']['max'], 0)
+
+        profiling.dump(self.dump_dir)
+        self.assertEqual(profiling.load_dumps(self.dump_dir).snapshot()['catalog_api']['total_ms']['count'], 2)
+        out = StringIO()
+        call_command('profile_report', '--dir', self.dump_dir, stdout=out)
+        self.assertIn('catalog_api', out.getvalue())
+
+    def test_report_endpoint_is_staff_only(self):
+        self.assertEqual(self.client.get(reverse('profiling_report')).status_code, 302)
+        CustomUser.objects.filter(pk=self.teacher.pk).update(is_staff=True)
+        self.client.force_login(CustomUser.objects.get(pk=self.teacher.pk))
+        self.client.get(reverse('catalog_api'))
+        self.assertIn('catalog_api', self.client.get(reverse('profiling_report')).json()['views'])
+
+
+# ===================== PROCESSING PIPELINE =====================
+class PipelineTests(MediaTestCase):
+    def test_saving_a_note_queues_a_job(self):
+        note = self.create_note()
+        self.assertEqual(list(note.jobs.values_list('kind', 'status')), [('full', 'queued')])
+
+    def test_complete_makes_the_text_searchable(self):
+        note = self.create_note()
+        job = pipeline.claim(10)[0]
+        self.assertEqual((job.status, job.attempts), ('running', 1))
+        self.assertEqual(pipeline.claim(10), [])
+
+        version = catalog.version()
+        with self.captureOnCommitCallbacks(execute=True):
+            pipeline.complete(job, {'text': 'eigenvalue decomposition', 'page_count': 3, 'metadata': {}})
+        self.assertEqual(NoteContent.objects.get(note=note).page_count, 3)
+        self.assertEqual(search.search_ids('eigenvalue'), [note.id])
+        self.assertGreater(catalog.version(), version)
+        self.assertEqual(note.jobs.get().status, 'done')
+
+    def test_failures_retry_until_max_attempts(self):
+        self.create_note()
+        for attempt in range(1, pipeline.MAX_ATTEMPTS + 1):
+            job = pipeline.claim(10)[0]
+            status = pipeline.fail(job, ValueError('bad xref'))
+            self.assertEqual(status, 'failed' if attempt == pipeline.MAX_ATTEMPTS else 'queued')
+        self.assertEqual(pipeline.claim(10), [])
+
+    def test_stale_running_jobs_are_requeued(self):
+        self.create_note()
+        pipeline.claim(10)
+        ProcessingJob.objects.update(started_at=timezone.now() - pipeline.STALE_AFTER - timedelta(minutes=1))
+        self.assertEqual(pipeline.requeue_stale(), 1)
+        self.assertEqual(len(pipeline.claim(10)), 1)
+
+    def test_backfill_queues_notes_that_were_never_processed(self):
+        old = self.create_note()
+        processed = self.create_note(make_pdf(seed=1))
+        failed = self.create_note(make_pdf(seed=2))
+        ProcessingJob.objects.filter(note=old).delete()
+        NoteContent.objects.create(note=processed)
+        ProcessingJob.objects.filter(note=failed).update(status='failed')
+
+        self.assertEqual(pipeline.backfill(batch_size=1), 1)
+        self.assertEqual(old.jobs.get().status, 'queued')
+        self.assertEqual(pipeline.backfill(), 0)
+
+    def test_process_notes_all_drains_the_backfill(self):
+        note = self.create_note()
+        ProcessingJob.objects.all().delete()
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('process_notes', '--all', '--once', '--workers', '1', stdout=out, stderr=StringIO())
+        self.assertIn('Queued 1 unprocessed note(s).', out.getvalue())
+        self.assertEqual(note.jobs.get().status, 'done')
+        self.assertIsNotNone(previews.cached_path(note.blob_id))
+
+
+# ===================== PREVIEWS =====================
+class PreviewTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        shutil.rmtree(previews.cache_dir(), ignore_errors=True)
+        self.note = self.create_note()
+        ProcessingJob.objects.update(status='done', finished_at=timezone.now() - timedelta(days=1))
+        self.client.force_login(self.student)
+        self.url = reverse('note_preview', args=[self.note.id, self.note.blob_id])
+
+    def preview_jobs(self):
+        return ProcessingJob.objects.filter(note=self.note, kind='preview')
+
+    def test_miss_queues_one_preview_job(self):
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.assertEqual(self.preview_jobs().count(), 1)
+
+    def test_failed_or_recent_jobs_are_not_requeued(self):
+        ProcessingJob.objects.update(status='failed')
+        pipeline.request_preview(self.note)
+        ProcessingJob.objects.update(status='done', finished_at=timezone.now())
+        pipeline.request_preview(self.note)
+        self.assertFalse(self.preview_jobs().exists())
+
+    def test_preview_job_renders_without_touching_the_catalog(self):
+        pipeline.request_preview(self.note)
+        job = pipeline.claim(1)[0]
+        version = catalog.version()
+        pipeline.complete(job, process_pdf(self.note.pdf.path, self.note.blob_id, job.kind))
+        self.assertEqual(catalog.version(), version)
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'private, max-age=31536000, immutable')
+
+    def test_extraction_errors_still_leave_a_preview(self):
+        with mock.patch('noteshub.extraction.extract_pdf', side_effect=ValueError('bad xref')):
+            with self.assertRaises(ValueError):
+                process_pdf(self.note.pdf.path, self.note.blob_id)
+        self.assertIsNotNone(previews.cached_path(self.note.blob_id))
+
+    def test_unapproved_preview_is_forbidden(self):
+        note = self.create_note(make_pdf(seed=1), status='pending')
+        response = self.client.get(reverse('note_preview', args=[note.id, note.blob_id]))
+        self.assertEqual(response.status_code, 403)
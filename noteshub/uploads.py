@@ -0,0 +1,271 @@
+import hashlib
+import os
+import tempfile
+
+import magic
+from django.core.files import File
+from django.core.files.uploadedfile import TemporaryUploadedFile, UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+from django.db import transaction
+from django.utils import timezone
+
+from .forms import MAX_PDF_SIZE
+from .models import Notes, UploadSession
+from .storage import pdf_storage
+
+# Largest body accepted by one PUT; clients send chunks of this size or less.
+MAX_CHUNK_SIZE = 5 * 1024 * 1024
+READ_SIZE = 64 * 1024
+SNIFF_SIZE = 2048
+
+# Room for the other form fields and multipart headers around the PDF.
+MAX_FORM_OVERHEAD = 64 * 1024
+
+# PDF readers look for the %%EOF marker within the last 1024 bytes.
+EOF_WINDOW = 1024
+
+
+class UploadError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+class SessionFile(File):
+    """The assembled upload; storage moves it into place instead of copying."""
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def session_path(session):
+    return pdf_storage.path(f'noteshub/uploads/{session.pk}.part')
+
+
+def initiate(user, form):
+    session = form.save(commit=False)
+    session.user = user
+    session.save()
+    path = session_path(session)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'wb').close()
+    return session
+
+
+def abort(session):
+    UploadSession.objects.filter(pk=session.pk).update(status='aborted')
+    session.status = 'aborted'
+    try:
+        os.unlink(session_path(session))
+    except FileNotFoundError:
+        pass
+
+
+def write_chunk(session, offset, length, stream):
+    """
+    Append ``length`` bytes read from ``stream`` at ``offset``.
+
+    Data goes straight to the session file in READ_SIZE pieces. The first
+    chunk is sniffed for the PDF signature before anything is written, and
+    the declared total is enforced before reading, so bad uploads fail on
+    their first request.
+    """
+    if session.status != 'active':
+        raise UploadError('Upload session is closed.', 409)
+    if offset != session.received:
+        raise UploadError(f'Expected offset {session.received}.', 409)
+    if length <= 0 or length > MAX_CHUNK_SIZE:
+        raise UploadError(f'Chunks must be between 1 byte and {MAX_CHUNK_SIZE} bytes.', 413)
+    if offset + length > min(session.total_size, MAX_PDF_SIZE):
+        abort(session)
+        raise UploadError('Upload is larger than the declared file size.', 413)
+
+    remaining = length
+    with open(session_path(session), 'r+b') as f:
+        f.seek(offset)
+        if offset == 0:
+            head = stream.read(min(SNIFF_SIZE, remaining))
+            if magic.from_buffer(head, mime=True) != 'application/pdf':
+                abort(session)
+                raise UploadError('Only PDF files are allowed.', 415)
+            f.write(head)
+            remaining -= len(head)
+        while remaining > 0:
+            data = stream.read(min(READ_SIZE, remaining))
+            if not data:
+                break
+            f.write(data)
+            remaining -= len(data)
+        f.truncate()
+
+    received = offset + length - remaining
+    # Only the writer that started from the current offset may advance it.
+    # updated_at is set by hand (auto_now only applies to save()) for purge_uploads.
+    if not UploadSession.objects.filter(pk=session.pk, received=offset, status='active').update(
+        received=received, updated_at=timezone.now(),
+    ):
+        raise UploadError('Concurrent write to the same offset.', 409)
+    session.received = received
+    return received
+
+
+def _has_eof_marker(path):
+    with open(path, 'rb') as f:
+        f.seek(max(os.fstat(f.fileno()).st_size - EOF_WINDOW, 0))
+        return b'%%EOF' in f.read()
+
+
+def finalize(session):
+    """
+    Turn a fully received session into a note.
+
+    The session row is locked and re-read first, so a concurrent finalize
+    or abort cannot create a second note or a note without its file. The
+    assembled file gets the same %%EOF check as a form upload.
+    """
+    path = session_path(session)
+    with transaction.atomic():
+        locked = UploadSession.objects.select_for_update().get(pk=session.pk)
+        session.status, session.received, session.note_id = locked.status, locked.received, locked.note_id
+        if session.status == 'complete':
+            return session.note
+        if session.status != 'active':
+            raise UploadError('Upload session is closed.', 409)
+        if session.received != session.total_size:
+            raise UploadError(f'Upload incomplete: {session.received} of {session.total_size} bytes.', 409)
+
+        corrupted = not _has_eof_marker(path)
+        if not corrupted:
+            user = session.user
+            note = Notes(
+                uploader=user,
+                year=session.year,
+                branch=session.branch,
+                subject=session.subject,
+                chapter=session.chapter,
+                # Teachers can upload directly without approval
+                status='approved' if user.is_teacher else 'pending',
+            )
+            with open(path, 'rb') as f:
+                note.pdf.save(session.filename, SessionFile(f, name=path), save=False)
+            note.save()
+            UploadSession.objects.filter(pk=session.pk).update(status='complete', note=note)
+    if corrupted:
+        abort(session)
+        raise UploadError('The PDF file is incomplete or corrupted.')
+    if os.path.exists(path):
+        os.unlink(path)
+    session.status = 'complete'
+    session.note = note
+    return note
+
+
+# ===================== FORM UPLOADS =====================
+class PdfUploadedFile(TemporaryUploadedFile):
+    """
+    Streamed upload kept next to the blobs; ``sha256`` lets the storage skip
+    re-hashing it, and ``temporary_file_path`` lets it rename instead of copy.
+    """
+
+    def __init__(self, name, content_type, size, charset, content_type_extra=None):
+        file = tempfile.NamedTemporaryFile(suffix='.upload', dir=pdf_storage.temp_dir())
+        UploadedFile.__init__(self, file, name, content_type, size, charset, content_type_extra)
+        self.sha256 = None
+
+
+class PdfUploadHandler(FileUploadHandler):
+    """
+    Checks the ``pdf`` field of the upload forms while it arrives.
+
+    An oversized Content-Length is noted up front and the upload stops as
+    soon as the ``pdf`` part starts, so the fields before it (including
+    ``csrfmiddlewaretoken``) are still parsed and the CSRF check runs as
+    usual. A wrong signature fails on the first chunk and an oversized stream
+    as soon as it crosses MAX_PDF_SIZE. The reason and an HTTP status are
+    kept in ``error``/``status`` for the view (see ``upload_error``). Must be
+    installed before CSRF middleware reads request.POST, i.e. on a
+    csrf_exempt view that then applies csrf_protect.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.error = None
+        self.status = None
+        self.active = False
+        self.too_large = False
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        self.too_large = content_length > MAX_PDF_SIZE + MAX_FORM_OVERHEAD
+        return None
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None, content_type_extra=None):
+        self.active = field_name == 'pdf'
+        if not self.active:
+            return
+        if self.too_large:
+            # Nothing of the PDF is read; the fields before it are already parsed.
+            self._stop('File size must be less than 10MB.', 413)
+        super().new_file(field_name, file_name, content_type, content_length, charset, content_type_extra)
+        self.file = PdfUploadedFile(file_name, content_type, 0, charset, content_type_extra)
+        self.sha256 = hashlib.sha256()
+        self.tail = b''
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self.active:
+            return None
+        if start == 0 and magic.from_buffer(raw_data[:SNIFF_SIZE], mime=True) != 'application/pdf':
+            self._stop('Only PDF files are allowed.', 415)
+        if start + len(raw_data) > MAX_PDF_SIZE:
+            self._stop('File size must be less than 10MB.', 413)
+        self.file.write(raw_data)
+        self.sha256.update(raw_data)
+        self.tail = (self.tail + raw_data[-EOF_WINDOW:])[-EOF_WINDOW:]
+        return None
+
+    def file_complete(self, file_size):
+        if not self.active:
+            return None
+        self.active = False
+        if b'%%EOF' not in self.tail:
+            self.error = 'The PDF file is incomplete or corrupted.'
+            self.status = 400
+            self.upload_interrupted()
+            return None
+        self.file.flush()
+        self.file.seek(0)
+        self.file.size = file_size
+        self.file.sha256 = self.sha256.hexdigest()
+        return self.file
+
+    def upload_interrupted(self):
+        if hasattr(self, 'file'):
+            # Closing the NamedTemporaryFile deletes it.
+            self.file.close()
+            del self.file
+
+    def _stop(self, error, status):
+        self.error = error
+        self.status = status
+        # Drop the partial temp file now rather than leaving it to the parser.
+        self.upload_interrupted()
+        raise StopUpload(connection_reset=True)
+
+
+def _rejecting_handler(request):
+    for handler in request.upload_handlers:
+        if getattr(handler, 'error', None):
+            return handler
+    return None
+
+
+def upload_error(request):
+    """Why ``PdfUploadHandler`` rejected this request's PDF, or None."""
+    handler = _rejecting_handler(request)
+    return handler.error if handler else None
+
+
+def upload_status(request):
+    """HTTP status for the upload form response: the rejection's, else 200."""
+    handler = _rejecting_handler(request)
+    return handler.status if handler else 200
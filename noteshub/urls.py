@@ -1,20 +1,33 @@
-from django.urls import path
-from . import views
 from django.conf import settings
-from django.conf.urls.static import static
+from django.urls import path
+from . import async_views, views
+
+# Under ASGI the delivery, dashboard and moderation views run natively async.
+hot_views = async_views if settings.NOTESHUB_ASYNC_VIEWS else views
+
 urlpatterns = [
     path('', views.landingpage, name='landingpage'),
     path('studentlogin/', views.studentloginview, name='studentlogin'),
     path('teacherlogin/', views.teacheloginview, name='teacherlogin'),
-    path('studentlogin/studentdashboard/', views.studentdashboard, name='studentdashboard'),
-    path('teacherlogin/teacherdashboard/', views.teacherdashboard, name='teacherdashboard'),
+    path('studentlogin/studentdashboard/', hot_views.studentdashboard, name='studentdashboard'),
+    path('teacherlogin/teacherdashboard/', hot_views.teacherdashboard, name='teacherdashboard'),
     path('studentlogin/studentupload/', views.studentupload, name='studentupload'),
     path('teacherlogin/teacherupload/', views.teacherupload, name='teacherupload'),
-    path('approve/<int:note_id>/', views.approve_note, name='approve_note'),
-    path('reject/<int:note_id>/', views.reject_note, name='reject_note'),
-    path('pending/<int:note_id>/', views.pending_note, name='pending_note'),
+    path('approve/<int:note_id>/', hot_views.approve_note, name='approve_note'),
+    path('reject/<int:note_id>/', hot_views.reject_note, name='reject_note'),
+    path('pending/<int:note_id>/', hot_views.pending_note, name='pending_note'),
+    path('moderate/', hot_views.bulk_moderate, name='bulk_moderate'),
     path('logout/', views.logoutview, name='logout'),
     path('delete/<int:note_id>/', views.delete_note, name='delete_note'),
-    path('view/<int:note_id>/', views.view_note, name='view_note'),
-    path('download/<int:note_id>/', views.download_note, name='download_note'),
-]+static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    path('view/<int:note_id>/', hot_views.view_note, name='view_note'),
+    path('download/<int:note_id>/', hot_views.download_note, name='download_note'),
+    path('export/', views.export_notes, name='export_notes'),
+    path('preview/<int:note_id>/<str:digest>/', views.note_preview, name='note_preview'),
+    path('search/', views.search_notes, name='search_notes'),
+    path('facets/', views.facet_counts, name='facet_counts'),
+    path('api/catalog/', views.catalog_api, name='catalog_api'),
+    path('uploads/', views.upload_initiate, name='upload_initiate'),
+    path('uploads/<uuid:session_id>/', views.upload_session, name='upload_session'),
+    path('uploads/<uuid:session_id>/finalize/', views.upload_finalize, name='upload_finalize'),
+    path('profiling/', views.profiling_report, name='profiling_report'),
+]
@@ -1,14 +1,24 @@
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth import authenticate, login, logout
+from django.contrib.admin.views.decorators import staff_member_required
 import json
+import os
+from urllib.parse import quote
+from django.conf import settings
+from django.db import transaction
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import FileResponse
+from django.template.loader import render_to_string
 from django.utils import timezone
+from django.utils.cache import get_conditional_response
 from django.contrib import messages
-from .forms import StudentLoginForm, TeacherLoginForm, NotesUploadForm
-from .models import CustomUser, Notes
-from django.http import HttpResponseRedirect, JsonResponse
-from django.core.paginator import Paginator
+from .forms import StudentLoginForm, TeacherLoginForm, NotesUploadForm, UploadSessionForm
+from .models import Notes, UploadSession
+from django.http import FileResponse, Http404, HttpResponseForbidden, HttpResponseNotAllowed, HttpResponseRedirect, JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from django.views.decorators.http import require_POST
+from .pagination import KeysetPaginator
+from . import analytics, caching, catalog, counters, exports, facets, moderation, pipeline, previews, profiling, search, uploads
+from .serving import serve_pdf
 
 def landingpage(request):
     return render(request, 'noteshub/landingpage.html')
@@ -47,26 +57,59 @@ def studentdashboard(request):
     year = request.GET.get('year')
     branch = request.GET.get('branch')
     subject = request.GET.get('subject')
+    search_query = request.GET.get('search', '')
+
+    after = request.GET.get('after')
+    before = request.GET.get('before')
+    sort = request.GET.get('sort', '')
+
+    def render_catalog():
+        # Approved notes (slim card rows, uploader joined) with the filters applied
+        notes = catalog.approved_notes(year, branch, subject, search_query)
 
-    # Start with approved notes
-    notes = Notes.objects.filter(status='approved')
-    uploads = Notes.objects.filter(uploader=request.user)
+        page_obj = KeysetPaginator(notes, 12).get_page(after=after, before=before)
+        return render_to_string('noteshub/includes/catalog_grid.html', {
+            'notes': page_obj,
+            'page_obj': page_obj,
+            'year': year,
+            'branch': branch,
+            'subject': subject,
+            'search_query': search_query,
+        })
 
-    # Apply filters if present
-    if year:
-        notes = notes.filter(year=year)
-    if branch:
-        notes = notes.filter(branch=branch)
-    if subject:
-        notes = notes.filter(subject=subject)
+    def render_popular():
+        # Ranked from the daily rollups only; a single page, no cursors
+        return render_to_string('noteshub/includes/catalog_grid.html', {
+            'notes': analytics.popular_this_week(12, year, branch, subject),
+            'year': year,
+            'branch': branch,
+            'subject': subject,
+            'sort': sort,
+        })
+
+    def render_uploads():
+        uploads = Notes.objects.uploads_of(request.user).order_by('-uploaded_at')
+        return render_to_string('noteshub/includes/my_uploads.html', {'uploads': uploads})
+
+    # Popularity changes with every analytics flush and search results depend
+    # on the index, so only plain filtered views are cached
+    if sort == 'popular':
+        catalog_html = render_popular()
+    elif search_query:
+        catalog_html = render_catalog()
+    else:
+        catalog_html = caching.catalog_fragment(year, branch, subject, after, before, render_catalog)
 
     return render(request, 'noteshub/studentdashboard.html', {
         'roll_number': request.user.roll_number,
-        'notes': notes,
-        'uploads': uploads,
+        'catalog_html': catalog_html,
+        'uploads_html': caching.uploads_fragment(request.user.id, render_uploads),
+        'upload_counts': counters.user_status_counts(request.user.id),
         'year': year,
         'branch': branch,
         'subject': subject,
+        'search_query': search_query,
+        'sort': sort,
     })
 
 
@@ -96,7 +139,6 @@ def teacheloginview(request):
 @login_required
 def teacherdashboard(request):
     current_tab = request.GET.get('tab', 'pending')
-    page = request.GET.get('page', 1)
     
     # Get filter parameters
     year_filter = request.GET.get('year', '')
@@ -104,45 +146,108 @@ def teacherdashboard(request):
     subject_filter = request.GET.get('subject', '')
     search_query = request.GET.get('search', '')
     
-    # Base queryset with ordering
-    notes = Notes.objects.all().order_by('-uploaded_at')
+    # Tab and filter parameters (ordering is applied by the paginator)
+    notes = moderation.dashboard_notes(request.user, request.GET)
     
-    # Filter by tab first
-    if current_tab == 'my-uploads':
-        notes = notes.filter(uploader=request.user)
-    elif current_tab == 'pending':
-        notes = notes.filter(status='pending')
-    elif current_tab == 'approved':
-        notes = notes.filter(status='approved')
-    elif current_tab == 'rejected':
-        notes = notes.filter(status='rejected')
-    
-    # Then apply additional filters
-    if year_filter:
-        notes = notes.filter(year__icontains=year_filter)
-    if branch_filter:
-        notes = notes.filter(branch__icontains=branch_filter)
-    if subject_filter:
-        notes = notes.filter(subject__icontains=subject_filter)
-    if search_query:
-        notes = notes.filter(
-            Q(title__icontains=search_query) |
-            Q(description__icontains=search_query)
-        )
-    
-    # Pagination
-    paginator = Paginator(notes, 10)
-    page_obj = paginator.get_page(page)
+    # Keyset pagination on (uploaded_at, id)
+    page_obj = KeysetPaginator(notes, 10).get_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
     
     return render(request, 'noteshub/teacherdashboard.html', {
         'page_obj': page_obj,
         'current_tab': current_tab,
+        # Tab badges from the maintained counters, not COUNT(*) over notes
+        'status_counts': counters.status_counts(),
+        'my_upload_counts': counters.user_status_counts(request.user.id),
         'year_filter': year_filter,
         'branch_filter': branch_filter,
         'subject_filter': subject_filter,
         'search_query': search_query
     })
 
+# ===================== SEARCH =====================
+@login_required
+def search_notes(request):
+    query = request.GET.get('q', '')
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+    per_page = 20
+
+    # Students only ever see approved notes; teachers may narrow by status
+    if request.user.is_teacher:
+        status = request.GET.get('status') or None
+    else:
+        status = 'approved'
+
+    ids = search.search_ids(query, status=status, limit=per_page + 1, offset=(page - 1) * per_page)
+    notes = {row.id: row for row in Notes.objects.rows().filter(id__in=ids[:per_page])}
+    results = []
+    for note_id in ids[:per_page]:
+        note = notes.get(note_id)
+        if note is None:
+            continue
+        results.append({
+            'id': note.id,
+            'year': note.year,
+            'branch': note.branch,
+            'subject': note.subject,
+            'chapter': note.chapter,
+            'status': note.status,
+            'uploader': note.uploader_name,
+            'uploaded_at': note.uploaded_at.isoformat(),
+        })
+
+    return JsonResponse({
+        'query': query,
+        'page': page,
+        'has_next': len(ids) > per_page,
+        'results': results,
+    })
+
+# ===================== FACETS =====================
+@login_required
+def facet_counts(request):
+    """Approved-note counts per year/branch/subject for the filter dropdowns."""
+    return JsonResponse({
+        'status': 'success',
+        'facets': [
+            {'year': year, 'branch': branch, 'subject': subject, 'count': count}
+            for year, branch, subject, count in facets.snapshot()
+        ],
+    })
+
+# ===================== CATALOG API =====================
+@login_required
+def catalog_api(request):
+    """
+    Approved notes as JSON, newest first: the dashboard filters plus
+    ``after``/``before`` cursors, ``limit`` and ``fields=id,title,...``.
+    """
+    try:
+        fields = catalog.parse_fields(request.GET.get('fields'))
+        limit = catalog.parse_limit(request.GET.get('limit'))
+    except ValueError as exc:
+        return JsonResponse({'status': 'error', 'message': str(exc)}, status=400)
+
+    # Read before the notes, so a body is never older than the version it is tagged with
+    version = catalog.version()
+    etag = catalog.etag(version, request.GET, fields, limit)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = JsonResponse({
+            'status': 'success',
+            'version': version,
+            **catalog.page(request.GET, fields, limit),
+        })
+    response['ETag'] = etag
+    # Revalidated on every use; unchanged catalogs cost a 304
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
 @login_required
 def upload_note(request):
     if request.method == 'POST':
@@ -171,7 +276,9 @@ def approve_note(request, note_id):
         note.status = 'approved'
         note.approved_by = request.user
         note.approved_at = timezone.now()
-        note.save()
+        # The status counters updated by its post_save handlers commit with it
+        with transaction.atomic():
+            note.save()
         
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
             return JsonResponse({'status': 'success', 'message': 'Note approved successfully!'})
@@ -194,7 +301,8 @@ def reject_note(request, note_id):
         reason = request.POST.get('reason', '')
         note.status = 'rejected'
         note.rejection_reason = reason
-        note.save()
+        with transaction.atomic():
+            note.save()
         
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
             return JsonResponse({'status': 'success', 'message': 'Note rejected successfully!'})
@@ -215,7 +323,8 @@ def pending_note(request, note_id):
             return JsonResponse({'status': 'error', 'message': 'Permission denied'})
         
         note.status = 'pending'
-        note.save()
+        with transaction.atomic():
+            note.save()
         
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
             return JsonResponse({'status': 'success', 'message': 'Note status set to pending!'})
@@ -228,6 +337,74 @@ def pending_note(request, note_id):
         messages.error(request, 'Note not found')
         return redirect('teacherdashboard')
 
+def _parse_bulk_moderation(request):
+    """Return ``(status, ids, filters)`` from a bulk moderation POST; raises ValueError."""
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body)
+        except ValueError:
+            raise ValueError('Invalid JSON')
+        if not isinstance(data, dict):
+            raise ValueError('Expected a JSON object')
+        ids = data.get('ids') or []
+        filters = data.get('filter') or {}
+        if not isinstance(filters, dict):
+            raise ValueError('Invalid filter')
+    else:
+        data = request.POST
+        ids = data.getlist('ids')
+        filters = data if data.get('scope') == 'filter' else {}
+
+    status = moderation.MODERATION_ACTIONS.get(data.get('action'))
+    if status is None:
+        raise ValueError('Unknown action')
+    if filters:
+        # Without a known tab the scope would be the whole moderation queue.
+        if filters.get('tab') not in moderation.DASHBOARD_TABS:
+            raise ValueError('Unknown tab')
+        return status, None, filters
+
+    try:
+        ids = sorted({int(note_id) for note_id in ids})
+    except (TypeError, ValueError):
+        raise ValueError('Invalid note ids')
+    if not ids:
+        raise ValueError('No notes selected')
+    if len(ids) > moderation.MAX_BULK_IDS:
+        raise ValueError(f'At most {moderation.MAX_BULK_IDS} notes per request; use the filter scope instead.')
+    return status, ids, None
+
+def _bulk_moderation_response(request, status, results):
+    updated = sum(1 for result in results.values() if result == 'updated')
+    message = f'{updated} note(s) set to {status}.'
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest' or request.content_type == 'application/json':
+        return JsonResponse({
+            'status': 'success',
+            'message': message,
+            'updated': updated,
+            'results': {str(note_id): result for note_id, result in results.items()},
+        })
+
+    messages.success(request, message)
+    return redirect('teacherdashboard')
+
+@login_required
+@require_POST
+def bulk_moderate(request):
+    if not request.user.is_teacher:
+        return JsonResponse({'status': 'error', 'message': 'Permission denied'}, status=403)
+
+    try:
+        status, ids, filters = _parse_bulk_moderation(request)
+    except ValueError as exc:
+        return JsonResponse({'status': 'error', 'message': str(exc)}, status=400)
+
+    if filters:
+        results = moderation.bulk_set_status(status, queryset=moderation.dashboard_notes(request.user, filters))
+    else:
+        results = moderation.bulk_set_status(status, ids=ids)
+    return _bulk_moderation_response(request, status, results)
+
 @login_required
 def delete_note(request, note_id):
     note = get_object_or_404(Notes, id=note_id)
@@ -261,16 +438,16 @@ def view_note(request, note_id):
         messages.error(request, 'Note not found')
         return redirect('studentdashboard')
     
-    # Only show approved notes to students, all notes to teachers
-    if not request.user.is_teacher and note.status != 'approved':
+    # Only show approved notes (or their own uploads) to students, all notes to teachers
+    if not request.user.is_teacher and note.status != 'approved' and note.uploader_id != request.user.id:
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
             return JsonResponse({'status': 'error', 'message': 'Note not accessible'})
         messages.error(request, 'You cannot view this note as it is not approved yet.')
         return redirect('studentdashboard')
     
-    # Serve the PDF file directly
-    response = FileResponse(note.pdf, content_type='application/pdf')
-    response['Content-Disposition'] = f'inline; filename="{note.subject}_{note.chapter}.pdf"'
+    # Serve the PDF (Range, 304 and proxy hand-off are handled by serve_pdf)
+    response = serve_pdf(request, note, 'inline')
+    analytics.record(request, response, note, 'view')
     return response
 
 @login_required
@@ -278,40 +455,93 @@ def download_note(request, note_id):
     try:
         note = Notes.objects.get(id=note_id)
         
-        # Only allow download of approved notes to students, all notes to teachers
-        if not request.user.is_teacher and note.status != 'approved':
+        # Only allow download of approved notes (or their own uploads) to students, all notes to teachers
+        if not request.user.is_teacher and note.status != 'approved' and note.uploader_id != request.user.id:
             if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
                 return JsonResponse({'status': 'error', 'message': 'Note not accessible'})
             messages.error(request, 'You cannot download this note as it is not approved yet.')
             return redirect('studentdashboard')
         
-        # Serve the PDF file directly
-        response = FileResponse(note.pdf, content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="{note.subject}_{note.chapter}.pdf"'
+        # Serve the PDF (Range, 304 and proxy hand-off are handled by serve_pdf)
+        response = serve_pdf(request, note, 'attachment')
+        analytics.record(request, response, note, 'download')
         return response
     except Notes.DoesNotExist:
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
             return JsonResponse({'status': 'error', 'message': 'Note not found'})
         messages.error(request, 'Note not found')
         return redirect('studentdashboard')
-    with open(note.file.path, 'rb') as file:
-        response = HttpResponse(file.read(), content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="{note.file.name.split("/")[-1]}"'
-        return response
-    return redirect('studentdashboard')
 
+@login_required
+def export_notes(request):
+    year = request.GET.get('year')
+    branch = request.GET.get('branch')
+    subject = request.GET.get('subject')
+    search_query = request.GET.get('search', '')
+    try:
+        notes = exports.export_notes(year, branch, subject, search_query)
+    except ValueError as exc:
+        return JsonResponse({'status': 'error', 'message': str(exc)}, status=400)
+
+    # Built while it is sent, so there is no Content-Length.
+    response = StreamingHttpResponse(exports.stream_zip(notes), content_type='application/zip')
+    for note in notes:
+        analytics.record(request, response, note, 'download')
+    filename = '-'.join(['notes'] + [value for value in (year, branch, subject) if value]) + '.zip'
+    ascii_name = filename.encode('ascii', 'ignore').decode().replace('"', '')
+    response['Content-Disposition'] = f'attachment; filename="{ascii_name}"; filename*=UTF-8\'\'{quote(filename)}'
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+@login_required
+def note_preview(request, note_id, digest):
+    note = Notes.objects.filter(id=note_id, blob_id=digest).only('id', 'status', 'uploader_id', 'blob_id').first()
+    if note is None:
+        raise Http404('Preview not found')
+    if not request.user.is_teacher and note.status != 'approved' and note.uploader_id != request.user.id:
+        return HttpResponseForbidden()
+
+    # Rendered by process_notes only; the card drops the image until the job has run.
+    path = previews.cached_path(digest)
+    if path is None:
+        pipeline.request_preview(note)
+        raise Http404('Preview not rendered yet')
+    previews.touch(path)
+    response = FileResponse(open(path, 'rb'), content_type=previews.content_type(path))
+    # The URL carries the content hash, so the image can never change under it.
+    response['Cache-Control'] = 'private, max-age=31536000, immutable'
+    return response
+
+def _notes_upload_form(request):
+    form = NotesUploadForm(request.POST, request.FILES)
+    error = uploads.upload_error(request)
+    if error:
+        # The upload was stopped, so the form's own "required" error is misleading
+        form.errors.pop('pdf', None)
+        form.add_error('pdf', error)
+    return form
+
+# The PDF is checked while it streams in, so the upload handler has to be
+# installed before CsrfViewMiddleware reads request.POST.
+@csrf_exempt
 @login_required
 def studentupload(request):
+    request.upload_handlers = [uploads.PdfUploadHandler(request)]
+    return _studentupload(request)
+
+@csrf_protect
+def _studentupload(request):
     if not request.user.is_student:
         return redirect('landingpage')
     
     if request.method == 'POST':
-        form = NotesUploadForm(request.POST, request.FILES)
+        form = _notes_upload_form(request)
         if form.is_valid():
             note = form.save(commit=False)
             note.uploader = request.user
             note.status = 'pending'
-            note.save()
+            with transaction.atomic():
+                note.save()
             messages.success(request, 'Note uploaded successfully and is pending approval.')
             return redirect('studentdashboard')
     else:
@@ -320,18 +550,25 @@ def studentupload(request):
     return render(request, 'noteshub/studentupload.html', {
         'form': form,
         'roll_number': request.user.roll_number
-    })
+    }, status=uploads.upload_status(request) if request.method == 'POST' else 200)
 
+@csrf_exempt
 @login_required
 @user_passes_test(lambda u: u.is_teacher)
 def teacherupload(request):
+    request.upload_handlers = [uploads.PdfUploadHandler(request)]
+    return _teacherupload(request)
+
+@csrf_protect
+def _teacherupload(request):
     if request.method == 'POST':
-        form = NotesUploadForm(request.POST, request.FILES)
+        form = _notes_upload_form(request)
         if form.is_valid():
             note = form.save(commit=False)
             note.uploader = request.user
             note.status = 'approved'  # Teachers can upload directly without approval
-            note.save()
+            with transaction.atomic():
+                note.save()
             messages.success(request, 'Note uploaded successfully!')
             return redirect('teacherdashboard')
     else:
@@ -340,6 +577,97 @@ def teacherupload(request):
     return render(request, 'noteshub/teacherupload.html', {
         'form': form,
         'username': request.user.username
+    }, status=uploads.upload_status(request) if request.method == 'POST' else 200)
+
+# ===================== CHUNKED UPLOADS =====================
+def _upload_session_payload(session, http_status=200, **extra):
+    return JsonResponse({
+        'status': 'success',
+        'session': str(session.pk),
+        'state': session.status,
+        'offset': session.received,
+        'total_size': session.total_size,
+        'chunk_size': uploads.MAX_CHUNK_SIZE,
+        **extra,
+    }, status=http_status)
+
+@login_required
+@require_POST
+def upload_initiate(request):
+    if not (request.user.is_student or request.user.is_teacher):
+        return JsonResponse({'status': 'error', 'message': 'Permission denied'}, status=403)
+
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body)
+        except ValueError:
+            return JsonResponse({'status': 'error', 'message': 'Invalid JSON'}, status=400)
+    else:
+        data = request.POST
+
+    form = UploadSessionForm(data)
+    if not form.is_valid():
+        return JsonResponse({'status': 'error', 'message': 'Invalid upload', 'errors': form.errors}, status=400)
+
+    session = uploads.initiate(request.user, form)
+    return _upload_session_payload(session, http_status=201)
+
+@login_required
+def upload_session(request, session_id):
+    session = get_object_or_404(UploadSession, pk=session_id, user=request.user)
+
+    if request.method == 'GET':
+        return _upload_session_payload(session)
+
+    if request.method == 'DELETE':
+        uploads.abort(session)
+        return _upload_session_payload(session)
+
+    if request.method != 'PUT':
+        return HttpResponseNotAllowed(['GET', 'PUT', 'DELETE'])
+
+    try:
+        offset = int(request.headers.get('Upload-Offset', request.GET.get('offset', '')))
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Upload-Offset and Content-Length are required'}, status=400)
+
+    try:
+        uploads.write_chunk(session, offset, length, request)
+    except uploads.UploadError as exc:
+        return JsonResponse({
+            'status': 'error',
+            'message': exc.message,
+            'offset': session.received,
+            'state': session.status,
+        }, status=exc.status)
+    return _upload_session_payload(session)
+
+@login_required
+@require_POST
+def upload_finalize(request, session_id):
+    session = get_object_or_404(UploadSession.objects.select_related('user'), pk=session_id, user=request.user)
+    try:
+        note = uploads.finalize(session)
+    except uploads.UploadError as exc:
+        return JsonResponse({'status': 'error', 'message': exc.message, 'offset': session.received}, status=exc.status)
+
+    if note.status == 'pending':
+        message = 'Note uploaded successfully and is pending approval.'
+    else:
+        message = 'Note uploaded successfully!'
+    return _upload_session_payload(session, note_id=note.id, message=message)
+
+# ===================== PROFILING =====================
+@staff_member_required
+def profiling_report(request):
+    if request.method == 'POST':
+        profiling.registry.reset()
+    return JsonResponse({
+        'status': 'success',
+        'enabled': settings.NOTESHUB_PROFILING,
+        'pid': os.getpid(),
+        'views': profiling.registry.snapshot(),
     })
 
 @login_required